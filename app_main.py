@@ -2,17 +2,24 @@
 import sys
 import threading
 import queue
-import json
 import os
-import struct
 import time
 import yaml
 import config
 from audio_manager import AudioManager
+from fast_path import FastCommandPath
+from grammar_recognizer import drone_grammar
+from hot_reload import HotReloader
+from llm_cache import ScriptCache
+from script_executor import ScriptExecutor
+from flight_plan import FlightPlanEngine
 from gpt_integration import GPTIntegration
 from va_responder import VAResponder
+from voice_loop import VoiceLoop
+from tracing import tracer
 import drone_manager
 import build_Fly
+import bottle_tracker
 import tts
 import sounddevice as sd
 
@@ -26,7 +33,7 @@ from PyQt5.QtCore import Qt, QThread, pyqtSignal, QObject, QTimer, QPointF
 # --- Содержимое va_core.py (перемещаем сюда для демонстрации, но лучше держать в отдельном файле) ---
 CDIR = os.getcwd()
 VA_CMD_LIST = yaml.safe_load(
-    open('commands.yaml', 'rt', encoding='utf8'),
+    open(config.COMMANDS_FILE, 'rt', encoding='utf8'),
 )
 
 
@@ -43,6 +50,9 @@ class VACore(QObject):  # Наследуемся от QObject для испол
         self.audio_manager = None
         self.gpt_integration = None
         self.va_responder = None
+        self.voice_loop = None
+        self.hot_reloader = None
+        self.script_executor = None
         self.microphone_index = -1  # Будет установлен из GUI
 
     def set_microphone_index(self, index):
@@ -60,16 +70,34 @@ class VACore(QObject):  # Наследуемся от QObject для испол
         self.update_status_signal("Запуск...")
         self.update_log_signal("Попытка запуска Джарвиса...")
         try:
+            grammar_phrases = None
+            if config.GRAMMAR_RECOGNIZER:
+                grammar_phrases = drone_grammar(VA_CMD_LIST, drone_manager, va_alias=config.VA_ALIAS)
+
             self.audio_manager = AudioManager(
                 porcupine_access_key=config.PICOVOICE_TOKEN,
                 microphone_index=self.microphone_index,
                 vosk_model_path="model_small",
-                sound_dir=os.path.join(CDIR, "sound")
+                sound_dir=os.path.join(CDIR, "sound"),
+                ring_seconds=config.AUDIO_RING_SECONDS,
+                drop_policy=config.AUDIO_DROP_POLICY,
+                grammar_phrases=grammar_phrases,
+                va_alias=config.VA_ALIAS
             )
 
+            # Процесс для сгенерированного кода поднимается заранее, пока грузится остальное
+            if config.SCRIPT_EXECUTOR and not config.FLIGHT_PLANS:
+                self.script_executor = ScriptExecutor(config.SCRIPT_SWARM_IPS, timeout=config.SCRIPT_TIMEOUT,
+                                                      ports_busy=drone_manager.owns_drone_ports).start()
+
             self.gpt_integration = GPTIntegration(
                 openai_api_key=config.OPENAI_TOKEN,
-                system_message={"role": "system", "content": "Ты голосовой ассистент из железного человека."}
+                system_message={"role": "system", "content": "Ты голосовой ассистент из железного человека."},
+                api_base=config.LLM_API_BASE,
+                connect_timeout=config.LLM_CONNECT_TIMEOUT,
+                read_timeout=config.LLM_READ_TIMEOUT,
+                context_budget=config.LLM_CONTEXT_BUDGET,
+                keep_turns=config.LLM_KEEP_TURNS
             )
 
             self.va_responder = VAResponder(
@@ -80,10 +108,32 @@ class VACore(QObject):  # Наследуемся от QObject для испол
                 audio_manager=self.audio_manager,
                 tts_module=tts,
                 drone_manager_module=drone_manager,
-                build_fly_module=build_Fly
+                build_fly_module=build_Fly,
+                llm_cache=ScriptCache(config.LLM_CACHE_FILE, max_items=config.LLM_CACHE_ITEMS,
+                                      ttl_seconds=config.LLM_CACHE_TTL_DAYS * 24 * 3600) if config.LLM_CACHE else None,
+                script_executor=self.script_executor,
+                flight_engine=FlightPlanEngine(drone_manager) if config.FLIGHT_PLANS else None
             )
 
-            self.audio_manager.play_sound("run")
+            # commands.yaml и drones.yaml можно править, не перезапуская ассистента
+            if config.HOT_RELOAD:
+                self.hot_reloader = HotReloader(
+                    self.va_responder, self.audio_manager, drone_manager,
+                    config.COMMANDS_FILE, config.DRONES_FILE,
+                    va_alias=config.VA_ALIAS, interval=config.HOT_RELOAD_INTERVAL
+                )
+                self.hot_reloader.start()
+
+            # Задержки по этапам каждой фразы — в config.TRACE_FILE, сводка: python tracing.py
+            if config.TRACE:
+                tracer.open(config.TRACE_FILE)
+
+            # Silero и YOLO догружаются в фоне, пока ассистент уже ждёт «Джарвис»
+            if config.WARM_UP_MODELS:
+                tts.model.warm_up()
+                bottle_tracker.model.warm_up()
+
+            self.audio_manager.play_sound("run", wait_done=True)
             time.sleep(0.5)
             self.update_status_signal("Ассистент запущен и ожидает активации.")
             self.update_log_signal("Джарвис готов.")
@@ -99,65 +149,55 @@ class VACore(QObject):  # Наследуемся от QObject для испол
         if not self.is_running:
             return
         self.is_running = False
+        if self.voice_loop:
+            self.voice_loop.stop()
+        if self.hot_reloader:
+            self.hot_reloader.stop()
+        if self.script_executor:
+            self.script_executor.stop()
+        if tracer.enabled:
+            tracer.flush()
+        if drone_manager.controller is not None:
+            self.update_log_signal.emit(f"Очереди команд дронов: {drone_manager.controller.stats()}")
         if self.audio_manager:
             self.audio_manager.stop_recorder()
         self.update_status_signal("Остановлен.")
         self.update_log_signal("Джарвис остановлен.")
 
     def run_loop(self):
-        last_trigger_time = time.time() - 1000
-
-        while self.is_running:
-            try:
-                pcm = self.audio_manager.recorder.read()
-                keyword_index = self.audio_manager.porcupine.process(pcm)
-
-                if keyword_index >= 0:
-                    self.audio_manager.recorder.stop()
-                    self.audio_manager.play_sound("greet", wait_done=True)
-                    self.update_log_signal("Активационное слово распознано: Yes, sir.")
-                    self.audio_manager.recorder.start()
-                    last_trigger_time = time.time()
-                    self.update_status_signal("Ожидание команды...")
-
-                if time.time() - last_trigger_time <= 10:
-                    pcm = self.audio_manager.recorder.read()
-                    sp = struct.pack("h" * len(pcm), *pcm)
-
-                    if self.audio_manager.kaldi_rec.AcceptWaveform(sp):
-                        recognized_text = json.loads(self.audio_manager.kaldi_rec.Result())["text"]
-                        self.update_recognized_signal(recognized_text)
-
-                        # Здесь вам нужно будет модифицировать va_responder.respond
-                        # чтобы он возвращал сам текст ответа, а не только True/False
-                        # или же va_responder должен иметь внутренний механизм для отправки ответа
-                        # Например, можно добавить 'response_callback' в конструктор VAResponder
-                        # и вызывать его после генерации ответа.
-                        # В этом примере я просто имитирую ответ
-
-                        # Пример: Если va_responder.respond() возвращает ответ
-                        response_text = "..."  # Получите реальный ответ от va_responder.respond
-                        if self.va_responder.respond(recognized_text):  # Предположим, он возвращает True
-                            # Если VAResponder может получить ответ, передайте его через сигнал
-                            # Например, если respond() возвращает (bool, str)
-                            # _, response_text = self.va_responder.respond(recognized_text)
-                            # self.update_response_signal(response_text)
-                            self.update_response_signal("Обработка команды завершена.")  # Заглушка
-                            last_trigger_time = time.time()
-                            self.update_status_signal("Обработка команды...")
-                        else:
-                            self.update_status_signal(
-                                "Команда не распознана или не требует ответа. Ожидание активации.")
-                        continue
-
-                    elif json.loads(self.audio_manager.kaldi_rec.Result())["text"] == "":
-                        if time.time() - last_trigger_time > 10:
-                            self.update_status_signal("Время ожидания команды истекло. Ожидание активации.")
-
-            except Exception as err:
-                self.error_signal(f"Неожиданная ошибка в VA: {err}")
-                self.stop_va()
-                break
+        self.voice_loop = VoiceLoop(
+            self.audio_manager,
+            self.va_responder,
+            listen_seconds=config.LISTEN_SECONDS,
+            preroll_ms=config.PREROLL_MS,
+            fast_path=FastCommandPath(drone_manager) if config.FAST_PATH else None,
+            speech=tts,
+            on_wake=self._on_wake,
+            on_recognized=self.update_recognized_signal.emit,
+            on_response=self._on_response,
+            on_timeout=self._on_timeout
+        )
+
+        try:
+            self.voice_loop.run()
+        except Exception as err:
+            self.error_signal.emit(f"Неожиданная ошибка в VA: {err}")
+            self.stop_va()
+
+    def _on_wake(self):
+        self.update_log_signal.emit("Активационное слово распознано: Yes, sir.")
+        self.update_status_signal.emit("Ожидание команды...")
+
+    def _on_response(self, recognized_text, handled):
+        # VAResponder.respond возвращает только True/False, поэтому текст ответа пока заглушка
+        if handled:
+            self.update_response_signal.emit("Обработка команды завершена.")
+            self.update_status_signal.emit("Обработка команды...")
+        else:
+            self.update_status_signal.emit("Команда не распознана или не требует ответа. Ожидание активации.")
+
+    def _on_timeout(self):
+        self.update_status_signal.emit("Время ожидания команды истекло. Ожидание активации.")
 
 
 # --- Конец содержимого va_core.py ---
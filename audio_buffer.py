@@ -0,0 +1,176 @@
+#Буферы PCM-кадров для передачи звука из PvRecorder в Porcupine и Vosk без лишних копий.
+
+import struct
+import threading
+import time
+from collections import deque
+
+
+class FrameBuffer:
+    """
+    Предвыделенный буфер на один кадр PvRecorder (int16).
+
+    PvRecorder отдаёт кадр списком int; Porcupine принимает этот список как есть,
+    а Vosk получает memoryview на байты буфера. Формат struct компилируется и
+    memoryview создаётся один раз, поэтому на кадр остаётся только pack_into
+    в уже выделенную память — без сборки строки формата и нового bytes.
+    """
+
+    def __init__(self, frame_length):
+        self.frame_length = frame_length
+        self._struct = struct.Struct(f"{frame_length}h")
+        self.data = bytearray(self._struct.size)
+        self.view = memoryview(self.data)
+
+    def load(self, pcm):
+        """Упаковывает кадр в буфер и возвращает байтовое представление для Vosk."""
+        self._struct.pack_into(self.data, 0, *pcm)
+        return self.view
+
+
+DROP_OLDEST = "drop_oldest"  # при переполнении затираем самые старые кадры (задержка ограничена)
+DROP_NEWEST = "drop_newest"  # при переполнении отбрасываем новые кадры (сохраняем начало фразы)
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST)
+
+
+class FrameRing:
+    """
+    Ограниченный кольцевой буфер кадров для одного писателя и одного читателя.
+
+    Писатель двигает только head, читатель — только tail, поэтому блокировки не нужны.
+    Слоты выделены заранее и хранят ссылки на кадры PvRecorder: кадр не
+    конвертируется при записи, Porcupine получает его в исходном виде.
+    У каждого слота есть номер записанного в него кадра: читатель сверяет его
+    до и после чтения и не отдаёт кадр, который писатель успел затереть.
+    Счётчики потерь у писателя и читателя свои, dropped — их сумма.
+    """
+
+    def __init__(self, capacity, drop_policy=DROP_OLDEST):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Неизвестная политика переполнения: {drop_policy}")
+        self.capacity = capacity
+        self.drop_policy = drop_policy
+        self._slots = [None] * capacity
+        self._stamps = [0.0] * capacity  # время захвата кадра (time.monotonic)
+        self._seqs = [-1] * capacity     # номер кадра в слоте, -1 — идёт запись
+
+        self._head = 0  # сколько кадров записано (меняет только писатель)
+        self._tail = 0  # сколько кадров прочитано или пропущено (меняет только читатель)
+        self._ready = threading.Event()
+
+        self.overruns = 0  # сколько раз писатель упёрся в полный буфер
+        self._push_dropped = 0  # отброшено писателем (drop_newest), меняет только писатель
+        self._pop_dropped = 0   # затёрто до чтения (drop_oldest), меняет только читатель
+        self.max_depth = 0
+        self.last_timestamp = 0.0  # время захвата последнего прочитанного кадра
+
+    def __len__(self):
+        return min(self._head - self._tail, self.capacity)
+
+    @property
+    def dropped(self):
+        """Сколько кадров потеряно из-за переполнения."""
+        return self._push_dropped + self._pop_dropped
+
+    def push(self, pcm, timestamp=None):
+        """Кладёт кадр в буфер. Возвращает False, если кадр отброшен политикой drop_newest."""
+        head = self._head
+        if head - self._tail >= self.capacity:
+            self.overruns += 1
+            if self.drop_policy == DROP_NEWEST:
+                self._push_dropped += 1
+                return False
+            # drop_oldest: перезаписываем слот, читатель сам перескочит вперёд
+        slot = head % self.capacity
+        self._seqs[slot] = -1
+        self._slots[slot] = pcm
+        self._stamps[slot] = time.monotonic() if timestamp is None else timestamp
+        self._seqs[slot] = head
+        self._head = head + 1
+        self.max_depth = max(self.max_depth, min(self._head - self._tail, self.capacity))
+        self._ready.set()
+        return True
+
+    def pop(self, timeout=None):
+        """Возвращает следующий кадр или None, если за timeout новых кадров не появилось."""
+        while True:
+            tail = self._tail
+            head = self._head
+            if head == tail:
+                self._ready.clear()
+                if self._head != tail:
+                    continue
+                if not self._ready.wait(timeout):
+                    return None
+                continue
+
+            if head - tail > self.capacity:
+                # Писатель обогнал читателя на круг — пропускаем затёртые кадры
+                skipped = head - tail - self.capacity
+                self._pop_dropped += skipped
+                tail += skipped
+
+            slot = tail % self.capacity
+            seq = self._seqs[slot]
+            pcm = self._slots[slot]
+            timestamp = self._stamps[slot]
+
+            if seq != tail or self._seqs[slot] != tail:
+                # Писатель затёр слот до или во время чтения (head мог ещё не сдвинуться) — берём следующий
+                self._tail = tail + 1
+                self._pop_dropped += 1
+                continue
+
+            self._tail = tail + 1
+            self.last_timestamp = timestamp
+            return pcm
+
+    def clear(self):
+        """Пропускает все накопленные кадры (вызывается читателем)."""
+        self._tail = self._head
+
+
+class PreRollBuffer:
+    """
+    Последние N кадров до текущего момента. После активационного слова они
+    проигрываются в Vosk, чтобы не потерять начало команды, сказанной на одном
+    дыхании с «Джарвис».
+    """
+
+    def __init__(self, frames):
+        self._frames = deque(maxlen=max(1, frames))
+
+    def __len__(self):
+        return len(self._frames)
+
+    def push(self, pcm):
+        self._frames.append(pcm)
+
+    def drain(self):
+        """Возвращает накопленные кадры по порядку и очищает буфер."""
+        frames = list(self._frames)
+        self._frames.clear()
+        return frames
+
+
+def _benchmark(frames=5000, frame_length=512, repeat=7):
+    import random
+    import timeit
+
+    pcm = [random.randint(-32768, 32767) for _ in range(frame_length)]
+    buffer = FrameBuffer(frame_length)
+    env = {"struct": struct, "pcm": pcm, "buffer": buffer}
+
+    assert bytes(buffer.load(pcm)) == struct.pack("h" * len(pcm), *pcm)
+
+    before = min(timeit.repeat('struct.pack("h" * len(pcm), *pcm)', globals=env, number=frames, repeat=repeat))
+    after = min(timeit.repeat("buffer.load(pcm)", globals=env, number=frames, repeat=repeat))
+
+    print(f"Кадр: {frame_length} сэмплов, прогонов: {frames} x {repeat} (лучший результат)")
+    print(f"struct.pack:        {before / frames * 1e6:8.2f} мкс/кадр")
+    print(f"FrameBuffer.load:   {after / frames * 1e6:8.2f} мкс/кадр")
+    print(f"Ускорение:          {before / after:8.2f}x")
+
+
+if __name__ == "__main__":
+    _benchmark()
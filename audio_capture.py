@@ -0,0 +1,82 @@
+#Фоновый захват звука: отдельный поток читает PvRecorder и складывает кадры в кольцевой буфер.
+
+import threading
+import time
+
+from rich import print
+
+
+class AudioCapture:
+    """
+    Поток захвата звука. Читает кадры из рекордера без пауз, даже пока
+    основной цикл занят ответом (TTS, GPT, subprocess), и пишет их в FrameRing.
+    """
+
+    def __init__(self, recorder, ring):
+        self.recorder = recorder
+        self.ring = ring
+        self._running = False
+        self._muted = threading.Event()
+        self._mute_depth = 0  # mute() от звуков, играющих одновременно
+        self._mute_lock = threading.Lock()
+        self._thread = None
+
+        self.captured = 0     # всего прочитано кадров
+        self.muted = 0        # отброшено во время воспроизведения звуков
+        self.read_errors = 0
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="audio-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def mute(self):
+        """Не пишет кадры в буфер (защита от самозаписи во время воспроизведения). Вызовы вкладываются."""
+        with self._mute_lock:
+            self._mute_depth += 1
+            self._muted.set()
+
+    def unmute(self):
+        with self._mute_lock:
+            self._mute_depth = max(0, self._mute_depth - 1)
+            if self._mute_depth == 0:
+                self._muted.clear()
+
+    def _loop(self):
+        while self._running:
+            try:
+                pcm = self.recorder.read()
+            except EOFError:
+                break  # Источник из файлов закончился
+            except Exception as e:
+                if not self._running:
+                    break
+                self.read_errors += 1
+                print(f"⚠️ Ошибка чтения с микрофона: {e}")
+                time.sleep(0.05)
+                continue
+
+            self.captured += 1
+            if self._muted.is_set():
+                self.muted += 1
+                continue
+            self.ring.push(pcm)
+
+    def stats(self):
+        return {
+            "captured": self.captured,
+            "muted": self.muted,
+            "read_errors": self.read_errors,
+            "overruns": self.ring.overruns,
+            "dropped": self.ring.dropped,
+            "depth": len(self.ring),
+            "max_depth": self.ring.max_depth,
+        }
@@ -1,91 +1,129 @@
 #Управление аудиовходом (PvRecorder, Porcupine, Vosk) и воспроизведением звуков (Simpleaudio, PyCaw).
 
 import os
-import queue
-import random
 import sys
 import time
 from ctypes import POINTER, cast
 
-import pvporcupine
-import simpleaudio as sa
 import vosk
-from comtypes import CLSCTX_ALL
-from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
 from rich import print
 
-# ИСПРАВЛЕНИЕ: Импортируем PvRecorder из pvrecorder
-from pvrecorder import PvRecorder
+from audio_buffer import DROP_OLDEST, FrameBuffer, FrameRing
+from audio_capture import AudioCapture
+from audio_sources import PvRecorderSource
+from grammar_recognizer import DualRecognizer
+from sound_bank import SoundBank
+
+
+class NoWakeWord:
+    """Вместо Porcupine, когда активационное слово не слушаем (replay_harness --no-wake): не срабатывает никогда."""
+
+    frame_length = 512  # как у pvporcupine
+
+    def process(self, pcm):
+        return -1
+
+    def delete(self):
+        pass
 
 
 class AudioManager:
-    def __init__(self, porcupine_access_key, microphone_index, vosk_model_path, sound_dir):
+    def __init__(self, porcupine_access_key, microphone_index, vosk_model_path, sound_dir,
+                 ring_seconds=5.0, drop_policy=DROP_OLDEST, grammar_phrases=None, va_alias=(),
+                 audio_source=None, start_capture=True, sound_bank=None, wake_word=True):
         self.CDIR = os.getcwd()
         self.sound_dir = sound_dir
+        self.sound_bank = sound_bank or SoundBank(sound_dir)  # все звуки декодируются один раз
 
         # PORCUPINE
-        self.porcupine = pvporcupine.create(
-            access_key=porcupine_access_key,
-            keywords=['jarvis'],
-            sensitivities=[1]
-        )
+        if wake_word:
+            import pvporcupine  # без активационного слова не нужен ни пакет, ни ключ
+
+            self.porcupine = pvporcupine.create(
+                access_key=porcupine_access_key,
+                keywords=['jarvis'],
+                sensitivities=[1]
+            )
+        else:
+            self.porcupine = NoWakeWord()
 
         # VOSK
         self.model = vosk.Model(vosk_model_path)
         self.samplerate = 16000
-        self.q = queue.Queue()  # Очередь для vosk, если используется потоковая обработка
-        self.kaldi_rec = vosk.KaldiRecognizer(self.model, self.samplerate)
+        if grammar_phrases:
+            # Грамматика из команд и имён дронов; свободная речь только после «выполни»
+            self.kaldi_rec = DualRecognizer(self.model, self.samplerate, grammar_phrases, va_alias)
+        else:
+            self.kaldi_rec = vosk.KaldiRecognizer(self.model, self.samplerate)
 
-        # PvRecorder
-        # ИСПРАВЛЕНИЕ: Используем PvRecorder напрямую
-        self.recorder = PvRecorder(device_index=microphone_index, frame_length=self.porcupine.frame_length)
+        # Источник звука: по умолчанию микрофон через PvRecorder, для тестов — wav-файлы (audio_sources.py)
+        if audio_source is None:
+            audio_source = PvRecorderSource(microphone_index, self.porcupine.frame_length)
+        elif audio_source.frame_length != self.porcupine.frame_length:
+            raise ValueError(f"Длина кадра источника {audio_source.frame_length}, "
+                             f"Porcupine ждёт {self.porcupine.frame_length}")
+        self.recorder = audio_source
         self.recorder.start()
         print('Using device: %s' % self.recorder.selected_device)
 
-    def play_sound(self, phrase, wait_done=True):
-        filename = os.path.join(self.sound_dir, "")
-
-        if phrase == "greet":
-            filename += f"greet{random.choice([1, 2, 3])}.wav"
-        elif phrase == "ok":
-            filename += f"ok{random.choice([1, 2, 3])}.wav"
-        elif phrase == "not_found":
-            filename += "not_found.wav"
-        elif phrase == "thanks":
-            filename += "thanks.wav"
-        elif phrase == "run":
-            filename += "run.wav"
-        elif phrase == "stupid":
-            filename += "stupid.wav"
-        elif phrase == "ready":
-            filename += "ready.wav"
-        elif phrase == "off":
-            filename += "off.wav"
-        else:
-            filename = phrase  # Если передается полный путь к файлу
+        # Буфер кадра для Vosk, чтобы не собирать bytes через struct.pack на каждом кадре
+        self.frame_buffer = FrameBuffer(self.porcupine.frame_length)
 
-        if wait_done:
-            self.recorder.stop()
+        # Захват в отдельном потоке: кадры копятся в кольцевом буфере, пока обрабатывается команда
+        ring_capacity = max(1, int(ring_seconds * self.samplerate / self.porcupine.frame_length))
+        self.ring = FrameRing(ring_capacity, drop_policy)
+        self.capture = AudioCapture(self.recorder, self.ring)
+        if start_capture:
+            self.capture.start()
+
+    def read_frame(self, timeout=None):
+        """
+        Забирает следующий кадр из кольцевого буфера (список сэмплов для Porcupine)
+        или None, если за timeout кадров не было.
+        """
+        return self.ring.pop(timeout)
 
+    def accept_waveform(self, pcm):
+        """Передаёт кадр в Vosk через предвыделенный буфер."""
+        data = self.frame_buffer.load(pcm)
         try:
-            wave_obj = sa.WaveObject.from_wave_file(filename)
-            play_obj = wave_obj.play()
+            return self.kaldi_rec.AcceptWaveform(data)
+        except TypeError:
+            # Старые сборки vosk/cffi принимают для char* только bytes
+            return self.kaldi_rec.AcceptWaveform(bytes(data))
 
-            if wait_done:
-                play_obj.wait_done()
-                self.recorder.start()
-        except FileNotFoundError:
-            print(f"Ошибка: Аудиофайл не найден: {filename}")
-            if wait_done:
-                self.recorder.start()  # Возобновить запись даже при ошибке
+    def play_sound(self, phrase, wait_done=True):
+        """
+        Играет звук из банка (greet, ok, run, ...) или wav по полному пути.
+        Пока звук играет, захват приглушён — собственный звук не попадает в микрофон.
+        При wait_done=False сразу возвращает Future, завершающуюся по окончании звука;
+        запись возобновится сама.
+        """
+        self.capture.mute()  # Предотвращаем самозапись
+        try:
+            future = self.sound_bank.play(phrase)
+        except Exception:
+            self.capture.unmute()  # Возобновить запись даже при ошибке
+            raise
+        future.add_done_callback(lambda f: self.capture.unmute())
+        if wait_done:
+            future.result()
+        return future
 
     def set_volume_mute(self, mute: bool):
+        # PyCaw есть только на Windows, поэтому импортируем при первом использовании
+        from comtypes import CLSCTX_ALL
+        from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
+
         devices = AudioUtilities.GetSpeakers()
         interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
         volume = cast(interface, POINTER(IAudioEndpointVolume))
         volume.SetMute(1 if mute else 0, None)
 
     def stop_recorder(self):
+        if self.capture:
+            self.capture.stop()
+            print(f"Статистика захвата: {self.capture.stats()}")
         if self.recorder:
             self.recorder.delete()
         if self.porcupine:
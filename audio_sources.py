@@ -0,0 +1,121 @@
+#Источники звука для AudioManager: микрофон (PvRecorder), wav-файл и папка wav-файлов.
+#Все источники отдают кадры списком int16 длиной frame_length, как PvRecorder.read().
+
+import glob
+import os
+import struct
+import wave
+
+
+class PvRecorderSource:
+    """Микрофон через PvRecorder."""
+
+    def __init__(self, device_index, frame_length):
+        from pvrecorder import PvRecorder  # wav-источникам (replay_harness, CI) PvRecorder не нужен
+
+        self.frame_length = frame_length
+        self._recorder = PvRecorder(device_index=device_index, frame_length=frame_length)
+
+    @property
+    def selected_device(self):
+        return self._recorder.selected_device
+
+    def start(self):
+        self._recorder.start()
+
+    def stop(self):
+        self._recorder.stop()
+
+    def read(self):
+        return self._recorder.read()
+
+    def delete(self):
+        self._recorder.delete()
+
+
+class WavFileSource:
+    """
+    Один wav-файл (16 кГц, моно, 16 бит). Кадры отдаются без пауз, то есть
+    быстрее реального времени. В конце добавляется trailing_silence секунд
+    тишины, чтобы Vosk успел закончить фразу, затем read() бросает EOFError.
+    """
+
+    def __init__(self, path, frame_length, sample_rate=16000, trailing_silence=1.0):
+        self.path = path
+        self.frame_length = frame_length
+        self.sample_rate = sample_rate
+        self.selected_device = os.path.basename(path)
+        self._struct = struct.Struct(f"<{frame_length}h")
+        self._silence = [0] * frame_length
+        self._silence_frames = int(trailing_silence * sample_rate / frame_length)
+
+        with wave.open(path, "rb") as wav:
+            if wav.getframerate() != sample_rate or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                raise ValueError(f"{path}: нужен wav 16 бит, моно, {sample_rate} Гц")
+            self._data = wav.readframes(wav.getnframes())
+
+        self.audio_frames = len(self._data) // self._struct.size  # кадров речи без хвоста тишины
+        self.position = 0
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def delete(self):
+        pass
+
+    def read(self):
+        position = self.position
+        if position < self.audio_frames:
+            self.position += 1
+            return list(self._struct.unpack_from(self._data, position * self._struct.size))
+        if position < self.audio_frames + self._silence_frames:
+            self.position += 1
+            return self._silence
+        raise EOFError(self.path)
+
+
+class WavDirectorySource:
+    """
+    Все wav-файлы папки по алфавиту, один за другим (каждый — отдельная
+    записанная сессия или фраза). current — текущий WavFileSource.
+    """
+
+    def __init__(self, directory, frame_length, sample_rate=16000, trailing_silence=1.0):
+        self.directory = directory
+        self.frame_length = frame_length
+        self.sample_rate = sample_rate
+        self.trailing_silence = trailing_silence
+        self.selected_device = directory
+        self.paths = sorted(glob.glob(os.path.join(directory, "*.wav")))
+        self._next = 0
+        self.current = None
+        self._open_next()
+
+    def _open_next(self):
+        if self._next >= len(self.paths):
+            self.current = None
+            return False
+        self.current = WavFileSource(self.paths[self._next], self.frame_length,
+                                     self.sample_rate, self.trailing_silence)
+        self._next += 1
+        return True
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def delete(self):
+        pass
+
+    def read(self):
+        while self.current is not None:
+            try:
+                return self.current.read()
+            except EOFError:
+                self._open_next()
+        raise EOFError(self.directory)
@@ -1,11 +1,18 @@
-from ultralytics import YOLO
 import cv2
 import numpy as np
 import threading
+from lazy_loader import LazyModel
 from obstacle_avoidance import ObstacleAvoidance
 
+
+def _load_yolo():
+    # ultralytics тянет torch, поэтому импортируем его только при первом поиске объекта
+    from ultralytics import YOLO
+    return YOLO("yolov8n.pt")
+
+
 # YOLO модель
-model = YOLO("yolov8n.pt")
+model = LazyModel("YOLOv8", _load_yolo)
 
 spiral_counter = 0
 spiral_shift_every = 7
@@ -15,7 +22,7 @@ spiral_yaw = 40  # Угловое вращение между витками с
 
 
 def findPerson(img, target_class_id):
-    results = model(img)
+    results = model.get()(img)
     bottle_data = results[0].boxes.data.cpu().numpy()
 
     myBottleListC = []
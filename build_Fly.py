@@ -1,8 +1,7 @@
 import time
 import math
-import threading
 from djitellopy import Tello, TelloException
-from drone_utils import keep_alive
+from swarm_controller import run_on_all
 
 # === НАСТРОЙКИ ШОУ ===
 FORMATION_PARAMS = {
@@ -20,12 +19,22 @@ FORMATION_PARAMS = {
 def connect_all(drones_dict):
     """
     Проверка подключения всех дронов и вывод уровня батареи.
+    Дроны за SwarmController — по последнему пакету состояния из его Telemetry, без запросов.
     """
     for ip, drone_data in drones_dict.items():
         drone = drone_data["tello"]
+        telemetry = getattr(getattr(drone, "controller", None), "telemetry", None)
         try:
-            battery = drone.get_battery()
-            print(f"[OK] Дрон {ip} подключён, батарея: {battery}%")
+            if telemetry is None:
+                battery = drone.get_battery()
+                print(f"[OK] Дрон {ip} подключён, батарея: {battery}%")
+                continue
+            latest = telemetry.latest(drone.address[0])
+            if latest is None:
+                print(f"[Ошибка] Дрон {ip}: пакетов состояния ещё не было")
+                continue
+            print(f"[OK] Дрон {ip} подключён, батарея: {latest['bat']}%, высота: {latest['h']} см, "
+                  f"состояние {telemetry.age(drone.address[0]):.1f} с назад")
         except TelloException as e:
             print(f"[Ошибка] Проблема с дроном {ip}: {e}")
         except AttributeError:
@@ -34,51 +43,46 @@ def connect_all(drones_dict):
 
 def takeoff_all(drones_dict):
     """
-    Одновременный взлет всех дронов с использованием многопоточности.
+    Одновременный взлет всех дронов: через контроллер одним run(), обычные Tello — поток на дрон.
     """
-    threads = []
-    for name, drone_data in drones_dict.items():
-        ip = drone_data["ip"]
-        drone = drone_data["tello"]
-        thread = threading.Thread(target=try_takeoff, args=(ip, drone))
-        thread.start()
-        threads.append(thread)
-    for t in threads:
-        t.join()
+    for drone_data in drones_dict.values():
+        print(f"Дрон {drone_data['ip']} взлетает...")
+    results = run_on_all(drones_dict, lambda name: ["takeoff"]).result()
+    report_errors(drones_dict, results, "не смог взлететь")
+    mark_flying(drones_dict, results, True)
     time.sleep(FORMATION_PARAMS["hover_after_takeoff"])
 
 
-def try_takeoff(ip, drone):
-    try:
-        print(f"Дрон {ip} взлетает...")
-        drone.takeoff()
-    except TelloException as e:
-        print(f"[Ошибка] Дрон {ip} не смог взлететь: {e}")
-
-
 def land_all(drones_dict):
     """
     Одновременная посадка всех дронов.
     """
     time.sleep(5)
     time.sleep(FORMATION_PARAMS["hover_after_land"])
-    threads = []
-    for name, drone_data in drones_dict.items():
-        ip = drone_data["ip"]
-        drone = drone_data["tello"]
-        thread = threading.Thread(target=try_land, args=(ip, drone))
-        thread.start()
-        threads.append(thread)
-    for t in threads:
-        t.join()
+    for drone_data in drones_dict.values():
+        print(f"Дрон {drone_data['ip']} садится...")
+    results = run_on_all(drones_dict, lambda name: ["land"]).result()
+    report_errors(drones_dict, results, "не смог приземлиться")
+    mark_flying(drones_dict, results, False)
 
 
-def try_land(ip, drone):
-    try:
-        print(f"Дрон {ip} садится...")
-        drone.land()
-    except TelloException as e:
-        print(f"[Ошибка] Дрон {ip} не смог приземлиться: {e}")
+def mark_flying(drones_dict, results, flying):
+    """
+    Сырые takeoff/land идут мимо Tello.takeoff()/land(), поэтому is_flying обычного Tello
+    выставляем сами. У ControlledTello флаг и так следует за контроллером.
+    """
+    for name, result in results.items():
+        if not isinstance(result, Exception):
+            drones_dict[name]["tello"].is_flying = flying
+
+
+def report_errors(drones_dict, results, failure):
+    """
+    Печать ошибок из итога run_on_all: {имя: [ответы] или исключение}.
+    """
+    for name, result in results.items():
+        if isinstance(result, Exception):
+            print(f"[Ошибка] Дрон {drones_dict[name]['ip']} {failure}: {result}")
 
 
 def send_all_to_v_formation(drones_dict):
@@ -117,33 +121,14 @@ def send_all_to_v_formation(drones_dict):
         drone_names_ordered[2]: right_pos,  # Правый
     }
 
-    threads = []
-    for i, name in enumerate(drone_names_ordered):
-        drone_data = drones_dict[name]
-        drone = drone_data["tello"]
-        ip = drone_data["ip"]
-
-
-
+    # Все дроны — одним вызовом: через SwarmController это один event loop, без потока на дрон
+    def commands(name):
         x, y, z = positions[name]
+        print(f"Дрон {drones_dict[name]['ip']} перемещается к x={int(x)}, y={int(y)}, z={int(z)}")
+        sequence = ["go 1 1 1 1"] if name == drone_names_ordered[0] else []
+        return sequence + [f"go {int(x)} {int(y)} {int(z)} {move_speed}"]
 
-
-
-        def move(drone_obj, x_coord, y_coord, z_coord, drone_ip):
-            try:
-                if i == 0:
-                    drone_obj.go_xyz_speed(int(1), int(1), int(1), 1)
-                print(f"Дрон {drone_ip} перемещается к x={int(x_coord)}, y={int(y_coord)}, z={int(z_coord)}")
-                drone_obj.go_xyz_speed(int(x_coord), int(y_coord), int(z_coord), move_speed)
-            except TelloException as e:
-                print(f"[Ошибка] Дрон {drone_ip} не смог переместиться: {e}")
-
-        thread = threading.Thread(target=move, args=(drone, x, y, z, ip))
-        thread.start()
-        threads.append(thread)
-
-    for t in threads:
-        t.join()
+    report_errors(drones_dict, run_on_all(drones_dict, commands).result(), "не смог переместиться")
 
     print(
         f"V-формация завершена: угол {angle_deg}°, основание {distance} см, расстояние между боковыми после разлёта {dist_after:.1f} см, направление: {spread_dir}")
@@ -0,0 +1,279 @@
+#Сопоставление распознанной фразы с командами и именами дронов по заранее построенному индексу.
+
+import bisect
+import copy
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+from fuzzywuzzy import fuzz, utils
+from rapidfuzz import fuzz as rf_fuzz
+from rapidfuzz import process
+from rich import print
+
+NGRAM = 3
+SEED_CANDIDATES = 8  # сколько фраз с наибольшим числом общих n-грамм проверяем сразу
+SEED_POSTINGS = 1500  # сколько записей индекса просматриваем, начиная с самых редких n-грамм
+DRONE_THRESHOLD = 75
+
+
+def ngrams(text, n=NGRAM):
+    padded = f" {text} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+class CommandMatcher:
+    """
+    Строится один раз при запуске из commands.yaml и списка дронов.
+
+    match() возвращает ту же команду и тот же процент, что и полный перебор
+    fuzz.ratio в VAResponder._recognize_cmd (при равенстве — первая по порядку
+    фраза). Полный перебор заменён отсечением:
+      1. точное совпадение — сразу 100;
+      2. по инвертированному индексу n-грамм (numpy.bincount по спискам фраз)
+         берутся фразы с наибольшим числом общих n-грамм, их точная оценка даёт
+         нижнюю границу лучшего результата;
+      3. фразы, у которых даже при полном совпадении оценка ниже границы
+         (слишком короткие или длинные), не рассматриваются;
+      4. из оставшихся отбрасываются те, где общих букв (по счётчикам букв,
+         numpy по всем фразам сразу, только по буквам из фразы) слишком мало
+         для такой оценки;
+      5. остальные оцениваются rapidfuzz в C, а финальный процент для
+         кандидатов выше границы считает fuzzywuzzy, как и раньше.
+    """
+
+    def __init__(self, va_cmd_list, drone_names=()):
+        self._build_commands(va_cmd_list)
+        self._build_drones(drone_names)
+
+    def replace(self, va_cmd_list=None, drone_names=None):
+        """
+        Новый сопоставитель, где перестроена только изменившаяся часть:
+        команды или дроны. Старый объект не меняется, его можно продолжать
+        использовать, пока новый не подставлен вместо него.
+        """
+        matcher = copy.copy(self)
+        if va_cmd_list is not None:
+            matcher._build_commands(va_cmd_list)
+        if drone_names is not None:
+            matcher._build_drones(drone_names)
+        return matcher
+
+    def _build_commands(self, va_cmd_list):
+        self.choices = []
+        self.commands = []
+        self.exact = {}
+        for cmd, phrases in va_cmd_list.items():
+            for phrase in phrases:
+                self.exact.setdefault(phrase, len(self.choices))
+                self.choices.append(phrase)
+                self.commands.append(cmd)
+
+        index = defaultdict(list)
+        for i, phrase in enumerate(self.choices):
+            for gram in ngrams(phrase):
+                index[gram].append(i)
+        self._index = {gram: np.array(ids, dtype=np.int32) for gram, ids in index.items()}
+
+        # Фразы, упорядоченные по длине: диапазон длин — это срез списка
+        order = sorted(range(len(self.choices)), key=lambda i: (len(self.choices[i]), i))
+        self._by_length = np.array([self.choices[i] for i in order], dtype=object)
+        self._by_length_ids = order
+        self._lengths = [len(self.choices[i]) for i in order]
+        self._length_array = np.array(self._lengths, dtype=np.int32)
+
+        # Счётчики букв каждой фразы: общая подпоследовательность не длиннее суммы минимумов.
+        # Строка массива — одна буква по всем фразам, чтобы брать только буквы запроса
+        self._alphabet = {c: i for i, c in enumerate(sorted({c for phrase in self.choices for c in phrase}))}
+        self._letters = np.zeros((len(self._alphabet), len(order)), dtype=np.uint16)
+        for row, phrase in enumerate(self._by_length):
+            for c in phrase:
+                self._letters[self._alphabet[c], row] += 1
+
+    def _build_drones(self, drone_names):
+        self.drone_names = list(drone_names)
+        self._drone_processed = [utils.full_process(name, force_ascii=True) for name in self.drone_names]
+        self._drone_tokens = [set(name.split()) for name in self._drone_processed]
+
+    def _length_slice(self, length, score):
+        """Фразы, которые по длине могут дать оценку не ниже score."""
+        if score <= 0:
+            return 0, len(self._lengths)
+        # 2*LCS/(l1+l2) <= 2*min(l1,l2)/(l1+l2)
+        lo = score * length / (200 - score)
+        hi = length * (200 - score) / score
+        start = bisect.bisect_left(self._lengths, lo)
+        end = bisect.bisect_right(self._lengths, hi)
+        return start, end
+
+    def _seed(self, cmd):
+        # Частые n-граммы (« в », «ть ») почти ничего не отсекают — берём сначала редкие
+        postings = sorted((self._index[gram] for gram in ngrams(cmd) if gram in self._index), key=len)
+        taken = []
+        budget = SEED_POSTINGS
+        for ids in postings:
+            if budget <= 0:
+                break
+            taken.append(ids)
+            budget -= len(ids)
+        if not taken:
+            return None, 0
+        counts = np.bincount(np.concatenate(taken), minlength=len(self.choices))
+        k = min(SEED_CANDIDATES, len(counts))
+        best_i, best_score = None, 0
+        for i in sorted(np.argpartition(-counts, k - 1)[:k].tolist()):
+            if counts[i] == 0:
+                continue
+            score = fuzz.ratio(cmd, self.choices[i])
+            if score > best_score:  # индексы по возрастанию: при равенстве остаётся первая фраза
+                best_i, best_score = i, score
+        return best_i, best_score
+
+    def match(self, cmd: str) -> dict:
+        rc = {'cmd': '', 'percent': 0}
+        if not self.choices or not cmd:
+            return rc  # fuzz.ratio с пустой строкой всегда 0
+
+        exact = self.exact.get(cmd)
+        if exact is not None:
+            return {'cmd': self.commands[exact], 'percent': 100}
+
+        best_i, best_score = self._seed(cmd)
+
+        # Целый процент fuzzywuzzy >= best_score значит оценка rapidfuzz >= best_score - 0.5
+        cutoff = max(best_score - 1, 0)
+        start, end = self._length_slice(len(cmd), cutoff)
+
+        letters = Counter()
+        for c in cmd:
+            i = self._alphabet.get(c)
+            if i is not None:  # буквы, которой нет ни в одной фразе, не совпадут ни с чем
+                letters[i] += 1
+        common = np.zeros(end - start, dtype=np.int32)
+        for i, count in letters.items():
+            common += np.minimum(self._letters[i, start:end], count)
+        bound = common * 200 / (len(cmd) + self._length_array[start:end])
+        rows = np.flatnonzero(bound >= cutoff) + start
+
+        candidates = process.extract(cmd, self._by_length[rows].tolist(), scorer=rf_fuzz.ratio,
+                                     score_cutoff=cutoff, limit=None)
+        rows = rows.tolist()
+
+        for _, rf_score, pos in candidates:  # по убыванию оценки rapidfuzz
+            if rf_score < best_score - 1:
+                break
+            i = self._by_length_ids[rows[pos]]
+            score = fuzz.ratio(cmd, self.choices[i])
+            if score > best_score or (score == best_score and (best_i is None or i < best_i)):
+                best_i, best_score = i, score
+
+        if best_i is None or best_score == 0:
+            return rc
+        return {'cmd': self.commands[best_i], 'percent': best_score}
+
+    def match_drone(self, voice: str):
+        """
+        Первый по порядку дрон, чьё имя совпадает с фразой (token_set_ratio > 75),
+        или None — как цикл по DRONE_IPS в VAResponder.respond.
+        """
+        if not self.drone_names:
+            return None
+        processed = utils.full_process(voice, force_ascii=True)
+        if not processed:
+            return None
+
+        tokens = set(processed.split())
+        for i, name_tokens in enumerate(self._drone_tokens):
+            if name_tokens and name_tokens <= tokens:
+                first_subset = i  # имя целиком во фразе — 100
+                break
+        else:
+            first_subset = len(self.drone_names)
+
+        # Дроны до first_subset проверяем только если rapidfuzz допускает совпадение
+        candidates = process.extract(processed, self._drone_processed[:first_subset],
+                                     scorer=rf_fuzz.token_set_ratio, processor=None,
+                                     score_cutoff=DRONE_THRESHOLD - 1, limit=None)
+        for i in sorted(pos for _, _, pos in candidates):
+            if fuzz.token_set_ratio(voice, self.drone_names[i]) > DRONE_THRESHOLD:
+                return self.drone_names[i]
+
+        if first_subset < len(self.drone_names):
+            return self.drone_names[first_subset]
+        return None
+
+
+def _naive_match(va_cmd_list, cmd):
+    rc = {'cmd': '', 'percent': 0}
+    for c, v_list in va_cmd_list.items():
+        for x in v_list:
+            vrt = fuzz.ratio(cmd, x)
+            if vrt > rc['percent']:
+                rc['cmd'] = c
+                rc['percent'] = vrt
+    return rc
+
+
+def _naive_drone(drone_names, voice):
+    for drone_name in drone_names:
+        if fuzz.token_set_ratio(voice, drone_name) > DRONE_THRESHOLD:
+            return drone_name
+    return None
+
+
+def _benchmark(commands_path="commands.yaml", phrases=10000, drones=100, queries=300):
+    import yaml
+
+    with open(commands_path, "rt", encoding="utf8") as f:
+        base = yaml.safe_load(f)
+
+    rnd = random.Random(0)
+    words = sorted({w for v_list in base.values() for x in v_list for w in x.split()})
+    va_cmd_list = {cmd: list(v_list) for cmd, v_list in base.items()}
+    n = sum(len(v) for v in va_cmd_list.values())
+    while n < phrases:
+        cmd = f"cmd_{n // 20}"
+        va_cmd_list.setdefault(cmd, []).append(" ".join(rnd.sample(words, rnd.randint(1, 4))))
+        n += 1
+
+    syllables = ["ра", "до", "ми", "ко", "ле", "ни", "та", "вы", "зо", "пу"]
+    drone_names = list(dict.fromkeys("".join(rnd.choices(syllables, k=3)) for _ in range(drones * 2)))[:drones]
+    drone_names[:3] = ["первый", "второй", "третий"]
+
+    def mutate(text):
+        chars = list(text)
+        for _ in range(rnd.randint(0, 3)):
+            if chars:
+                chars[rnd.randrange(len(chars))] = rnd.choice("абвгдеёжзиклмнопрстуфхцчшщыэюя ")
+        return "".join(chars)
+
+    all_phrases = [x for v_list in va_cmd_list.values() for x in v_list]
+    cmd_queries = [mutate(rnd.choice(all_phrases)) for _ in range(queries)]
+    drone_queries = [f"{mutate(rnd.choice(drone_names))} {rnd.choice(['вперёд', 'наверх', 'стоп'])}"
+                     for _ in range(queries)]
+
+    started = time.perf_counter()
+    matcher = CommandMatcher(va_cmd_list, drone_names)
+    build = time.perf_counter() - started
+
+    def timed(fn, items):
+        started = time.perf_counter()
+        results = [fn(q) for q in items]
+        return results, (time.perf_counter() - started) / len(items) * 1000
+
+    naive_cmd, naive_cmd_ms = timed(lambda q: _naive_match(va_cmd_list, q), cmd_queries)
+    fast_cmd, fast_cmd_ms = timed(matcher.match, cmd_queries)
+    naive_drone, naive_drone_ms = timed(lambda q: _naive_drone(drone_names, q), drone_queries)
+    fast_drone, fast_drone_ms = timed(matcher.match_drone, drone_queries)
+
+    print(f"Фраз: {len(all_phrases)}, дронов: {len(drone_names)}, индекс построен за {build * 1000:.0f} мс")
+    print(f"Команды: перебор {naive_cmd_ms:.2f} мс, индекс {fast_cmd_ms:.3f} мс на фразу, "
+          f"совпадений {sum(a == b for a, b in zip(naive_cmd, fast_cmd))}/{queries}")
+    print(f"Дроны:   перебор {naive_drone_ms:.2f} мс, индекс {fast_drone_ms:.3f} мс на фразу, "
+          f"совпадений {sum(a == b for a, b in zip(naive_drone, fast_drone))}/{queries}")
+
+
+if __name__ == "__main__":
+    _benchmark(*sys.argv[1:2])
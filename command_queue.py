@@ -0,0 +1,200 @@
+#Очередь команд одного дрона для SwarmController: посадка и emergency обгоняют очередь,
+#одинаковые перемещения подряд склеиваются в одно (не больше предела SDK), время ожидания и глубина считаются.
+
+from collections import deque
+
+try:
+    from djitellopy import TelloException
+except ImportError:
+    # Сама очередь djitellopy не использует: без него её можно проверить и в тестах.
+    # SwarmController импортирует djitellopy и без него не запустится
+    TelloException = Exception
+
+from tracing import percentile
+
+URGENT = 0    # посадка и аварийная остановка: вперёд очереди, очередь управления сбрасывается
+ORDINARY = 1  # всё остальное — строго по порядку
+URGENT_COMMANDS = ('emergency', 'land', 'stop')
+
+# Команды, которые можно сложить с такой же последней в очереди, и предел Tello SDK для суммы.
+# Сумма больше предела не склеивается: команды уходят дрону по отдельности
+COALESCE_LIMITS = {
+    'forward': 500, 'back': 500, 'left': 500, 'right': 500, 'up': 500, 'down': 500,
+    'cw': 360, 'ccw': 360,
+}
+WAIT_HISTORY = 1000  # последних ожиданий на класс для перцентилей
+
+
+class Preempted(TelloException):
+    """Команда снята из очереди срочной — повторять её не нужно."""
+
+
+class Entry:
+    def __init__(self, command, priority, future, queued_at, wall, timeout, trace_id, on_sent=None):
+        self.command = command
+        self.priority = priority
+        self.futures = [future]  # у склеенной команды — futures всех исходных
+        self.on_sent = [on_sent] if on_sent is not None else []  # on_sent(время отправки) всех исходных
+        self.queued_at = queued_at
+        self.wall = wall
+        self.timeout = timeout  # у склеенной — сумма таймаутов: дрон летит дольше
+        self.trace_id = trace_id
+
+
+class CommandQueue:
+    """
+    Порядок выдачи: сначала срочные (URGENT_COMMANDS), затем обычные, внутри
+    класса — FIFO. Срочная команда снимает из очереди все ждущие команды
+    управления, запросы («...?») остаются. Поэтому посадка ждёт не дольше
+    одной команды в полёте, сколько бы ни стояло в очереди. «forward 30»
+    за «forward 40» превращается в «forward 70» с суммой их таймаутов, оба
+    вызова получают один ответ; «forward 300» за «forward 300» остаются двумя
+    командами — 600 см больше предела Tello SDK.
+    Не потокобезопасна: используется только на event loop контроллера.
+    """
+
+    def __init__(self):
+        self._urgent = deque()
+        self._ordinary = deque()
+        self.max_depth = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.preempted = 0
+        self.waits = {URGENT: deque(maxlen=WAIT_HISTORY), ORDINARY: deque(maxlen=WAIT_HISTORY)}
+
+    def __len__(self):
+        return len(self._urgent) + len(self._ordinary)
+
+    def push(self, command, future, queued_at, wall=0.0, timeout=None, trace_id=None, on_sent=None):
+        """
+        Ставит команду в очередь. Возвращает снятые ею записи — их futures должен завершить вызывающий.
+        on_sent(time.monotonic()) вызовет тот, кто отправит команду дрону.
+        """
+        priority = URGENT if command in URGENT_COMMANDS else ORDINARY
+        dropped = []
+        if priority == URGENT:
+            dropped = self.preempt()
+        elif self._coalesce(command, future, timeout, on_sent):
+            return dropped
+
+        entry = Entry(command, priority, future, queued_at, wall, timeout, trace_id, on_sent)
+        (self._urgent if priority == URGENT else self._ordinary).append(entry)
+        self.max_depth = max(self.max_depth, len(self))
+        return dropped
+
+    def preempt(self):
+        """Снимает все ждущие команды управления; запросы состояния остаются в очереди."""
+        dropped = [entry for entry in self._ordinary if not entry.command.endswith('?')]
+        if dropped:
+            self._ordinary = deque(entry for entry in self._ordinary if entry.command.endswith('?'))
+            self.preempted += sum(len(entry.futures) for entry in dropped)
+        return dropped
+
+    def _coalesce(self, command, future, timeout, on_sent):
+        if not self._ordinary:
+            return False
+        last = self._ordinary[-1]
+        if command.endswith('?') and command == last.command:
+            last.futures.append(future)  # тот же запрос уже ждёт — ответ один на двоих
+            if on_sent is not None:
+                last.on_sent.append(on_sent)
+            self.coalesced += 1
+            return True
+
+        verb, _, value = command.partition(' ')
+        last_verb, _, last_value = last.command.partition(' ')
+        limit = COALESCE_LIMITS.get(verb)
+        if limit is None or verb != last_verb or not value.isdigit() or not last_value.isdigit():
+            return False
+        total = int(value) + int(last_value)
+        if total > limit:
+            return False
+        last.command = f"{verb} {total}"
+        if last.timeout is not None and timeout is not None:
+            last.timeout += timeout
+        last.futures.append(future)
+        if on_sent is not None:
+            last.on_sent.append(on_sent)
+        self.coalesced += 1
+        return True
+
+    def pop(self, now):
+        entry = (self._urgent or self._ordinary).popleft()
+        self.waits[entry.priority].append(now - entry.queued_at)
+        self.sent += 1
+        return entry
+
+    def stats(self):
+        def wait_ms(priority, q):
+            return round(percentile(self.waits[priority], q) * 1000, 1)
+
+        return {
+            "depth": len(self),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "preempted": self.preempted,
+            "wait_p50_ms": wait_ms(ORDINARY, 0.5),
+            "wait_p95_ms": wait_ms(ORDINARY, 0.95),
+            "urgent_wait_p95_ms": wait_ms(URGENT, 0.95),
+        }
+
+
+def _benchmark(move_s=0.2, depths=(0, 5, 20)):
+    """
+    Имитатор Tello на 127.0.0.2: перемещение отвечает «ok» через move_s, остальное — сразу.
+    Задержка посадки при разной глубине очереди перемещений и склейка одинаковых команд до предела SDK.
+    """
+    import asyncio
+    import socket
+    import threading
+    import time
+
+    from rich import print
+
+    from command_queue import Preempted  # при запуске файлом этот модуль — __main__, а контроллер бросает этот класс
+    from swarm_controller import CONTROL_PORT, SwarmController
+
+    host = "127.0.0.2"
+    received = []
+
+    def fake_drone():
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((host, CONTROL_PORT))
+        while True:
+            data, addr = sock.recvfrom(1024)
+            command = data.decode()
+            received.append(command)
+            if command.partition(" ")[0] in COALESCE_LIMITS:
+                time.sleep(move_s)
+            sock.sendto(b"ok", addr)
+
+    threading.Thread(target=fake_drone, daemon=True).start()
+    time.sleep(0.1)
+    controller = SwarmController(bind_host="127.0.0.1").start()
+
+    def submit(command):
+        return asyncio.run_coroutine_threadsafe(controller.command(host, command), controller._loop)
+
+    for depth in depths:
+        moves = [submit("forward 20" if i % 2 == 0 else "back 20") for i in range(depth + 1)]
+        time.sleep(0.15)  # после паузы MIN_GAP_S первое перемещение уже в полёте
+        started = time.perf_counter()
+        submit("land").result()
+        landed = time.perf_counter() - started
+        dropped = sum(isinstance(move.exception(), Preempted) for move in moves)
+        print(f"в очереди {depth:2d} перемещений: посадка за {landed * 1000:4.0f} мс "
+              f"(по порядку было бы {(depth + 1) * move_s * 1000:4.0f} мс), снято {dropped}")
+
+    for step in (20, 200):
+        received.clear()
+        moves = [submit(f"forward {step}") for _ in range(10)]
+        for move in moves:
+            move.result()
+        print(f"10 × 'forward {step}': дрону ушло {received}")
+    print(f"статистика: {controller.stats()[host]}")
+    controller.stop()
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -19,3 +19,80 @@ PICOVOICE_TOKEN = os.getenv('PICOVOICE_TOKEN')
 
 # Токен OpenAI
 OPENAI_TOKEN = os.getenv('OPENAI_TOKEN')
+
+# Окно ожидания команды после активационного слова, секунд
+LISTEN_SECONDS = 10
+
+# Кольцевой буфер захвата звука: сколько секунд аудио держим, пока обрабатывается команда,
+# и что делать при переполнении: 'drop_oldest' (ограничить задержку) или 'drop_newest'
+AUDIO_RING_SECONDS = 5.0
+AUDIO_DROP_POLICY = 'drop_oldest'
+
+# Сколько миллисекунд звука до срабатывания «Джарвис» проигрывать в Vosk после активации.
+# При значении больше нуля приветствие не проигрывается: запись не прерывается, и команда, сказанная
+# на одном дыхании с «Джарвис», доходит до Vosk целиком. 0 — старое поведение (приветствие, затем команда).
+PREROLL_MS = 400
+
+# Отправлять «<дрон> стоп» по частичному результату Vosk, не дожидаясь конца фразы
+FAST_PATH = True
+
+# Распознавать по грамматике из commands.yaml и имён дронов (быстрее и точнее);
+# свободная речь включается только для фраз, начинающихся с «выполни»
+GRAMMAR_RECOGNIZER = True
+
+# Загружать Silero TTS и YOLO в фоне сразу после запуска микрофона.
+# False — загрузка при первом использовании
+WARM_UP_MODELS = True
+
+# Файлы, которые перечитываются на ходу без перезапуска ассистента:
+# голосовые команды и состав роя (имена дронов, IP и группы)
+COMMANDS_FILE = 'commands.yaml'
+DRONES_FILE = 'drones.yaml'
+HOT_RELOAD = True
+HOT_RELOAD_INTERVAL = 1.0  # как часто проверять время изменения файлов, секунд
+
+# Кэш кода, сгенерированного по «выполни ...»: повторная команда не ждёт LLM.
+# Записи старше LLM_CACHE_TTL_DAYS генерируются заново; сброс — «забудь последний код»,
+# «забудь весь код» или python llm_cache.py --clear
+LLM_CACHE = True
+LLM_CACHE_FILE = 'llm_cache.json'
+LLM_CACHE_ITEMS = 200
+LLM_CACHE_TTL_DAYS = 30
+
+# Код по командам «выполни ...» выполняется в заранее запущенном процессе с уже
+# импортированным djitellopy, а не в новом python на каждый скрипт; подключения к дронам остаются между скриптами.
+# Скрипт дольше SCRIPT_TIMEOUT секунд обрывается, дронам из SCRIPT_SWARM_IPS отправляется посадка;
+# то же по команде «отмени скрипт».
+# Этот процесс и drone_manager («дроны запуск») не могут управлять дронами одновременно — порты 8889/8890 одни:
+# после «дроны запуск» скрипты не запускаются, а сама она отклоняется, пока скрипт выполняется
+SCRIPT_EXECUTOR = True
+SCRIPT_TIMEOUT = 120
+SCRIPT_SWARM_IPS = ('192.168.0.120', '192.168.0.121')  # те же адреса, что в запросе к LLM
+
+# Ответ LLM приходит потоком; код запускается, как только в ответе закрылся блок ```python```.
+# LLM_CONNECT_TIMEOUT — на подключение, LLM_READ_TIMEOUT — наибольшая пауза между кусками ответа, с.
+# LLM_API_BASE = 'http://127.0.0.1:8765/v1' — работа с llm_stub_server.py без сети, None — OpenAI
+LLM_API_BASE = None
+LLM_CONNECT_TIMEOUT = 5
+LLM_READ_TIMEOUT = 20
+
+# История разговора с LLM не больше LLM_CONTEXT_BUDGET токенов вместе с ответом: последние
+# LLM_KEEP_TURNS реплик уходят целиком, более старые — сжатой сводкой
+LLM_CONTEXT_BUDGET = 3000
+LLM_KEEP_TURNS = 4
+
+# По командам «выполни ...» LLM составляет JSON-план полёта (flight_plan.py), а не Python-код:
+# план проверяется по схеме и выполняется сразу на подключённых дронах. False — прежний Python-код через SCRIPT_EXECUTOR
+FLIGHT_PLANS = True
+
+# Трассировка задержек: активационное слово, приветствие, Vosk, разбор команды, потоки дронов,
+# команды djitellopy. Пишется строками JSON в TRACE_FILE; сводка — python tracing.py
+TRACE = False
+TRACE_FILE = 'traces.jsonl'
+
+# «Дроны запуск» подключает все дроны одновременно; не ответивший за столько секунд считается неподключённым
+DRONE_CONNECT_TIMEOUT = 8
+
+# Команды и состояние всех дронов — через один event loop (swarm_controller.py), а не поток на команду.
+# Контроллер занимает UDP-порты 8889/8890: обычный djitellopy.Tello в этом же процессе с ним не уживётся
+SWARM_CONTROLLER = True
@@ -0,0 +1,128 @@
+#Память разговора с ЯМ в пределах бюджета токенов: системное сообщение, сводка старых реплик
+#и последние реплики целиком. Размер запроса не растёт с длиной сессии.
+
+import re
+import threading
+
+from rich import print
+
+MESSAGE_OVERHEAD = 4  # служебные токены на каждое сообщение (роль, разделители)
+
+
+def count_tokens(text):
+    """
+    Оценка сверху без токенизатора: латиница и код — около 4 символов на токен,
+    кириллица — около 2.
+    """
+    ascii_chars = len(re.sub(r"[^\x00-\x7f]", "", text))
+    return ascii_chars // 4 + (len(text) - ascii_chars) // 2 + 1
+
+
+def brief(turns, limit=120):
+    """Сводка без ЯМ: начало каждой реплики. Ею память держит бюджет, пока ЯМ пишет настоящую."""
+    lines = []
+    for turn in turns:
+        text = " ".join(turn["content"].split())
+        lines.append(f"{turn['role']}: {text[:limit]}{'…' if len(text) > limit else ''}")
+    return "\n".join(lines)
+
+
+class ConversationMemory:
+    """
+    Реплики хранятся вместе с их оценкой в токенах. Когда всё вместе больше
+    budget, старые реплики (кроме последних keep_turns) уходят в сводку:
+    сразу — в короткую выжимку, а если задан summarize(сводка, реплики),
+    то в фоне ЯМ переписывает её в связный текст. Сводка не длиннее
+    summary_tokens, поэтому запрос всегда укладывается в бюджет.
+    """
+
+    def __init__(self, system_message, budget=3000, keep_turns=4, summary_tokens=300, summarize=None):
+        self.system_message = system_message
+        self.budget = budget
+        self.keep_turns = keep_turns
+        self.summary_tokens = summary_tokens
+        self.summarize = summarize
+        self.summary = ""
+        self._turns = []       # [(сообщение, токены)]
+        self._generation = 0   # растёт при каждом сжатии — фоновая сводка к устаревшему не применяется
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cost(message):
+        return count_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+    def append(self, role, content):
+        message = {"role": role, "content": content}
+        with self._lock:
+            self._turns.append((message, self._cost(message)))
+            self._compact()
+
+    def messages(self):
+        with self._lock:
+            result = [self.system_message]
+            if self.summary:
+                result.append({"role": "system", "content": f"Кратко о предыдущем разговоре:\n{self.summary}"})
+            result.extend(message for message, _ in self._turns)
+            return result
+
+    def tokens(self):
+        with self._lock:
+            return self._total()
+
+    def clear(self, keep_last=False):
+        """keep_last — оставить только последнюю реплику (контекст не влез в модель)."""
+        with self._lock:
+            self._turns = self._turns[-1:] if keep_last else []
+            self.summary = ""
+            self._generation += 1
+
+    def _total(self):
+        total = self._cost(self.system_message) + sum(cost for _, cost in self._turns)
+        if self.summary:
+            total += count_tokens(self.summary) + MESSAGE_OVERHEAD
+        return total
+
+    def _trim_summary(self, text):
+        # Новое — в конце сводки; если она длиннее лимита, отрезаем самое старое
+        while text and count_tokens(text) > self.summary_tokens:
+            text = text[len(text) // 4:].lstrip()
+        return text
+
+    def _compact(self):
+        if self._total() <= self.budget:
+            return
+
+        # Сжимаем с запасом до половины бюджета, чтобы не сжимать на каждой реплике
+        room = self.budget // 2 - self._cost(self.system_message) - self.summary_tokens - MESSAGE_OVERHEAD
+        keep, used = len(self._turns), 0
+        while keep > 0:
+            cost = self._turns[keep - 1][1]
+            if len(self._turns) - keep >= self.keep_turns and used + cost > room:
+                break
+            used += cost
+            keep -= 1
+        old = [message for message, _ in self._turns[:keep]]
+        self._turns = self._turns[keep:]
+
+        # Последние реплики сами не влезли в бюджет — отбрасываем старейшие из них, последнюю оставляем
+        while len(self._turns) > 1 and self._total() > self.budget:
+            old.append(self._turns.pop(0)[0])
+
+        if not old:
+            return
+        previous = self.summary
+        self.summary = self._trim_summary(f"{previous}\n{brief(old)}".strip())
+        self._generation += 1
+        if self.summarize is not None:
+            threading.Thread(target=self._refine, args=(previous, old, self._generation),
+                             name="memory-summary", daemon=True).start()
+
+    def _refine(self, previous, turns, generation):
+        try:
+            summary = self.summarize(previous, turns)
+        except Exception as e:
+            print(f"⚠️ Сводка разговора не получена, остаётся краткая выжимка: {e}")
+            return
+        with self._lock:
+            if summary and generation == self._generation:
+                self.summary = self._trim_summary(summary.strip())
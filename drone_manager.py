@@ -2,15 +2,29 @@
 #Этот модуль инкапсулирует логику подключения, отключения и выполнения команд для дронов.
 
 from djitellopy import Tello
-from drone_utils import keep_alive
+from drone_utils import keep_alive, stop_keep_alive
+import os
+import queue
 import threading
+import time
+import yaml
 import config
 from rich import print
 from bottle_tracker import start_bottle_tracking
+from intent_parser import ALL_WORDS, MOVES, IntentParser, command_phrases
+from swarm_controller import ControlledTello, SwarmController, run_on_all
+from tracing import instrument_tello, tracer
+
+if config.TRACE:
+    instrument_tello(Tello)  # span на каждую команду дрону и её ответ
 
 drones = {}
 
-#Списки дронов
+#Сокеты и таймеры всего роя на одном event loop (swarm_controller.py); поднимается при первом подключении
+controller = None
+
+#Списки дронов. Если есть config.DRONES_FILE (drones.yaml), состав роя и группы
+#берутся из него и перечитываются без перезапуска (см. hot_reload.py)
 DRONE_IPS = {
     'первый': '192.168.0.120',
     #'второй': '192.168.0.121',
@@ -18,6 +32,12 @@ DRONE_IPS = {
     #'четвертый': '192.168.0.184'
 }
 
+#Группы дронов: одно слово в команде вместо нескольких имён («пара вперёд»).
+#«все»/«всем» — весь список DRONE_IPS, её задавать не нужно
+DRONE_GROUPS = {
+    #'пара': ('первый', 'второй'),
+}
+
 #Списки классов объектов
 CLASS_NAMES = {
     "бутылку": 39,
@@ -26,22 +46,138 @@ CLASS_NAMES = {
     "собаку": 16,    # пример
 }
 
-# Функция для инициализации подключений к дронам
-def initialize_drones():
-    for name, ip in DRONE_IPS.items():
-        print(f"\n🔄 Подключаю {name} по IP {ip}...")
+#Голосовые команды дронов (см. execute_drone_command), из них же строится грамматика Vosk
+DRONE_COMMANDS = command_phrases()
+
+#Загрузка состава роя из файла: {'drones': {имя: IP}, 'groups': {группа: [имена]}}
+def load_roster(path):
+    with open(path, "rt", encoding="utf8") as f:
+        data = yaml.safe_load(f) or {}
+
+    ips = {str(name).lower(): str(ip) for name, ip in (data.get("drones") or {}).items()}
+    if not ips:
+        raise ValueError(f"в {path} нет ни одного дрона")
+
+    groups = {}
+    for group, members in (data.get("groups") or {}).items():
+        members = [str(name).lower() for name in members]
+        unknown = [name for name in members if name not in ips]
+        if unknown:
+            print(f"⚠️ Группа {group}: нет таких дронов {', '.join(unknown)}")
+        members = [name for name in members if name in ips]
+        if members:
+            groups[str(group).lower()] = tuple(members)
+    return ips, groups
+
+#Подмена состава роя: новый разборщик строится заранее, глобальные имена переприсваиваются целиком
+def apply_roster(ips, groups):
+    global DRONE_IPS, DRONE_GROUPS, DRONE_TARGETS, intent_parser
+    parser = IntentParser(ips, CLASS_NAMES, groups)
+    targets = tuple(ips) + ALL_WORDS + tuple(groups)
+    DRONE_IPS, DRONE_GROUPS, DRONE_TARGETS, intent_parser = dict(ips), dict(groups), targets, parser
+
+#Разбор фраз в намерения (intent_parser) и все слова, которыми можно обратиться к дронам:
+#имена, «все» и группы (DRONE_TARGETS, для грамматики Vosk)
+if os.path.isfile(config.DRONES_FILE):
+    apply_roster(*load_roster(config.DRONES_FILE))
+else:
+    apply_roster(DRONE_IPS, DRONE_GROUPS)
+
+#Допустимые значения Tello SDK и значения по умолчанию, если число не названо
+MOVE_RANGE_CM = (20, 500)
+ROTATE_RANGE_DEG = (1, 360)
+MOVE_DEFAULT_CM = 30
+ROTATE_DEFAULT_DEG = 90
+
+#Обработчики намерений: действие -> функция(drone_name, drone_data, intent)
+COMMAND_HANDLERS = {}
+
+def command_handler(*verbs):
+    def register(handler):
+        for verb in verbs:
+            COMMAND_HANDLERS[verb] = handler
+        return handler
+    return register
+
+def _clamp(value, limits, unit):
+    low, high = limits
+    clamped = int(round(min(max(value, low), high)))
+    if clamped != value:
+        print(f"⚠️ {value:g} {unit} вне диапазона Tello, используем {clamped} {unit}")
+    return clamped
+
+def _get_controller():
+    global controller
+    if controller is None and config.SWARM_CONTROLLER:
+        try:
+            controller = SwarmController().start()
+        except OSError as e:
+            print(f"⚠️ SwarmController не запущен, дроны без него: {e}")
+    return controller
+
+#Порты 8889/8890 заняты этим процессом: дроны уже подключались или поднят контроллер.
+#Тогда тёплый процесс script_executor не может подключить свои Tello
+def owns_drone_ports():
+    return controller is not None or bool(drones)
+
+#Подключение всех дронов из DRONE_IPS одновременно: недоступный дрон не задерживает остальных,
+#каждому даётся timeout секунд, о каждом сообщаем сразу, как только он готов или отказал
+def initialize_drones(on_progress=None, timeout=None):
+    """
+    on_progress(имя, подключён, сколько готово, всего) вызывается в потоке
+    вызывающего по мере подключения. Возвращает (подключённые, не подключённые).
+    """
+    timeout = config.DRONE_CONNECT_TIMEOUT if timeout is None else timeout
+    roster = dict(DRONE_IPS)
+    results = queue.Queue()
+    swarm = _get_controller()
+    started = time.perf_counter()
+
+    def connect(name, ip):
         try:
-            tello = Tello(host=ip)
+            tello = ControlledTello(swarm, ip) if swarm is not None else Tello(host=ip)
             tello.connect()
-            print(f"✅ {name} подключен успешно.")
+            results.put((name, ip, tello, None, time.perf_counter() - started))
+        except Exception as e:
+            results.put((name, ip, None, e, time.perf_counter() - started))
+
+    for name, ip in roster.items():
+        print(f"🔄 Подключаю {name} по IP {ip}...")
+        threading.Thread(target=connect, args=(name, ip), name=f"connect-{name}", daemon=True).start()
+
+    # Все стартовали одновременно, поэтому общий срок — это и срок каждого дрона
+    deadline = started + timeout
+    connected, failed = [], []
+    while len(connected) + len(failed) < len(roster):
+        try:
+            name, ip, tello, error, seconds = results.get(timeout=max(deadline - time.perf_counter(), 0))
+        except queue.Empty:
+            break
+        if error is None:
             drones[name] = {
                 "tello": tello,
                 "frame_reader": None,
                 "streaming": False,
                 "ip": ip
             }
-        except Exception as e:
-            print(f"❌ {name} не удалось подключить: {e}")
+            connected.append(name)
+            print(f"✅ {name} подключен успешно за {seconds:.1f} с.")
+        else:
+            failed.append(name)
+            print(f"❌ {name} не удалось подключить: {error}")
+        if on_progress:
+            on_progress(name, error is None, len(connected) + len(failed), len(roster))
+
+    # Не ответившие к сроку: их потоки доработают в фоне, но в drones они уже не попадут
+    for name in roster:
+        if name not in connected and name not in failed:
+            failed.append(name)
+            print(f"⏱ {name} не ответил за {timeout:g} с.")
+            if on_progress:
+                on_progress(name, False, len(connected) + len(failed), len(roster))
+
+    print(f"Подключено {len(connected)} из {len(roster)} за {time.perf_counter() - started:.1f} с")
+    return connected, failed
 
 # Функция для инициализации видео потока
 def start_video_stream(drone_name):
@@ -85,46 +221,141 @@ def stop_tracking():
         tracking_thread.join()
     tracking_thread = None
 
+@command_handler('stream_on')
+def _stream_on(drone_name, drone_data, intent):
+    start_video_stream(drone_name)
+
+@command_handler('stream_off')
+def _stream_off(drone_name, drone_data, intent):
+    stop_video_stream(drone_name)
+
+@command_handler('takeoff')
+def _takeoff(drone_name, drone_data, intent):
+    drone_data["tello"].takeoff()
+    keep_alive(drone_data["tello"])
+
+@command_handler('land')
+def _land(drone_name, drone_data, intent):
+    drone_data["tello"].land()
+    stop_keep_alive(drone_data["tello"])
+
+def _move_cm(intent):
+    return _clamp(MOVE_DEFAULT_CM if intent.value is None else intent.value, MOVE_RANGE_CM, "см")
+
+def _rotate_deg(intent):
+    return _clamp(ROTATE_DEFAULT_DEG if intent.value is None else intent.value, ROTATE_RANGE_DEG, "°")
+
+@command_handler(*MOVES)
+def _move(drone_name, drone_data, intent):
+    drone_data["tello"].move(intent.verb, _move_cm(intent))
+
+@command_handler('rotate_cw', 'rotate_ccw')
+def _rotate(drone_name, drone_data, intent):
+    angle = _rotate_deg(intent)
+    if intent.verb == 'rotate_cw':
+        drone_data["tello"].rotate_clockwise(angle)
+    else:
+        drone_data["tello"].rotate_counter_clockwise(angle)
+
+@command_handler('track')
+def _track(drone_name, drone_data, intent):
+    print(f"🎯 Команда: найди {intent.object_name} (class_id: {intent.object_class})")
+    start_bottle_tracking(drone_data["tello"], drone_data["frame_reader"], target_class_id=intent.object_class)
+
+#Команда Tello SDK для намерения — чтобы отправить её всем дронам через SwarmController;
+#None — действие не сводится к одной команде (видео, слежение) и идёт через обработчик
+def sdk_command(intent):
+    if intent.verb in ('takeoff', 'land'):
+        return intent.verb
+    if intent.verb in MOVES:
+        return f"{intent.verb} {_move_cm(intent)}"
+    if intent.verb in ('rotate_cw', 'rotate_ccw'):
+        return f"{'cw' if intent.verb == 'rotate_cw' else 'ccw'} {_rotate_deg(intent)}"
+    return None
+
 #Выполнение команд дрона
-def execute_drone_command(drone_name, command):
-    if drone_name not in drones:
+def execute_drone_command(drone_name, command, on_sent=None):
+    # drone_name может быть и «все», и группой — parse раскроет её в имена
+    return execute_intent(intent_parser.parse(f"{drone_name} {command}"), on_sent=on_sent)
+
+#Одна команда сразу нескольким дронам: через SwarmController — одной отправкой на его event loop,
+#иначе потоки стартуют одновременно; итог печатается по каждому.
+#on_sent(имя, time.monotonic()) — когда команда ушла дрону, а не когда она поставлена в очередь
+def execute_intent(intent, on_sent=None):
+    targets = [name for name in intent.targets if name in drones]
+    missing = [name for name in intent.targets if name not in drones]
+    if not targets:
         return "Дрон не найден."
 
-    drone_data = drones[drone_name]
-    tello = drone_data["tello"]
-    frame_reader = drone_data["frame_reader"]
-
-    # 👉 Проверка: это команда слежения?
-    for word, class_id in CLASS_NAMES.items():
-        if f"найди {word}" in command:
-            print(f"🎯 Команда: найди {word} (class_id: {class_id})")
-            threading.Thread(
-                target=start_bottle_tracking,
-                args=(tello, frame_reader),
-                kwargs={"target_class_id": class_id},
-                daemon=True
-            ).start()
-            return
+    handler = COMMAND_HANDLERS.get(intent.verb)
+    if handler is None or (intent.verb == 'track' and intent.object_class is None):
+        print(f"⚠️ Неизвестная команда: {intent.text}")
+        return
+
+    command = sdk_command(intent) if controller is not None else None
+    if command is not None:
+        _execute_via_controller(intent, targets, command, on_sent)
+        return f"Не подключены: {', '.join(missing)}." if missing else None
+
+    # Потоки ждут друг друга на барьере, чтобы команда ушла всем дронам почти в один момент
+    barrier = threading.Barrier(len(targets))
+    started = {}
+    trace_id, queued_wall, queued = tracer.current, time.time(), time.perf_counter()
 
-    # 👉 Обычные команды — через поток
-    def run_command():
+    # 👉 Команды — через поток, чтобы не задерживать распознавание
+    def run_command(drone_name):
+        tracer.record("thread_start", queued_wall, time.perf_counter() - queued, trace_id, drone=drone_name)
         try:
-            if command == 'включи поток':
-                start_video_stream(drone_name)
-            elif command == 'отключи поток':
-                stop_video_stream(drone_name)
-            elif command == 'наверх':
-                tello.takeoff()
-                keep_alive(tello)
-            elif command == 'стоп':
-                tello.land()
-            elif command == 'вперёд':
-                tello.move_forward(30)
-            elif command == 'поворот':
-                tello.rotate_clockwise(90)
-            else:
-                print("⚠️ Неизвестная команда")
+            barrier.wait(timeout=1.0)
+        except threading.BrokenBarrierError:
+            pass
+        started[drone_name] = time.perf_counter()
+        if on_sent is not None:
+            on_sent(drone_name, time.monotonic())  # обработчик сразу вызывает djitellopy
+        try:
+            with tracer.bind(trace_id), tracer.span("drone_command", drone=drone_name, verb=intent.verb):
+                handler(drone_name, drones[drone_name], intent)
+            print(f"✅ {drone_name}: '{intent.text}' выполнено за {time.perf_counter() - started[drone_name]:.1f} с")
         except Exception as e:
-            print(f"Ошибка при выполнении команды '{command}': {e}")
+            print(f"❌ {drone_name}: ошибка при выполнении команды '{intent.text}': {e}")
+
+    threads = [threading.Thread(target=run_command, args=(name,), daemon=True) for name in targets]
+    for thread in threads:
+        thread.start()
+
+    if len(threads) > 1:
+        def report():
+            for thread in threads:
+                thread.join()
+            spread = max(started.values()) - min(started.values())
+            print(f"📡 '{intent.text}': {len(started)} дронов, разброс старта {spread * 1000:.1f} мс")
+
+        threading.Thread(target=report, daemon=True).start()
+
+    if missing:
+        return f"Не подключены: {', '.join(missing)}."
+
+def _execute_via_controller(intent, targets, command, on_sent=None):
+    # Время каждого дрона — от ухода его пакета до его ответа, а не общее от постановки в очередь
+    sent, done = {}, {}
+
+    def mark_sent(drone_name, sent_at):
+        sent.setdefault(drone_name, sent_at)  # повтор по таймауту не сдвигает старт
+        if on_sent is not None:
+            on_sent(drone_name, sent_at)
+
+    def report(future):
+        if future.exception() is not None:
+            print(f"❌ '{intent.text}': контроллер не выполнил команду: {future.exception()}")
+            return
+        for drone_name, result in future.result().items():
+            if isinstance(result, Exception):
+                print(f"❌ {drone_name}: ошибка при выполнении команды '{intent.text}': {result}")
+                continue
+            print(f"✅ {drone_name}: '{intent.text}' выполнено за {done[drone_name] - sent[drone_name]:.1f} с")
+        if len(sent) > 1:
+            spread = max(sent.values()) - min(sent.values())
+            print(f"📡 '{intent.text}': {len(sent)} дронов, разброс старта {spread * 1000:.1f} мс")
 
-    threading.Thread(target=run_command, daemon=True).start()
\ No newline at end of file
+    run_on_all({name: drones[name] for name in targets}, lambda name: [command],
+               on_sent=mark_sent, on_done=done.__setitem__).add_done_callback(report)
@@ -3,20 +3,52 @@
 import threading
 import time
 
+from heartbeat import TICK_S, HeartbeatWheel
+
+# Один поток keep-alive на все дроны без SwarmController (колесо из heartbeat.py)
+_lock = threading.Lock()
+_wheel = None
+
 def keep_alive(drone):
     """
-    Отправляет дрону команду rc 0 0 0 0 каждые 5 секунд,
-    чтобы предотвратить его автоматическую посадку.
-    Запускается в отдельном потоке.
+    Ставит дрон в общее колесо keep-alive: rc 0 0 0 0 уходит, только если
+    дрону 5 секунд ничего не отправляли, и без ожидания ответа.
+    Повторный взлёт не заводит второго «сердцебиения»; после посадки
+    или ошибки отправки дрон снимается сам.
+    """
+    global _wheel
+    if getattr(drone, "controller", None) is not None:
+        return  # дрон за SwarmController: keep-alive ведёт колесо контроллера
+
+    with _lock:
+        if _wheel is None:
+            _wheel = HeartbeatWheel(time.time())
+            threading.Thread(target=_heartbeat_loop, name="keep-alive", daemon=True).start()
+        _wheel.add(drone, time.time())
+
+def stop_keep_alive(drone):
     """
-    def loop():
-        while True:
+    Снимает дрон с keep-alive: посадка или отключение.
+    """
+    with _lock:
+        if _wheel is not None:
+            _wheel.remove(drone)
+
+def _last_sent(drone):
+    # djitellopy сам отмечает время последней команды и последней rc
+    return max(getattr(drone, "last_received_command_timestamp", 0), getattr(drone, "last_rc_control_timestamp", 0))
+
+def _heartbeat_loop():
+    while True:
+        time.sleep(TICK_S)
+        with _lock:
+            due = _wheel.advance(time.time(), _last_sent)
+        for drone in due:
+            if not drone.is_flying:
+                stop_keep_alive(drone)  # сел командой мимо обработчика посадки
+                continue
             try:
-                drone.send_control_command("rc 0 0 0 0")
-                time.sleep(5)
+                drone.send_rc_control(0, 0, 0, 0)
             except Exception as e:
                 print(f"⚠️ Ошибка поддержки активности: {e}")
-                break  # Если дрон отключился — завершаем поток
-
-    # Запускаем "сердцебиение" в отдельном фоновом потоке
-    threading.Thread(target=loop, daemon=True).start()
+                stop_keep_alive(drone)  # Если дрон отключился — снимаем его с колеса
@@ -0,0 +1,103 @@
+#Быстрый путь для аварийных команд дронам по частичным результатам Vosk.
+
+import time
+
+from rich import print
+
+# Слова в речи -> команда drone_manager.execute_drone_command, которую нужно отправить сразу
+PRIORITY_COMMANDS = {
+    'стоп': 'стоп',
+    'посадка': 'стоп',
+    'садись': 'стоп',
+}
+
+
+class FastCommandPath:
+    """
+    Следит за PartialResult() на каждом кадре и, как только в частичном тексте
+    появляется «<имя дрона> стоп» (или «первый и второй стоп», «все стоп»),
+    сразу отправляет посадку, не дожидаясь, пока Vosk закончит фразу. Финальный результат той же фразы потом
+    отбрасывается как дубликат.
+
+    Задержка считается от момента захвата кадра, на котором команда впервые
+    появилась в тексте (приближение конца речи), до ухода команды дрону:
+    drone_manager сообщает время отправки пакета, а не постановки в очередь.
+    """
+
+    def __init__(self, drone_manager_module, priority_commands=None):
+        self.drone_manager = drone_manager_module
+        self.priority_commands = priority_commands or PRIORITY_COMMANDS
+
+        self._sent = {}        # (имя дрона, команда) -> время захвата кадра со словом команды
+        self._last_partial = ""
+
+        self.fast_latencies = []   # от конца речи до отправки по частичному результату, с
+        self.final_latencies = []  # от конца речи до финального результата Vosk, с
+
+    def on_partial(self, partial_text, speech_time):
+        """Проверяет частичный результат. Возвращает True, если команда отправлена."""
+        if partial_text == self._last_partial:
+            return False
+        self._last_partial = partial_text
+
+        match = self._match(partial_text)
+        if match is None or match in self._sent:
+            return False
+
+        drone_name, command = match
+        self._sent[match] = speech_time
+
+        def on_sent(name, sent_at):
+            # вызывается из потока контроллера или потока дрона, когда пакет уже ушёл
+            latency = sent_at - speech_time
+            self.fast_latencies.append(latency)
+            print(f"⚡ Быстрая команда {name}: {command} ({latency * 1000:.0f} мс от конца речи до отправки)")
+
+        self.drone_manager.execute_drone_command(drone_name, command, on_sent=on_sent)
+        return True
+
+    def on_final(self, final_text):
+        """
+        Вызывается на финальном результате. Возвращает True, если фраза уже
+        была обработана быстрым путём и её не нужно передавать в respond().
+        """
+        sent = self._sent
+        self._sent = {}
+        self._last_partial = ""
+
+        match = self._match(final_text)
+        if match is None or match not in sent:
+            return False
+
+        latency = time.monotonic() - sent[match]
+        self.final_latencies.append(latency)
+        print(f"Финальный результат пришёл через {latency * 1000:.0f} мс — команда уже отправлена")
+        return True
+
+    def _match(self, text):
+        # Перед командой — одно или несколько обращений через «и»: имена, «все», группы.
+        # Возвращаются одной строкой, execute_drone_command раскроет её в имена дронов
+        words = text.split()
+        parser = self.drone_manager.intent_parser
+        for i in range(1, len(words)):
+            if words[i] not in self.priority_commands:
+                continue
+            targets = []
+            j = i - 1
+            while j >= 0 and (parser.targets_of(words[j]) is not None or (words[j] == 'и' and targets)):
+                if words[j] != 'и':
+                    targets.insert(0, words[j])
+                j -= 1
+            if targets:
+                return " ".join(targets), self.priority_commands[words[i]]
+        return None
+
+    def stats(self):
+        def avg_ms(values):
+            return round(sum(values) / len(values) * 1000, 1) if values else None
+
+        return {
+            "fast_commands": len(self.fast_latencies),
+            "fast_latency_ms": avg_ms(self.fast_latencies),
+            "final_latency_ms": avg_ms(self.final_latencies),
+        }
@@ -0,0 +1,254 @@
+#Полётный план от LLM: JSON с шагами для каждого дрона вместо произвольного Python-кода.
+#План проверяется по схеме и выполняется в этом же процессе: дроны летят одновременно,
+#каждый следующий шаг уходит сразу после ответа дрона на предыдущий, без time.sleep между ними.
+#
+#   python flight_plan.py      # сравнение с последовательным скриптом вроде tello_command.py
+
+import json
+import threading
+import time
+from concurrent.futures import Future
+
+import jsonschema
+from rich import print
+
+from intent_parser import MOVES, Intent
+
+FLIPS = ('f', 'b', 'l', 'r')
+MAX_WAIT_S = 30
+SYNC_TIMEOUT_S = 60  # дрон ждёт остальных на шаге sync не дольше этого
+
+PLAN_SCHEMA = {
+    "$schema": "https://json-schema.org/draft/2020-12/schema",
+    "type": "object",
+    "required": ["drones"],
+    "additionalProperties": False,
+    "properties": {
+        "drones": {
+            "type": "object",
+            "minProperties": 1,
+            "additionalProperties": {
+                "type": "array",
+                "minItems": 1,
+                "maxItems": 100,
+                "items": {
+                    "oneOf": [
+                        {"type": "array", "prefixItems": [{"enum": ["takeoff", "land", "sync"]}],
+                         "minItems": 1, "items": False},
+                        {"type": "array", "prefixItems": [{"enum": list(MOVES)},
+                                                          {"type": "integer", "minimum": 20, "maximum": 500}],
+                         "minItems": 2, "items": False},
+                        {"type": "array", "prefixItems": [{"enum": ["rotate_cw", "rotate_ccw"]},
+                                                          {"type": "integer", "minimum": 1, "maximum": 360}],
+                         "minItems": 2, "items": False},
+                        {"type": "array", "prefixItems": [{"const": "flip"}, {"enum": list(FLIPS)}],
+                         "minItems": 2, "items": False},
+                        {"type": "array", "prefixItems": [{"const": "wait"},
+                                                          {"type": "number", "minimum": 0, "maximum": MAX_WAIT_S}],
+                         "minItems": 2, "items": False},
+                    ]
+                }
+            }
+        }
+    }
+}
+
+_validator = jsonschema.Draft202012Validator(PLAN_SCHEMA)
+
+# Шаблон запроса к LLM; {names} подставляет plan_prompt, {voice} — сама команда
+PLAN_PROMPT = (
+    "Составь полётный план для дронов Tello по команде: {voice}. "
+    "Ответь только одним блоком ```json ... ``` без пояснений. "
+    'Формат: {"drones": {"имя дрона": [шаг, шаг, ...]}}. Шаги каждого дрона выполняются по порядку, '
+    "дроны летят одновременно. Шаг — массив: "
+    '["takeoff"], ["land"], '
+    '["forward"|"back"|"left"|"right"|"up"|"down", сантиметры 20-500], '
+    '["rotate_cw"|"rotate_ccw", градусы 1-360], '
+    '["flip", "f"|"b"|"l"|"r"], '
+    f'["wait", секунды 0-{MAX_WAIT_S}], '
+    '["sync"] — дождаться, пока остальные дроны дойдут до своего sync (у всех дронов sync поровну). '
+    "Дроны: {names}. "
+    'Пример: {"drones": {"первый": [["takeoff"], ["flip", "f"], ["sync"], ["land"]], '
+    '"второй": [["takeoff"], ["sync"], ["flip", "b"], ["land"]]}}.'
+)
+
+
+def plan_prompt(drone_names):
+    """Шаблон с именами дронов; {voice} остаётся для команды."""
+    return PLAN_PROMPT.replace("{names}", ", ".join(drone_names))
+
+
+def parse_plan(text):
+    """Разбирает и проверяет план. Ошибка — ValueError с понятным описанием."""
+    try:
+        plan = json.loads(text)
+    except ValueError as e:
+        raise ValueError(f"план не JSON: {e}")
+
+    error = jsonschema.exceptions.best_match(_validator.iter_errors(plan))
+    if error is not None:
+        where = "/".join(str(p) for p in error.absolute_path) or "план"
+        raise ValueError(f"{where}: {error.message}")
+
+    timelines = plan["drones"]
+    syncs = {name: sum(step[0] == "sync" for step in steps) for name, steps in timelines.items()}
+    if len(set(syncs.values())) > 1:
+        raise ValueError(f"у дронов разное число шагов sync: {syncs}")
+    return plan
+
+
+class PlanResult:
+    def __init__(self, ok, error=None, steps=None, duration=0.0):
+        self.ok = ok
+        self.error = error
+        self.steps = steps or {}  # имя дрона -> сколько шагов выполнено
+        self.duration = duration
+
+
+class FlightPlanEngine:
+    """
+    Выполняет планы на уже подключённых дронах drone_manager. Взлёт,
+    посадка, перемещения и повороты идут через COMMAND_HANDLERS — с теми же
+    ограничениями и поддержкой активности, что и голосовые команды. При
+    ошибке любого дрона или cancel() все дроны плана прекращают шаги и садятся.
+    """
+
+    def __init__(self, drone_manager_module):
+        self.drone_manager = drone_manager_module
+        self._abort = threading.Event()
+        self._lock = threading.Lock()
+        self._running = None  # (план, барьер sync) выполняемого плана
+
+    def run(self, plan):
+        """Запускает план в фоне и сразу возвращает Future с PlanResult."""
+        future = Future()
+        timelines = plan["drones"]
+        missing = [name for name in timelines if name not in self.drone_manager.drones]
+        if missing:
+            future.set_result(PlanResult(False, f"не подключены: {', '.join(missing)}"))
+            return future
+
+        with self._lock:
+            if self._running is not None:
+                future.set_result(PlanResult(False, "предыдущий план ещё выполняется"))
+                return future
+            self._abort.clear()
+            barrier = threading.Barrier(len(timelines))
+            self._running = (plan, barrier)
+
+        threading.Thread(target=self._run, args=(timelines, barrier, future), name="flight-plan", daemon=True).start()
+        return future
+
+    def cancel(self):
+        """Прерывает выполняемый план; True, если было что прерывать."""
+        with self._lock:
+            if self._running is None:
+                return False
+            self._abort.set()
+            self._running[1].abort()
+            return True
+
+    def _run(self, timelines, barrier, future):
+        started = time.perf_counter()
+        steps = {name: 0 for name in timelines}
+        errors = []
+        start = threading.Barrier(len(timelines))
+
+        def fly(name):
+            try:
+                start.wait(timeout=1.0)  # старт всех дронов в один момент, как в execute_intent
+            except threading.BrokenBarrierError:
+                pass
+            for step in timelines[name]:
+                if self._abort.is_set():
+                    return
+                try:
+                    self._step(name, step, barrier)
+                except Exception as e:
+                    if not self._abort.is_set():
+                        errors.append(f"{name}: шаг {steps[name] + 1} {step}: {e}")
+                        self.cancel()
+                    return
+                steps[name] += 1
+
+        threads = [threading.Thread(target=fly, args=(name,), daemon=True) for name in timelines]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        aborted = self._abort.is_set()
+        if aborted:
+            self._land_all(timelines)
+        with self._lock:
+            self._running = None
+
+        error = "; ".join(errors) or ("отменено" if aborted else None)
+        future.set_result(PlanResult(not aborted, error, steps, time.perf_counter() - started))
+
+    def _step(self, name, step, barrier):
+        action, value = step[0], (step[1] if len(step) > 1 else None)
+        if action == "wait":
+            self._abort.wait(value)
+        elif action == "sync":
+            barrier.wait(timeout=SYNC_TIMEOUT_S)
+        elif action == "flip":
+            self.drone_manager.drones[name]["tello"].flip(value)
+        else:
+            intent = Intent(targets=[name], verb=action, value=value, text=" ".join(str(part) for part in step))
+            self.drone_manager.COMMAND_HANDLERS[action](name, self.drone_manager.drones[name], intent)
+
+    def _land_all(self, timelines):
+        for name in timelines:
+            try:
+                self.drone_manager.drones[name]["tello"].land()
+            except Exception as e:
+                print(f"⚠️ {name}: посадка после прерванного плана не удалась: {e}")
+
+
+def _benchmark(ack_s=0.05):
+    """
+    План tello_command.py (взлёт, сальто первого, сальто второго, посадка) на дронах-имитаторах,
+    которые отвечают «ok» через ack_s: как его выполнял скрипт и как выполняет движок.
+    """
+    import types
+
+    class SimulatedTello:
+        def __init__(self):
+            self.flying = False
+
+        def _ack(self):
+            time.sleep(ack_s)
+
+        def takeoff(self):
+            self._ack()
+            self.flying = True
+
+        def land(self):
+            self._ack()
+            self.flying = False
+
+        def flip(self, direction):
+            self._ack()
+
+    manager = types.SimpleNamespace(
+        drones={name: {"tello": SimulatedTello()} for name in ("первый", "второй")},
+        COMMAND_HANDLERS={
+            "takeoff": lambda name, data, intent: data["tello"].takeoff(),
+            "land": lambda name, data, intent: data["tello"].land(),
+        },
+    )
+    plan = parse_plan(json.dumps({"drones": {
+        "первый": [["takeoff"], ["flip", "f"], ["sync"], ["land"]],
+        "второй": [["takeoff"], ["sync"], ["flip", "b"], ["land"]],
+    }}))
+
+    # Скрипт: swarm.takeoff() параллельно, затем сальто по очереди с time.sleep(2), swarm.land() параллельно
+    script = ack_s + (ack_s + 2) * 2 + ack_s
+    result = FlightPlanEngine(manager).run(plan).result()
+    print(f"скрипт с time.sleep(2): {script:5.2f} с (+ запуск интерпретатора и подключение)")
+    print(f"движок планов:          {result.duration:5.2f} с, шаги {result.steps}, ok={result.ok}")
+
+
+if __name__ == "__main__":
+    _benchmark()
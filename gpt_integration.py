@@ -1,44 +1,172 @@
 #Инициализация ЯМ
 
 import openai
+import requests
 from openai import error
 from rich import print
 
+from conversation_memory import ConversationMemory
+
+# Ответы get_answer при ошибках — их нельзя исполнять и кэшировать
+OVERLOADED_ANSWER = "ChatGPT перегружен!"
+BAD_TOKEN_ANSWER = "OpenAI токен не рабочий."
+TIMEOUT_ANSWER = "ChatGPT не ответил вовремя."
+ERROR_ANSWERS = (OVERLOADED_ANSWER, BAD_TOKEN_ANSWER, TIMEOUT_ANSWER)
+
+class CodeBlockDetector:
+    """
+    Находит в потоке ответа первый блок ```...``` и отдаёт его, как только
+    пришла закрывающая кавычка, — пояснения после кода можно не ждать.
+    """
+    FENCE = "```"
+
+    def __init__(self):
+        self.text = ""
+        self.code = None
+        self._start = None  # начало кода: строка после открывающей кавычки
+        self._scanned = 0   # до этого места закрывающую кавычку уже искали
+
+    def feed(self, token):
+        self.text += token
+        if self.code is not None:
+            return None
+        if self._start is None:
+            opening = self.text.find(self.FENCE)
+            line_end = self.text.find("\n", opening) if opening >= 0 else -1
+            if line_end < 0:
+                return None
+            self._start = self._scanned = line_end + 1
+        closing = self.text.find("\n" + self.FENCE, max(self._start - 1, self._scanned - len(self.FENCE)))
+        self._scanned = len(self.text)
+        if closing < 0:
+            return None
+        self.code = self.text[self._start:closing + 1]
+        return self.code
+
+    def finish(self):
+        """Поток закончился: незакрытый блок или ответ без кавычек целиком считаем кодом."""
+        if self.code is None:
+            self.code = self.text[self._start:] if self._start is not None else self.text.strip()
+        return self.code
+
 class GPTIntegration:
-    def __init__(self, openai_api_key, system_message):
+    def __init__(self, openai_api_key, system_message, model_engine="gpt-4o-mini", max_tokens=256,
+                 api_base=None, connect_timeout=5.0, read_timeout=20.0, context_budget=3000, keep_turns=4):
         openai.api_key = openai_api_key
+        if api_base:
+            openai.api_base = api_base  # например, llm_stub_server.py для проверок без сети
         self.system_message = system_message
-        self.message_log = [system_message]
+        # Бюджет — на весь запрос вместе с ответом: max_tokens под ответ вычитаем сразу
+        self.memory = ConversationMemory(system_message, budget=context_budget - max_tokens,
+                                         keep_turns=keep_turns, summarize=self._summarize)
+        self.model_engine = model_engine
+        self.max_tokens = max_tokens
+        # read_timeout — наибольшая пауза между кусками ответа, а не время всего ответа
+        self.request_timeout = (connect_timeout, read_timeout)
 
     def get_answer(self):
-        model_engine = "gpt-4o-mini"
-        max_tokens = 256
         try:
             response = openai.ChatCompletion.create(
-                model=model_engine,
+                model=self.model_engine,
                 messages=self.message_log,
-                max_tokens=max_tokens,
+                max_tokens=self.max_tokens,
                 temperature=0.7,
                 top_p=1,
-                stop=None
+                stop=None,
+                request_timeout=self.request_timeout
             )
         except (error.TryAgain, error.ServiceUnavailableError):
-            return "ChatGPT перегружен!"
+            return OVERLOADED_ANSWER
+        except error.Timeout:
+            return TIMEOUT_ANSWER
         except openai.OpenAIError as ex:
-            if ex.code == "context_length_exceeded":
-                self.message_log = [self.system_message, self.message_log[-1]]
+            if ex.code == "context_length_exceeded" and len(self.message_log) > 2:
+                self.memory.clear(keep_last=True)
                 return self.get_answer() # Рекурсивный вызов с очищенным контекстом
             else:
-                return "OpenAI токен не рабочий."
+                return BAD_TOKEN_ANSWER
 
+        answer = response.choices[0].message.content
         for choice in response.choices:
             if "text" in choice:
-                return choice.text
+                answer = choice.text
+                break
 
-        return response.choices[0].message.content
+        self.add_message("assistant", answer)
+        return answer
+
+    def stream_answer(self, on_token=None, on_code=None):
+        """
+        Получает ответ потоком. on_token(кусок) вызывается на каждый кусок,
+        on_code(код) — один раз: как только закрылся первый блок ```...```,
+        а если блока нет — в конце ответа с ответом целиком. Возвращает весь
+        ответ или одну из ERROR_ANSWERS, если код так и не был получен.
+        """
+        detector = CodeBlockDetector()
+        try:
+            chunks = openai.ChatCompletion.create(
+                model=self.model_engine,
+                messages=self.message_log,
+                max_tokens=self.max_tokens,
+                temperature=0.7,
+                top_p=1,
+                stop=None,
+                stream=True,
+                request_timeout=self.request_timeout
+            )
+            for chunk in chunks:
+                token = chunk.choices[0].delta.get("content") if chunk.choices else None
+                if not token:
+                    continue
+                if on_token:
+                    on_token(token)
+                code = detector.feed(token)
+                if code is not None and on_code:
+                    on_code(code)
+        except (error.TryAgain, error.ServiceUnavailableError):
+            failure = OVERLOADED_ANSWER
+        except (error.Timeout, requests.exceptions.RequestException):
+            failure = TIMEOUT_ANSWER  # обрыв или пауза дольше read_timeout посреди потока
+        except openai.OpenAIError as ex:
+            if ex.code == "context_length_exceeded" and not detector.text and len(self.message_log) > 2:
+                self.memory.clear(keep_last=True)
+                return self.stream_answer(on_token, on_code) # Повтор с очищенным контекстом
+            failure = BAD_TOKEN_ANSWER
+        else:
+            if detector.code is None and on_code:
+                on_code(detector.finish())
+            self.add_message("assistant", detector.text)
+            return detector.text
+
+        if detector.code is not None:
+            print(f"⚠️ Ответ оборван ({failure}), но код из него уже запущен")
+            self.add_message("assistant", detector.text)
+            return detector.text
+        return failure
+
+    @property
+    def message_log(self):
+        """Системное сообщение, сводка старых реплик и последние реплики — то, что уходит в запрос."""
+        return self.memory.messages()
 
     def add_message(self, role, content):
-        self.message_log.append({"role": role, "content": content})
+        self.memory.append(role, content)
 
     def clear_message_log(self):
-        self.message_log = [self.system_message]
\ No newline at end of file
+        self.memory.clear()
+
+    def _summarize(self, summary, turns):
+        # Вызывается памятью в фоновом потоке, когда старые реплики уходят в сводку
+        dialog = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+        response = openai.ChatCompletion.create(
+            model=self.model_engine,
+            messages=[
+                {"role": "system", "content": "Сожми разговор голосового ассистента с пользователем в несколько "
+                                              "предложений. Сохрани имена дронов, числа и что уже было сделано."},
+                {"role": "user", "content": f"Прежняя сводка:\n{summary or '—'}\n\nНовые реплики:\n{dialog}"},
+            ],
+            max_tokens=self.memory.summary_tokens,
+            temperature=0,
+            request_timeout=self.request_timeout
+        )
+        return response.choices[0].message.content
\ No newline at end of file
@@ -0,0 +1,163 @@
+#Распознавание с ограниченной грамматикой Vosk: фразы из commands.yaml, имена дронов и объекты.
+
+import json
+from collections import deque
+
+import vosk
+
+from fast_path import PRIORITY_COMMANDS
+
+# Слово, после которого фраза уходит в LLM и нужна свободная речь
+FREE_FORM_TRIGGER = 'выполни'
+UNKNOWN = '[unk]'
+CONNECTOR = 'и'  # «первый и третий вперёд»: цели склеивает IntentParser
+
+
+def build_phrases(va_cmd_list, drone_names, drone_commands, class_names, va_alias=(), extra=()):
+    """
+    Собирает список фраз для грамматики Vosk.
+    Команды дронам добавляются целиком («первый наверх»), чтобы декодер не
+    собирал их из отдельных слов. Несколько целей не перечисляются парами —
+    грамматика росла бы как квадрат числа дронов: Vosk склеивает фразы
+    грамматики подряд, поэтому «первый», «и», «третий вперёд» — три фразы,
+    а цели объединяет IntentParser. Размер растёт линейно с числом дронов.
+    """
+    phrases = []
+
+    def add(phrase):
+        phrase = phrase.lower().strip()
+        if phrase and phrase not in seen:
+            seen.add(phrase)
+            phrases.append(phrase)
+
+    seen = set()
+    prefixes = [''] + [f'{alias} ' for alias in va_alias]
+
+    for v_list in va_cmd_list.values():
+        for phrase in v_list:
+            for prefix in prefixes:
+                add(prefix + phrase)
+
+    for name in drone_names:
+        for prefix in prefixes:
+            add(prefix + name)
+            for command in drone_commands:
+                add(f'{prefix}{name} {command}')
+            for obj in class_names:
+                add(f'{prefix}{name} найди {obj}')
+
+    add(CONNECTOR)
+
+    for phrase in ('дроны запуск', FREE_FORM_TRIGGER) + tuple(extra):
+        for prefix in prefixes:
+            add(prefix + phrase)
+
+    phrases.append(UNKNOWN)
+    return phrases
+
+
+def drone_grammar(va_cmd_list, drone_manager_module, va_alias=()):
+    """Фразы грамматики для текущего состава роя из drone_manager."""
+    return build_phrases(
+        va_cmd_list,
+        drone_manager_module.DRONE_TARGETS,
+        drone_manager_module.DRONE_COMMANDS + tuple(PRIORITY_COMMANDS),
+        drone_manager_module.CLASS_NAMES,
+        va_alias=va_alias
+    )
+
+
+class DualRecognizer:
+    """
+    Два распознавателя на одной модели: с грамматикой (быстрее и устойчивее
+    на коротких командах) и свободный (для «выполни ...» в LLM).
+
+    Оба создаются при старте и живут всё время, поэтому переключение бесплатно:
+    кадры текущей фразы запоминаются и, как только грамматический распознаватель
+    увидит «выполни», проигрываются в свободный.
+
+    Интерфейс повторяет KaldiRecognizer (AcceptWaveform, Result, PartialResult, Reset).
+
+    set_phrases() заменяет грамматику на ходу: новый распознаватель собирается
+    в вызывающем потоке, а подставляется между фразами, чтобы не оборвать
+    текущую.
+    """
+
+    def __init__(self, model, samplerate, phrases, va_alias=(), max_utterance_frames=400):
+        self.model = model
+        self.samplerate = samplerate
+        self.va_alias = set(va_alias)
+        self.grammar_rec = vosk.KaldiRecognizer(model, samplerate, json.dumps(phrases, ensure_ascii=False))
+        self.free_rec = vosk.KaldiRecognizer(model, samplerate)
+        self.free_form = False
+        self._utterance = deque(maxlen=max_utterance_frames)
+        self._result = json.dumps({"text": ""})
+        self._next_grammar_rec = None
+
+    def set_phrases(self, phrases):
+        self._next_grammar_rec = vosk.KaldiRecognizer(self.model, self.samplerate,
+                                                      json.dumps(phrases, ensure_ascii=False))
+
+    def _swap_grammar(self):
+        rec, self._next_grammar_rec = self._next_grammar_rec, None
+        if rec is not None:
+            self.grammar_rec = rec
+
+    def AcceptWaveform(self, data):
+        if not self._utterance and not self.free_form:
+            self._swap_grammar()  # между фразами
+
+        if self.free_form:
+            if self.free_rec.AcceptWaveform(data):
+                return self._finish(self.free_rec.Result())
+            return False
+
+        self._utterance.append(bytes(data))
+        if self.grammar_rec.AcceptWaveform(data):
+            result = self.grammar_rec.Result()
+            if self._starts_free_form(json.loads(result)["text"]):
+                # Фраза закончилась раньше, чем мы заметили «выполни» — дораспознаём её целиком
+                self._switch_to_free_form()
+                return self._finish(self.free_rec.FinalResult())
+            return self._finish(result)
+
+        if self._starts_free_form(json.loads(self.grammar_rec.PartialResult())["partial"]):
+            self._switch_to_free_form()
+        return False
+
+    def Result(self):
+        return self._result
+
+    def PartialResult(self):
+        if self.free_form:
+            return self.free_rec.PartialResult()
+        return self.grammar_rec.PartialResult()
+
+    def Reset(self):
+        self._swap_grammar()
+        self.grammar_rec.Reset()
+        self.free_rec.Reset()
+        self.free_form = False
+        self._utterance.clear()
+
+    def _starts_free_form(self, text):
+        for word in text.split():
+            if word not in self.va_alias:
+                return word == FREE_FORM_TRIGGER
+        return False
+
+    def _switch_to_free_form(self):
+        """Проигрывает накопленные кадры фразы в свободный распознаватель."""
+        self.free_form = True
+        self.free_rec.Reset()
+        for data in self._utterance:
+            self.free_rec.AcceptWaveform(data)
+        self._utterance.clear()
+
+    def _finish(self, result):
+        self._result = result
+        self._utterance.clear()
+        if self.free_form:
+            self.free_form = False
+            self.grammar_rec.Reset()
+        return True
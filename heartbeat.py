@@ -0,0 +1,116 @@
+#Колесо таймеров для rc 0 0 0 0: один планировщик на весь рой вместо потока на каждый взлёт.
+#Tello садится сам после 15 с без команд, поэтому keep-alive нужен только простаивающему дрону.
+#
+#   python heartbeat.py     # 10 000 дронов, минута модельного времени
+
+import math
+
+from rich import print
+
+HEARTBEAT_S = 5   # keep-alive, если дрону ничего не отправляли столько секунд
+TICK_S = 0.25     # шаг колеса: keep-alive уходит не позже HEARTBEAT_S + TICK_S после последней команды
+
+
+class HeartbeatWheel:
+    """
+    Дрон лежит в слоте колеса, на который приходится его срок keep-alive.
+    touch() на каждую отправку только запоминает время — O(1), без
+    перестановок; дрон переносится, когда срабатывает его слот и срок
+    оказывается сдвинут. advance() проходит тики до now и возвращает ключи
+    дронов, которым пора отправить keep-alive, и ставит их на следующий срок.
+    Ключ — что угодно хешируемое (адрес или объект Tello). Не потокобезопасно.
+    """
+
+    def __init__(self, now, interval=HEARTBEAT_S, tick=TICK_S):
+        self.interval = interval
+        self.tick = tick
+        self._slots = [set() for _ in range(math.ceil(interval / tick) + 1)]
+        self._cursor = 0
+        self._now = now   # время текущего тика
+        self._last = {}   # ключ -> время последней отправки дрону
+        self._slot = {}   # ключ -> индекс слота; запись в другом слоте устарела
+
+    def __len__(self):
+        return len(self._last)
+
+    def __contains__(self, key):
+        return key in self._last
+
+    def add(self, key, now):
+        """Дрон в воздухе: с этого момента следим за его простоем."""
+        self._last[key] = now
+        if key not in self._slot:
+            self._place(key, now + self.interval)
+
+    def touch(self, key, now):
+        """Дрону что-то отправили — keep-alive откладывается."""
+        if key in self._last:
+            self._last[key] = max(self._last[key], now)
+
+    def remove(self, key):
+        """Посадка или отключение; запись в слоте отбросится, когда он сработает."""
+        self._last.pop(key, None)
+        self._slot.pop(key, None)
+
+    def _place(self, key, deadline):
+        ticks = min(max(1, math.ceil((deadline - self._now) / self.tick)), len(self._slots) - 1)
+        index = (self._cursor + ticks) % len(self._slots)
+        self._slots[index].add(key)
+        self._slot[key] = index
+
+    def advance(self, now, activity=None):
+        """
+        Проходит тики до now. activity(ключ) -> время последней отправки, если
+        его отслеживает кто-то ещё (djitellopy); спрашивается только у дронов сработавшего слота.
+        """
+        due = []
+        while self._now + self.tick <= now:
+            self._now += self.tick
+            self._cursor = (self._cursor + 1) % len(self._slots)
+            slot, self._slots[self._cursor] = self._slots[self._cursor], set()
+            for key in slot:
+                if self._slot.get(key) != self._cursor:
+                    continue  # снят или уже переставлен
+                del self._slot[key]
+                if activity is not None:
+                    self.touch(key, activity(key))
+                deadline = self._last[key] + self.interval
+                if deadline <= self._now:
+                    due.append(key)
+                    self._last[key] = self._now
+                    deadline = self._now + self.interval
+                self._place(key, deadline)
+        return due
+
+
+def _benchmark(count=10000, busy_every_s=3.0, seconds=60):
+    """Половина дронов получает команду каждые busy_every_s секунд, остальные висят без команд."""
+    import time
+
+    wheel = HeartbeatWheel(0.0)
+    for key in range(count):
+        wheel.add(key, 0.0)
+    busy = range(0, count, 2)
+
+    sent = 0
+    work = 0.0
+    next_busy = busy_every_s
+    now = 0.0
+    while now < seconds:
+        now += TICK_S
+        started = time.perf_counter()
+        if now >= next_busy:
+            for key in busy:
+                wheel.touch(key, now)
+            next_busy += busy_every_s
+        sent += len(wheel.advance(now))
+        work += time.perf_counter() - started
+
+    idle_expected = (count - len(busy)) * int(seconds // HEARTBEAT_S)
+    print(f"{count} дронов, {seconds} с: keep-alive отправлено {sent} "
+          f"(простаивающим положено {idle_expected}, занятым 0), поток на дрон слал бы {count * int(seconds // HEARTBEAT_S)}")
+    print(f"работа колеса: {work * 1000 / (seconds / TICK_S):.2f} мс на тик")
+
+
+if __name__ == "__main__":
+    _benchmark()
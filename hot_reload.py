@@ -0,0 +1,133 @@
+#Перечитывание commands.yaml и drones.yaml на ходу — без перезапуска Vosk, Porcupine, Silero и YOLO.
+
+import os
+import threading
+import time
+
+import yaml
+from rich import print
+
+from grammar_recognizer import DualRecognizer, drone_grammar
+
+
+class FileWatcher:
+    """
+    Следит за временем изменения и размером файлов, опрашивая их в фоновом
+    потоке. Обработчик вызывается, когда файл изменился и не меняется ещё
+    один интервал (редактор успел дописать его целиком).
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._files = {}  # путь -> [подпись, с которой работаем, подпись с прошлой проверки, обработчик]
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def watch(self, path, callback):
+        signature = self._signature(path)
+        self._files[path] = [signature, signature, callback]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="hot-reload", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            for path, entry in self._files.items():
+                applied, seen, callback = entry
+                signature = self._signature(path)
+                entry[1] = signature
+                if signature is None or signature == applied or signature != seen:
+                    continue
+
+                entry[0] = signature
+                try:
+                    callback()
+                except Exception as e:
+                    # Ошибка в файле — продолжаем со старыми настройками до следующей правки
+                    print(f"⚠️ Не удалось перечитать {path}: {e}")
+
+
+class HotReloader:
+    """
+    При правке commands.yaml перестраивает только индекс команд и грамматику,
+    при правке drones.yaml — состав роя в drone_manager, а индекс имён и
+    грамматику только если изменились имена или группы (смена IP их не
+    затрагивает). Всё новое собирается рядом со старым и подставляется
+    одним присваиванием, поэтому голосовой цикл не останавливается:
+    распознавание текущей фразы доигрывает на старой грамматике.
+    """
+
+    def __init__(self, va_responder, audio_manager, drone_manager_module, commands_path, drones_path,
+                 va_alias=(), interval=1.0):
+        self.va_responder = va_responder
+        self.audio_manager = audio_manager
+        self.drone_manager = drone_manager_module
+        self.commands_path = commands_path
+        self.drones_path = drones_path
+        self.va_alias = va_alias
+        self.watcher = FileWatcher(interval)
+
+    def start(self):
+        self.watcher.watch(self.commands_path, self.reload_commands)
+        self.watcher.watch(self.drones_path, self.reload_roster)
+        self.watcher.start()
+
+    def stop(self):
+        self.watcher.stop()
+
+    def reload_commands(self):
+        started = time.perf_counter()
+        with open(self.commands_path, "rt", encoding="utf8") as f:
+            va_cmd_list = yaml.safe_load(f)
+
+        if not isinstance(va_cmd_list, dict) or not all(isinstance(v, list) for v in va_cmd_list.values()):
+            raise ValueError("ожидается словарь «команда: [фразы]»")
+        va_cmd_list = {str(cmd): [str(phrase) for phrase in phrases] for cmd, phrases in va_cmd_list.items()}
+
+        matcher = self.va_responder.matcher.replace(va_cmd_list=va_cmd_list)
+        self._update_grammar(va_cmd_list)
+        self.va_responder.VA_CMD_LIST, self.va_responder.matcher = va_cmd_list, matcher
+
+        phrases = sum(len(v) for v in va_cmd_list.values())
+        print(f"🔄 {self.commands_path} перечитан: {len(va_cmd_list)} команд, {phrases} фраз "
+              f"({(time.perf_counter() - started) * 1000:.0f} мс)")
+
+    def reload_roster(self):
+        started = time.perf_counter()
+        ips, groups = self.drone_manager.load_roster(self.drones_path)
+        dm = self.drone_manager
+        if ips == dm.DRONE_IPS and groups == dm.DRONE_GROUPS:
+            return
+
+        names_changed = list(ips) != list(dm.DRONE_IPS)
+        targets_changed = names_changed or groups != dm.DRONE_GROUPS
+        moved = [name for name, ip in ips.items() if name in dm.drones and dm.DRONE_IPS.get(name) != ip]
+
+        dm.apply_roster(ips, groups)
+        if names_changed:
+            self.va_responder.matcher = self.va_responder.matcher.replace(drone_names=ips)
+        if targets_changed:
+            self._update_grammar(self.va_responder.VA_CMD_LIST)
+
+        print(f"🔄 {self.drones_path} перечитан: дроны {', '.join(ips)}"
+              f"{', группы ' + ', '.join(groups) if groups else ''} "
+              f"({(time.perf_counter() - started) * 1000:.0f} мс)")
+        if moved:
+            print(f"⚠️ Сменился IP у {', '.join(moved)} — переподключите командой «дроны запуск»")
+
+    def _update_grammar(self, va_cmd_list):
+        recognizer = self.audio_manager.kaldi_rec
+        if isinstance(recognizer, DualRecognizer):
+            recognizer.set_phrases(drone_grammar(va_cmd_list, self.drone_manager, va_alias=self.va_alias))
@@ -0,0 +1,174 @@
+#Разбор голосовой команды дрону в намерение: цели, действие, число и объект.
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# Слово -> действие. Поворот уточняется направлением («поворот влево»).
+VERBS = {
+    'наверх': 'takeoff', 'взлёт': 'takeoff', 'взлетай': 'takeoff',
+    'стоп': 'land', 'посадка': 'land', 'садись': 'land',
+    'вперёд': 'forward', 'назад': 'back',
+    'вверх': 'up', 'выше': 'up', 'вниз': 'down', 'ниже': 'down',
+    'влево': 'left', 'налево': 'left', 'вправо': 'right', 'направо': 'right',
+    'поворот': 'rotate_cw', 'повернись': 'rotate_cw',
+    'включи': 'stream_on', 'отключи': 'stream_off', 'выключи': 'stream_off',
+    'найди': 'track',
+}
+ROTATIONS = {'left': 'rotate_ccw', 'right': 'rotate_cw'}
+MOVES = ('forward', 'back', 'up', 'down', 'left', 'right')
+
+# Обращение ко всему рою («все наверх»)
+ALL_WORDS = ('все', 'всем', 'всех')
+
+UNITS = {
+    'ноль': 0, 'один': 1, 'одна': 1, 'одну': 1, 'два': 2, 'две': 2, 'три': 3, 'четыре': 4,
+    'пять': 5, 'шесть': 6, 'семь': 7, 'восемь': 8, 'девять': 9, 'десять': 10,
+    'одиннадцать': 11, 'двенадцать': 12, 'тринадцать': 13, 'четырнадцать': 14,
+    'пятнадцать': 15, 'шестнадцать': 16, 'семнадцать': 17, 'восемнадцать': 18, 'девятнадцать': 19,
+}
+TENS = {
+    'двадцать': 20, 'тридцать': 30, 'сорок': 40, 'пятьдесят': 50,
+    'шестьдесят': 60, 'семьдесят': 70, 'восемьдесят': 80, 'девяносто': 90,
+}
+HUNDREDS = {
+    'сто': 100, 'двести': 200, 'триста': 300, 'четыреста': 400, 'пятьсот': 500,
+    'шестьсот': 600, 'семьсот': 700, 'восемьсот': 800, 'девятьсот': 900,
+}
+FRACTIONS = {'полтора': 1.5, 'полторы': 1.5, 'пол': 0.5}
+
+# Единица -> множитель к сантиметрам (для углов — к градусам)
+MEASURES = {
+    'сантиметр': 1, 'сантиметра': 1, 'сантиметров': 1, 'см': 1,
+    'метр': 100, 'метра': 100, 'метров': 100, 'м': 100,
+    'градус': 1, 'градуса': 1, 'градусов': 1,
+}
+WHOLE_AMOUNTS = {'полметра': 50}
+
+# Фразы для грамматики Vosk: без чисел и с самыми ходовыми расстояниями и углами
+BASE_COMMANDS = ('включи поток', 'отключи поток', 'наверх', 'стоп', 'вперёд', 'назад', 'вверх', 'вниз',
+                 'влево', 'вправо', 'поворот', 'поворот влево', 'поворот вправо', 'найди')
+GRAMMAR_DISTANCES = ('двадцать', 'тридцать', 'пятьдесят', 'сто', 'двести', 'полметра', 'метр', 'два метра')
+GRAMMAR_ANGLES = ('сорок пять', 'девяносто', 'сто восемьдесят', 'триста шестьдесят')
+
+
+def normalize(word):
+    return word.replace('ё', 'е')
+
+
+@dataclass
+class Intent:
+    targets: List[str] = field(default_factory=list)  # имена дронов из фразы, группы раскрыты
+    verb: Optional[str] = None     # действие из VERBS
+    value: Optional[float] = None  # сантиметры или градусы, None — по умолчанию
+    object_name: Optional[str] = None
+    object_class: Optional[int] = None  # class_id COCO для «найди»
+    text: str = ''
+
+
+class IntentParser:
+    """
+    Словари строятся один раз; parse() проходит фразу за один проход по словам
+    (O(число слов)): каждое слово — имя дрона или группы, действие, направление,
+    часть числа, единица измерения или объект поиска; остальные слова («на»,
+    «и», «поток») пропускаются. Целей может быть несколько: «первый и третий
+    вперёд», «все наверх», группы из groups (имя группы -> имена дронов).
+    """
+
+    def __init__(self, drone_names, class_names, groups=None):
+        self.class_names = dict(class_names)
+        drone_names = list(drone_names)
+        self._names = {}
+        self._max_name_words = 1
+
+        targets = {name: (name,) for name in drone_names}
+        targets.update({word: tuple(drone_names) for word in ALL_WORDS})
+        targets.update({group: tuple(members) for group, members in (groups or {}).items()})
+        for target, names in targets.items():
+            words = tuple(normalize(w) for w in target.split())
+            self._names[words] = names
+            self._max_name_words = max(self._max_name_words, len(words))
+        self._verbs = {normalize(w): verb for w, verb in VERBS.items()}
+        self._objects = {normalize(w): w for w in self.class_names}
+
+    def _name_at(self, words, i):
+        for n in range(min(self._max_name_words, len(words) - i), 0, -1):
+            names = self._names.get(tuple(words[i:i + n]))
+            if names is not None:
+                return names, n
+        return None, 0
+
+    def targets_of(self, word):
+        """Дроны, к которым относится одно слово (имя, «все» или группа), или None."""
+        return self._names.get((normalize(word),))
+
+    def parse(self, text: str) -> Intent:
+        intent = Intent(text=text)
+        words = [normalize(w) for w in text.lower().split()]
+
+        number = None     # первое число во фразе
+        last_part = None  # последнее слово-число, к которому можно дописать следующее
+        measure = None
+        i = 0
+        while i < len(words):
+            word = words[i]
+
+            names, n = self._name_at(words, i)
+            if names is not None:
+                for name in names:
+                    if name not in intent.targets:
+                        intent.targets.append(name)
+                i += n
+                continue
+
+            part = UNITS.get(word, TENS.get(word, HUNDREDS.get(word)))
+            if part is not None:
+                # «сто пятьдесят три»: сотни, затем десятки, затем единицы
+                if number is not None and last_part is not None and (
+                        (last_part >= 100 and part < 100) or (20 <= last_part < 100 and part < 10)):
+                    number += part
+                elif number is None:
+                    number = part
+                last_part = part
+            elif word.replace(',', '.').replace('.', '', 1).isdigit():
+                if number is None:
+                    number = float(word.replace(',', '.'))
+                last_part = None
+            elif word in FRACTIONS:
+                number, last_part = FRACTIONS[word], None
+            elif word in WHOLE_AMOUNTS:
+                number, measure, last_part = WHOLE_AMOUNTS[word], 1, None
+            elif word in MEASURES:
+                measure = MEASURES[word]
+                if number is None:
+                    number = 1  # «на метр»
+                last_part = None
+            elif word in self._verbs:
+                verb = self._verbs[word]
+                if intent.verb is None:
+                    intent.verb = verb
+                elif intent.verb.startswith('rotate') and verb in ROTATIONS:
+                    intent.verb = ROTATIONS[verb]
+                elif intent.verb in ROTATIONS and verb.startswith('rotate'):
+                    intent.verb = ROTATIONS[intent.verb]  # «налево поворот»
+            elif word in self._objects and intent.verb == 'track':
+                intent.object_name = self._objects[word]
+                intent.object_class = self.class_names[intent.object_name]
+            else:
+                last_part = None
+            i += 1
+
+        if number is not None:
+            intent.value = number * (measure or 1)
+        return intent
+
+
+def command_phrases():
+    """Команды дронам для грамматики Vosk, включая ходовые расстояния и углы."""
+    phrases = list(BASE_COMMANDS)
+    for verb in ('вперёд', 'назад', 'вверх', 'вниз', 'влево', 'вправо'):
+        for amount in GRAMMAR_DISTANCES:
+            phrases.append(f'{verb} на {amount}')
+    for verb in ('поворот', 'поворот влево', 'поворот вправо'):
+        for amount in GRAMMAR_ANGLES:
+            phrases.append(f'{verb} на {amount}')
+    return tuple(phrases)
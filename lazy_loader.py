@@ -0,0 +1,92 @@
+#Ленивая загрузка тяжёлых моделей (Silero, YOLO) и отчёт о времени запуска.
+
+import subprocess
+import sys
+import threading
+import time
+
+from rich import print
+
+_STARTED = time.perf_counter()  # модуль импортируется первым в main.py
+
+
+class StartupReport:
+    """Отметки времени от старта процесса до готовности ассистента."""
+
+    def __init__(self):
+        self.marks = []
+
+    def mark(self, stage):
+        self.marks.append((stage, time.perf_counter() - _STARTED))
+
+    def add(self, stage, seconds):
+        self.marks.append((stage, seconds))
+
+    def show(self):
+        print("[bold]Время запуска:[/bold]")
+        for stage, seconds in self.marks:
+            print(f"  {stage:<40} {seconds:7.2f} с")
+
+
+startup_report = StartupReport()
+
+
+class LazyModel:
+    """
+    Модель, которая загружается при первом обращении (get) или заранее
+    в фоновом потоке (warm_up), когда ассистент уже слушает микрофон.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self._loader = loader
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def get(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    started = time.perf_counter()
+                    self._model = self._loader()
+                    startup_report.add(f"загрузка {self.name}", time.perf_counter() - started)
+                    print(f"{self.name} загружена за {time.perf_counter() - started:.2f} с")
+        return self._model
+
+    def warm_up(self):
+        """Загружает модель в фоне; ошибки только печатаются, get() попробует ещё раз."""
+        def load():
+            try:
+                self.get()
+            except Exception as e:
+                print(f"⚠️ Не удалось заранее загрузить {self.name}: {e}")
+
+        thread = threading.Thread(target=load, name=f"warm-up {self.name}", daemon=True)
+        thread.start()
+        return thread
+
+
+def measure_imports(modules):
+    """Время импорта каждого модуля в отдельном чистом процессе, с."""
+    timings = {}
+    for module in modules:
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        if result.returncode == 0:
+            timings[module] = float(result.stdout.strip().splitlines()[-1])
+        else:
+            timings[module] = None
+    return timings
+
+
+if __name__ == "__main__":
+    modules = sys.argv[1:] or ["audio_manager", "va_responder", "gpt_integration", "tts",
+                               "drone_manager", "bottle_tracker", "build_Fly", "main"]
+    print("[bold]Время импорта модулей:[/bold]")
+    for module, seconds in measure_imports(modules).items():
+        value = f"{seconds:7.2f} с" if seconds is not None else "ошибка импорта"
+        print(f"  {module:<20} {value}")
@@ -0,0 +1,178 @@
+#Кэш кода, сгенерированного LLM по командам «выполни ...»: повторная команда не ходит в сеть.
+#
+#   python llm_cache.py                    # список записей
+#   python llm_cache.py --forget "выполни сальто"
+#   python llm_cache.py --clear
+
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from rich import print
+
+import config
+
+
+def normalize_utterance(text):
+    """«Выполни, сальто вперёд!» и «выполни сальто вперед» — одна и та же команда."""
+    text = text.lower().replace('ё', 'е')
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+
+def script_key(utterance, prompt_template, model):
+    """Ключ: нормализованная фраза + шаблон запроса + модель; смена шаблона или модели — новый код."""
+    raw = f"{model}\n{prompt_template}\n{normalize_utterance(utterance)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ScriptCache:
+    """
+    Записи хранятся в одном JSON-файле (запись атомарная, через временный файл)
+    и в OrderedDict в порядке использования. Старше ttl_seconds — считаются
+    устаревшими, больше max_items — вытесняются давно не использованные.
+    Попадание в кэш меняет только память: счётчики сохраняются на диск вместе
+    со следующим изменением записей или при выходе (flush).
+    """
+
+    def __init__(self, path, max_items=200, ttl_seconds=30 * 24 * 3600):
+        self.path = path
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self.last_key = None  # последняя выданная или сохранённая запись — для «забудь последний код»
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False  # в памяти есть несохранённые попадания
+        self._load()
+        atexit.register(self.flush)
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "rt", encoding="utf8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Кэш кода {self.path} не прочитан, начинаем с пустого: {e}")
+            return
+        for key, entry in sorted(entries.items(), key=lambda item: item[1]["used"]):
+            self._entries[key] = entry
+
+    def _save(self):
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wt", encoding="utf8") as f:
+            json.dump(self._entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def flush(self):
+        """Сохраняет на диск попадания, накопленные после последней записи файла."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def _expired(self, entry, now):
+        return self.ttl_seconds is not None and now - entry["created"] > self.ttl_seconds
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry, now):
+                del self._entries[key]
+                self._dirty = True
+                return None
+            # Файл не переписываем на каждое попадание — голосовой цикл не ждёт диска
+            entry["used"] = now
+            entry["hits"] += 1
+            self._entries.move_to_end(key)
+            self.last_key = key
+            self._dirty = True
+            return entry["script"]
+
+    def put(self, key, utterance, script):
+        now = time.time()
+        with self._lock:
+            self._entries[key] = {
+                "utterance": normalize_utterance(utterance),
+                "script": script,
+                "created": now,
+                "used": now,
+                "hits": 0,
+            }
+            self._entries.move_to_end(key)
+            self.last_key = key
+            expired = [k for k, entry in self._entries.items() if self._expired(entry, now)]
+            for k in expired:
+                del self._entries[k]
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def invalidate(self, key=None, utterance=None):
+        """Удаляет запись по ключу или все записи для фразы (под любым шаблоном и моделью)."""
+        with self._lock:
+            if utterance is not None:
+                utterance = normalize_utterance(utterance)
+                keys = [k for k, entry in self._entries.items() if entry["utterance"] == utterance]
+            else:
+                keys = [key] if key in self._entries else []
+            for k in keys:
+                del self._entries[k]
+            if self.last_key in keys:
+                self.last_key = None
+            if keys:
+                self._save()
+            return len(keys)
+
+    def invalidate_last(self):
+        """«Забудь последний код»: сгенерированный скрипт оказался неудачным."""
+        if self.last_key is None:
+            return 0
+        return self.invalidate(key=self.last_key)
+
+    def clear(self):
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self.last_key = None
+            self._save()
+            return count
+
+    def items(self):
+        with self._lock:
+            return list(self._entries.items())
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser("llm_cache.py", description="Кэш кода, сгенерированного по командам «выполни»")
+    parser.add_argument("--file", default=config.LLM_CACHE_FILE, help="файл кэша")
+    parser.add_argument("--forget", metavar="ФРАЗА", help="удалить записи для фразы")
+    parser.add_argument("--clear", action="store_true", help="удалить все записи")
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    cache = ScriptCache(args.file, max_items=config.LLM_CACHE_ITEMS,
+                        ttl_seconds=config.LLM_CACHE_TTL_DAYS * 24 * 3600)
+    if args.clear:
+        print(f"Удалено записей: {cache.clear()}")
+    elif args.forget:
+        print(f"Удалено записей: {cache.invalidate(utterance=args.forget)}")
+    else:
+        for key, entry in cache.items():
+            used = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["used"]))
+            print(f"{key[:12]}  {used}  {entry['hits']:4d} повт.  {entry['utterance']}")
+        print(f"Всего записей: {len(cache)}")
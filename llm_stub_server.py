@@ -0,0 +1,191 @@
+#Локальная замена OpenAI API: отдаёт заготовленные ответы потоком (SSE), как /v1/chat/completions.
+#Нужна, чтобы проверять путь «выполни ...» и нагружать его без сети и токена.
+#
+#   python llm_stub_server.py                        # сервер на 127.0.0.1:8765
+#   python llm_stub_server.py --first 0.8 --delay 0.03 --answers answers.json
+#   python llm_stub_server.py --bench 20             # нагрузочный прогон GPTIntegration.stream_answer
+#
+#В config.py: LLM_API_BASE = 'http://127.0.0.1:8765/v1'
+#Файл ответов — список {"match": "подстрока запроса", "answer": "текст"}; первый совпавший, иначе ответ по умолчанию.
+
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rich import print
+
+DEFAULT_ANSWER = """```python
+from djitellopy import TelloSwarm
+
+swarm = TelloSwarm.fromIps(['192.168.0.120', '192.168.0.121'])
+swarm.connect()
+swarm.takeoff()
+swarm.move_up(50)
+swarm.land()
+swarm.end()
+```
+Дроны взлетают, поднимаются на 50 см и садятся.
+"""
+
+
+def split_tokens(text):
+    """Куски примерно как у настоящей модели: слово вместе с пробелами перед ним."""
+    return re.findall(r"\s*\S+|\s+", text)
+
+
+class StubLLM:
+    def __init__(self, answers=(), first_token=0.3, delay=0.02, stall_after=None):
+        self.answers = list(answers)
+        self.first_token = first_token    # задержка до первого куска, с
+        self.delay = delay                # пауза между кусками, с
+        self.stall_after = stall_after    # после стольких кусков поток «зависает» — проверка read_timeout
+        self.requests = 0
+
+    def answer_for(self, messages):
+        prompt = messages[-1].get("content", "") if messages else ""
+        for entry in self.answers:
+            if entry["match"] in prompt:
+                return entry["answer"]
+        return DEFAULT_ANSWER
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "llm-stub/1.0"
+
+    def log_message(self, format, *args):
+        pass  # без строки на каждый запрос — мешает при нагрузочном прогоне
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        except ValueError:
+            self.send_error(400, "bad json")
+            return
+
+        stub = self.server.stub
+        stub.requests += 1
+        text = stub.answer_for(body.get("messages", []))
+        model = body.get("model", "stub")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        time.sleep(stub.first_token)
+
+        if not body.get("stream"):
+            self._send_json({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(split_tokens(text)), "total_tokens": 0},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            self._send_event(completion_id, model, {"role": "assistant"})
+            for i, token in enumerate(split_tokens(text)):
+                if stub.stall_after is not None and i >= stub.stall_after:
+                    time.sleep(3600)
+                self._send_event(completion_id, model, {"content": token})
+                time.sleep(stub.delay)
+            self._send_event(completion_id, model, {}, finish_reason="stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # клиент ушёл по таймауту или получил код и закрыл соединение
+
+    def _send_event(self, completion_id, model, delta, finish_reason=None):
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _send_json(self, data):
+        raw = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+def make_server(stub, host="127.0.0.1", port=8765):
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.stub = stub
+    return server
+
+
+def _benchmark(server, clients):
+    """Параллельные запросы через GPTIntegration.stream_answer: когда готов код и когда закончился ответ."""
+    from gpt_integration import ERROR_ANSWERS, GPTIntegration
+
+    host, port = server.server_address[:2]
+
+    def one(i):
+        gpt = GPTIntegration("stub", {"role": "system", "content": "stub"},
+                             api_base=f"http://{host}:{port}/v1", connect_timeout=2, read_timeout=5)
+        gpt.add_message("user", f"выполни взлёт {i}")
+        started = time.perf_counter()
+        code_at = []
+        answer = gpt.stream_answer(on_code=lambda code: code_at.append(time.perf_counter() - started))
+        return (code_at[0] if code_at else None), time.perf_counter() - started, answer in ERROR_ANSWERS
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with ThreadPoolExecutor(clients) as pool:
+        results = list(pool.map(one, range(clients)))
+    server.shutdown()
+
+    def pct(values, q):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+    code = [r[0] for r in results if r[0] is not None]
+    done = [r[1] for r in results]
+    print(f"клиентов: {clients}, ошибок: {sum(r[2] for r in results)}")
+    if code:
+        print(f"код получен:     p50 {pct(code, 0.5):6.0f} мс   p95 {pct(code, 0.95):6.0f} мс")
+    print(f"ответ завершён:  p50 {pct(done, 0.5):6.0f} мс   p95 {pct(done, 0.95):6.0f} мс")
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser("llm_stub_server.py", description="Локальная замена OpenAI API с заготовленными ответами")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--answers", help="JSON-файл с заготовленными ответами")
+    parser.add_argument("--first", type=float, default=0.3, help="задержка до первого куска, с")
+    parser.add_argument("--delay", type=float, default=0.02, help="пауза между кусками, с")
+    parser.add_argument("--stall-after", type=int, help="зависнуть после N кусков (проверка таймаута)")
+    parser.add_argument("--bench", type=int, metavar="N", help="нагрузочный прогон из N параллельных клиентов")
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    answers = ()
+    if args.answers:
+        with open(args.answers, "rt", encoding="utf8") as f:
+            answers = json.load(f)
+    server = make_server(StubLLM(answers, args.first, args.delay, args.stall_after), args.host, args.port)
+    if args.bench:
+        _benchmark(server, args.bench)
+    else:
+        print(f"LLM-заглушка слушает http://{args.host}:{args.port}/v1")
+        server.serve_forever()
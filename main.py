@@ -1,35 +1,62 @@
-import json
+from lazy_loader import startup_report  # первым, чтобы засечь время импорта остальных модулей
 import os
-import struct
 import time
 from rich import print
 import yaml
 import config
 from audio_manager import AudioManager
+from fast_path import FastCommandPath
+from grammar_recognizer import drone_grammar
+from hot_reload import HotReloader
+from llm_cache import ScriptCache
+from script_executor import ScriptExecutor
+from flight_plan import FlightPlanEngine
 from gpt_integration import GPTIntegration
 from va_responder import VAResponder
+from voice_loop import VoiceLoop
+from tracing import tracer
 import drone_manager
 import build_Fly
+import bottle_tracker
 import tts
 
 CDIR = os.getcwd()
 VA_CMD_LIST = yaml.safe_load(
-    open('commands.yaml', 'rt', encoding='utf8'),
+    open(config.COMMANDS_FILE, 'rt', encoding='utf8'),
 )
 
 def main():
+    startup_report.mark("импорт модулей")
     print(f"Jarvis (v3.0) начал свою работу ...")
 
+    grammar_phrases = None
+    if config.GRAMMAR_RECOGNIZER:
+        grammar_phrases = drone_grammar(VA_CMD_LIST, drone_manager, va_alias=config.VA_ALIAS)
+
     audio_manager = AudioManager(
         porcupine_access_key=config.PICOVOICE_TOKEN,
         microphone_index=config.MICROPHONE_INDEX,
         vosk_model_path="model_small",
-        sound_dir=os.path.join(CDIR, "sound")
+        sound_dir=os.path.join(CDIR, "sound"),
+        ring_seconds=config.AUDIO_RING_SECONDS,
+        drop_policy=config.AUDIO_DROP_POLICY,
+        grammar_phrases=grammar_phrases,
+        va_alias=config.VA_ALIAS
     )
 
+    # Процесс для сгенерированного кода поднимается заранее, пока грузится остальное
+    script_executor = ScriptExecutor(config.SCRIPT_SWARM_IPS, timeout=config.SCRIPT_TIMEOUT,
+                                     ports_busy=drone_manager.owns_drone_ports).start() \
+        if config.SCRIPT_EXECUTOR and not config.FLIGHT_PLANS else None
+
     gpt_integration = GPTIntegration(
         openai_api_key=config.OPENAI_TOKEN,
-        system_message={"role": "system", "content": "Ты голосовой ассистент из железного человека."}
+        system_message={"role": "system", "content": "Ты голосовой ассистент из железного человека."},
+        api_base=config.LLM_API_BASE,
+        connect_timeout=config.LLM_CONNECT_TIMEOUT,
+        read_timeout=config.LLM_READ_TIMEOUT,
+        context_budget=config.LLM_CONTEXT_BUDGET,
+        keep_turns=config.LLM_KEEP_TURNS
     )
 
     va_responder = VAResponder(
@@ -40,42 +67,49 @@ def main():
         audio_manager=audio_manager,
         tts_module=tts,
         drone_manager_module=drone_manager,
-        build_fly_module=build_Fly
+        build_fly_module=build_Fly,
+        llm_cache=ScriptCache(config.LLM_CACHE_FILE, max_items=config.LLM_CACHE_ITEMS,
+                              ttl_seconds=config.LLM_CACHE_TTL_DAYS * 24 * 3600) if config.LLM_CACHE else None,
+        script_executor=script_executor,
+        flight_engine=FlightPlanEngine(drone_manager) if config.FLIGHT_PLANS else None
     )
 
-    audio_manager.play_sound("run")
-    time.sleep(0.5)
-
-    last_trigger_time = time.time() - 1000  # Время последнего срабатывания активационного слова
+    # commands.yaml и drones.yaml можно править, не перезапуская ассистента
+    if config.HOT_RELOAD:
+        HotReloader(va_responder, audio_manager, drone_manager, config.COMMANDS_FILE, config.DRONES_FILE,
+                    va_alias=config.VA_ALIAS, interval=config.HOT_RELOAD_INTERVAL).start()
 
-    while True:
-        try:
-            pcm = audio_manager.recorder.read()
-            keyword_index = audio_manager.porcupine.process(pcm)
+    # Задержки по этапам каждой фразы — в config.TRACE_FILE, сводка: python tracing.py
+    if config.TRACE:
+        tracer.open(config.TRACE_FILE)
 
-            if keyword_index >= 0:
-                audio_manager.recorder.stop()
-                audio_manager.play_sound("greet", wait_done=True)
-                print("Yes, sir.")
-                audio_manager.recorder.start()  # Предотвращаем самозапись
-                last_trigger_time = time.time()
+    startup_report.mark("микрофон слушает")
 
-            # Слушаем команды в течение 10 секунд после активации
-            while time.time() - last_trigger_time <= 10:
-                pcm = audio_manager.recorder.read()
-                sp = struct.pack("h" * len(pcm), *pcm)
+    # Silero и YOLO догружаются в фоне, пока ассистент уже ждёт «Джарвис»
+    if config.WARM_UP_MODELS:
+        tts.model.warm_up()
+        bottle_tracker.model.warm_up()
 
-                if audio_manager.kaldi_rec.AcceptWaveform(sp):
-                    recognized_text = json.loads(audio_manager.kaldi_rec.Result())["text"]
-                    if va_responder.respond(recognized_text):
-                        last_trigger_time = time.time()  # Обновляем время, если команда распознана
+    audio_manager.play_sound("run", wait_done=True)
+    time.sleep(0.5)
+    startup_report.mark("готов к активации")
+    startup_report.show()
 
-                    break  # Выходим из внутреннего цикла после обработки команды или тишины
+    voice_loop = VoiceLoop(
+        audio_manager,
+        va_responder,
+        listen_seconds=config.LISTEN_SECONDS,
+        preroll_ms=config.PREROLL_MS,
+        fast_path=FastCommandPath(drone_manager) if config.FAST_PATH else None,
+        speech=tts
+    )
 
-        except Exception as err:
-            print(f"Неожиданная ошибка: {err=}, {type(err)=}")
-            audio_manager.stop_recorder()
-            raise
+    try:
+        voice_loop.run()
+    except Exception as err:
+        print(f"Неожиданная ошибка: {err=}, {type(err)=}")
+        audio_manager.stop_recorder()
+        raise
 
 
 if __name__ == "__main__":
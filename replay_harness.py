@@ -0,0 +1,266 @@
+#Офлайн-прогон голосового конвейера (Porcupine -> Vosk -> VAResponder.respond) по записанным wav-файлам.
+#Дроны, TTS, GPT и звуки заменены заглушками, поэтому прогон идёт без микрофона,
+#колонок и дронов (например, на CI) и быстрее реального времени. С --no-wake не нужны
+#ни pvporcupine с ключом Picovoice, ни pvrecorder и simpleaudio — только vosk и модель.
+#
+#   python replay_harness.py sessions/            # папка wav (16 кГц, моно, 16 бит)
+#   python replay_harness.py session.wav --no-wake
+#
+#Если рядом с wav лежит .txt с ожидаемой фразой, в отчёте будет отметка совпадения.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+
+import yaml
+from rich import print
+
+import config
+from audio_manager import AudioManager
+from audio_sources import WavDirectorySource, WavFileSource
+from fast_path import FastCommandPath
+from grammar_recognizer import drone_grammar
+from intent_parser import ALL_WORDS, IntentParser, command_phrases
+from va_responder import VAResponder
+from voice_loop import VoiceLoop
+
+FRAME_LENGTH = 512  # pvporcupine всегда работает кадрами по 512 сэмплов
+
+
+class StubDroneManager:
+    """Заглушка drone_manager: запоминает команды вместо отправки дронам."""
+
+    def __init__(self, drone_names):
+        self.DRONE_IPS = {name: f"stub-{i}" for i, name in enumerate(drone_names)}
+        self.CLASS_NAMES = {"бутылку": 39, "человека": 0, "кошку": 15, "собаку": 16}
+        self.DRONE_COMMANDS = command_phrases()
+        self.DRONE_TARGETS = tuple(self.DRONE_IPS) + ALL_WORDS
+        self.intent_parser = IntentParser(self.DRONE_IPS, self.CLASS_NAMES)
+        self.drones = {}
+        self.calls = []
+
+    def initialize_drones(self, on_progress=None):
+        self.calls.append(("initialize_drones",))
+        return list(self.DRONE_IPS), []
+
+    def execute_drone_command(self, drone_name, command, on_sent=None):
+        return self.execute_intent(self.intent_parser.parse(f"{drone_name} {command}"), on_sent=on_sent)
+
+    def execute_intent(self, intent, on_sent=None):
+        for drone_name in intent.targets:
+            self.calls.append((drone_name, intent.verb, intent.value))
+            if on_sent is not None:
+                on_sent(drone_name, time.monotonic())  # у заглушки команда «уходит» сразу
+
+
+class StubBuildFly:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def build_formation(self, drones):
+        self.calls.append(("build_formation",))
+
+    def land_all_drones(self, drones):
+        self.calls.append(("land_all_drones",))
+
+
+class StubTTS:
+    def __init__(self):
+        self.spoken = []
+
+    def va_speak(self, what, wait=False, priority=None, collapse_key=None):
+        self.spoken.append(what)
+        future = Future()
+        future.set_result(True)
+        return future
+
+    def barge_in(self):
+        pass
+
+
+class StubGPT:
+    def __init__(self):
+        self.prompts = []
+
+    def add_message(self, role, content):
+        self.prompts.append(content)
+
+    def get_answer(self):
+        return ""
+
+    def stream_answer(self, on_token=None, on_code=None):
+        if on_code:
+            on_code("")
+        return ""
+
+    def clear_message_log(self):
+        pass
+
+
+class SilentSoundBank:
+    def play(self, phrase):
+        future = Future()
+        future.set_result(True)
+        return future
+
+
+class Utterance:
+    def __init__(self, name, audio_frames, expected):
+        self.name = name
+        self.audio_frames = audio_frames  # кадров речи без хвоста тишины
+        self.expected = expected
+        self.results = []  # (текст, обработано, задержка по аудио мс, задержка по времени мс)
+        self.calls = []
+        self.spoken = []
+
+
+def read_expected(wav_path):
+    txt_path = os.path.splitext(wav_path)[0] + ".txt"
+    if not os.path.isfile(txt_path):
+        return None
+    with open(txt_path, encoding="utf8") as f:
+        return " ".join(f.read().lower().split())
+
+
+def replay(args):
+    path = os.path.abspath(args.path)
+    if os.path.isdir(path):
+        source = WavDirectorySource(path, FRAME_LENGTH, trailing_silence=args.silence)
+    else:
+        source = WavFileSource(path, FRAME_LENGTH, trailing_silence=args.silence)
+
+    with open(args.commands, "rt", encoding="utf8") as f:
+        va_cmd_list = yaml.safe_load(f)
+
+    drone_manager = StubDroneManager(args.drones.split(","))
+    tts = StubTTS()
+    grammar_phrases = None
+    if config.GRAMMAR_RECOGNIZER:
+        grammar_phrases = drone_grammar(va_cmd_list, drone_manager, va_alias=config.VA_ALIAS)
+
+    audio_manager = AudioManager(
+        porcupine_access_key=None if args.no_wake else config.PICOVOICE_TOKEN,
+        microphone_index=-1,
+        vosk_model_path=os.path.abspath(args.model),
+        sound_dir="",
+        grammar_phrases=grammar_phrases,
+        va_alias=config.VA_ALIAS,
+        audio_source=source,
+        start_capture=False,
+        sound_bank=SilentSoundBank(),
+        wake_word=not args.no_wake
+    )
+    audio_manager.set_volume_mute = lambda mute: None
+
+    # Ветка «выполни» пишет tello_command.py в текущую папку — уводим её во временную
+    os.chdir(tempfile.mkdtemp(prefix="replay_"))
+
+    va_responder = VAResponder(
+        va_cmd_list=va_cmd_list,
+        va_alias=config.VA_ALIAS,
+        va_tbr=config.VA_TBR,
+        gpt_integration=StubGPT(),
+        audio_manager=audio_manager,
+        tts_module=tts,
+        drone_manager_module=drone_manager,
+        build_fly_module=StubBuildFly(drone_manager.calls)
+    )
+
+    utterances = []
+    state = {"frame": 0, "speech_end_wall": None}
+
+    def on_response(text, handled):
+        current = utterances[-1]
+        frames_after = max(0, state["frame"] - current.audio_frames)
+        wall_ms = 0.0
+        if state["speech_end_wall"] is not None:
+            wall_ms = (time.perf_counter() - state["speech_end_wall"]) * 1000
+        audio_ms = frames_after * FRAME_LENGTH / audio_manager.samplerate * 1000
+        current.results.append((text, handled, audio_ms, wall_ms))
+
+    voice_loop = VoiceLoop(
+        audio_manager,
+        va_responder,
+        listen_seconds=config.LISTEN_SECONDS,
+        preroll_ms=config.PREROLL_MS,
+        fast_path=FastCommandPath(drone_manager) if config.FAST_PATH else None,
+        on_response=on_response
+    )
+
+    total_frames = 0
+    started = time.perf_counter()
+    current_source = None
+    while True:
+        try:
+            pcm = source.read()
+        except EOFError:
+            break
+
+        file_source = getattr(source, "current", source)
+        if file_source is not current_source:
+            current_source = file_source
+            utterances.append(Utterance(os.path.basename(file_source.path), file_source.audio_frames,
+                                        read_expected(file_source.path)))
+            audio_manager.kaldi_rec.Reset()
+            state["frame"] = 0
+            state["speech_end_wall"] = None
+
+        state["frame"] += 1
+        if state["frame"] == current_source.audio_frames:
+            state["speech_end_wall"] = time.perf_counter()
+        if args.no_wake:
+            voice_loop.frames_left = voice_loop.listen_frames
+        audio_manager.ring.last_timestamp = time.monotonic()  # для замеров быстрого пути
+
+        calls_before = len(drone_manager.calls)
+        spoken_before = len(tts.spoken)
+        voice_loop.process_frame(pcm)
+        utterances[-1].calls.extend(drone_manager.calls[calls_before:])
+        utterances[-1].spoken.extend(tts.spoken[spoken_before:])
+        total_frames += 1
+
+    elapsed = time.perf_counter() - started
+    report(utterances, total_frames, elapsed, audio_manager.samplerate)
+
+
+def report(utterances, total_frames, elapsed, samplerate):
+    matched = checked = 0
+    for u in utterances:
+        texts = [text for text, *_ in u.results if text]
+        status = ""
+        if u.expected is not None:
+            checked += 1
+            ok = u.expected in texts
+            matched += ok
+            status = "✅" if ok else f"❌ ожидалось «{u.expected}»"
+        print(f"\n[bold]{u.name}[/bold] {status}")
+        for text, handled, audio_ms, wall_ms in u.results:
+            if text:
+                print(f"  «{text}» обработано={handled} задержка: {audio_ms:.0f} мс аудио / {wall_ms:.1f} мс CPU")
+        for call in u.calls:
+            print(f"  дрон: {call}")
+        for phrase in u.spoken:
+            print(f"  tts: {phrase}")
+
+    audio_seconds = total_frames * FRAME_LENGTH / samplerate
+    print(f"\nФайлов: {len(utterances)}, совпадений: {matched}/{checked}")
+    print(f"Кадров: {total_frames} ({audio_seconds:.1f} с аудио) за {elapsed:.2f} с — "
+          f"{total_frames / elapsed:.0f} кадров/с, x{audio_seconds / elapsed:.1f} реального времени")
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser("replay_harness.py", description="Офлайн-прогон голосового конвейера по wav-файлам")
+    parser.add_argument("path", help="wav-файл или папка с wav-файлами")
+    parser.add_argument("--model", default="model_small", help="папка модели Vosk")
+    parser.add_argument("--commands", default="commands.yaml", help="файл команд")
+    parser.add_argument("--drones", default="первый,второй,третий", help="имена дронов-заглушек через запятую")
+    parser.add_argument("--silence", type=float, default=1.0, help="секунд тишины после каждого файла")
+    parser.add_argument("--no-wake", action="store_true", help="слушать команды без активационного слова")
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    replay(parse_args(sys.argv[1:]))
@@ -0,0 +1,297 @@
+#Тёплый процесс для кода, сгенерированного LLM: интерпретатор и djitellopy уже готовы,
+#подключения к дронам переживают скрипт, скрипт выполняется сразу и не блокирует голосовой цикл.
+#
+#Tello в рабочем процессе занимает те же UDP-порты 8889/8890, что и drone_manager в основном.
+#Поэтому дроны подключаются только первым скриптом, скрипт не запускается, пока дроны подключены
+#в основном процессе («дроны запуск»), а перед таким подключением процесс перезапускается (release).
+#
+#   python script_executor.py     # сравнение с subprocess.run на каждый скрипт
+
+import linecache
+import multiprocessing
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+
+from rich import print
+
+SCRIPT_NAME = "tello_command.py"  # имя файла в трассировках ошибок
+
+# Посадка после отмены или таймаута: дроны не должны остаться висеть с оборванным скриптом
+EMERGENCY_LANDING = "from djitellopy import TelloSwarm\nTelloSwarm.fromIps({ips!r}).parallel(lambda i, tello: tello.land())\n"
+
+
+class ScriptResult:
+    def __init__(self, ok, error=None, submitted=None, started=None, first_command=None, finished=None):
+        self.ok = ok
+        self.error = error
+        self.submitted = submitted          # время постановки в очередь (time.time())
+        self.started = started              # начало выполнения в рабочем процессе
+        self.first_command = first_command  # первая команда дрону, None — команд не было
+        self.finished = finished
+
+    @property
+    def first_command_ms(self):
+        if self.first_command is None or self.submitted is None:
+            return None
+        return (self.first_command - self.submitted) * 1000
+
+
+def _patch_djitellopy(first_command):
+    """
+    В рабочем процессе TelloSwarm.fromIps отдаёт объекты Tello, созданные первым
+    скриптом: повторный connect() для них ничего не делает, а end() их не
+    закрывает — следующий скрипт получит те же подключения. Заранее объекты
+    не создаются, иначе процесс занял бы порты дронов, ещё ничего не выполняя.
+    """
+    from djitellopy import Tello, TelloSwarm
+
+    handles = {}
+
+    def get_handle(ip):
+        tello = handles.get(ip)
+        if tello is None:
+            tello = handles[ip] = Tello(ip)
+        return tello
+
+    def from_ips(ips):
+        return TelloSwarm([get_handle(ip) for ip in ips])
+
+    original_connect = Tello.connect
+
+    def connect(self, *args, **kwargs):
+        if not getattr(self, "_warm_connected", False):
+            original_connect(self, *args, **kwargs)
+            self._warm_connected = True
+
+    def remember_first(send):
+        def wrapper(self, *args, **kwargs):
+            if first_command[0] is None:
+                first_command[0] = time.time()
+            return send(self, *args, **kwargs)
+        return wrapper
+
+    TelloSwarm.fromIps = staticmethod(from_ips)
+    Tello.connect = connect
+    Tello.end = lambda self: None
+    Tello.send_command_with_return = remember_first(Tello.send_command_with_return)
+    Tello.send_command_without_return = remember_first(Tello.send_command_without_return)
+
+
+def _worker_main(jobs, results, preload):
+    first_command = [None]
+    if preload:
+        try:
+            _patch_djitellopy(first_command)
+        except ImportError as e:
+            print(f"⚠️ Рабочий процесс без djitellopy: {e}")
+    results.put(("ready", None, None))
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, code = job
+        # Трассировка ошибки должна показывать строки этого скрипта, а не файла с тем же именем
+        linecache.cache[SCRIPT_NAME] = (len(code), None, code.splitlines(True), SCRIPT_NAME)
+        first_command[0] = None
+        started = time.time()
+        ok, error = True, None
+        try:
+            exec(compile(code, SCRIPT_NAME, "exec"), {"__name__": "__main__"})
+        except SystemExit as e:  # sys.exit() в скрипте завершает скрипт, а не процесс
+            if e.code not in (None, 0):
+                ok, error = False, f"SystemExit: {e.code}"
+        except BaseException:
+            ok, error = False, traceback.format_exc(limit=-3)
+        results.put(("done", job_id, (ok, error, started, first_command[0], time.time())))
+
+
+class ScriptExecutor:
+    """
+    Один долгоживущий процесс выполняет скрипты по очереди. submit() сразу
+    возвращает Future с ScriptResult. Скрипт дольше timeout или отменённый
+    через cancel() обрывается вместе с процессом; новый процесс поднимается
+    сразу, дронам из drone_ips отправляется посадка, а ожидавшие скрипты
+    (если их не отменили тоже) переходят в новый процесс.
+
+    ports_busy() — True, когда порты дронов заняты в основном процессе;
+    тогда submit() сразу отвечает ошибкой, а не запускает скрипт.
+    """
+
+    def __init__(self, drone_ips=(), timeout=120.0, preload=True, land_on_cancel=True, ports_busy=None):
+        self.drone_ips = list(drone_ips)
+        self.timeout = timeout
+        self.preload = preload
+        self.land_on_cancel = land_on_cancel
+        self.ports_busy = ports_busy
+        self.ready = threading.Event()
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._ids = 0
+        self._pending = {}    # job_id -> (Future, время постановки)
+        self._codes = {}      # job_id -> код, чтобы переотправить ожидающие после перезапуска
+        self._running = None  # (job_id, крайний срок)
+        self._process = None
+        self._stopped = False
+
+    def start(self):
+        with self._lock:
+            self._spawn()
+        threading.Thread(target=self._listen, name="script-executor", daemon=True).start()
+        return self
+
+    def _spawn(self):
+        self.ready.clear()
+        self._jobs = self._context.Queue()
+        self._results = self._context.Queue()
+        self._process = self._context.Process(
+            target=_worker_main,
+            args=(self._jobs, self._results, self.preload),
+            name="drone-scripts",
+            daemon=True
+        )
+        self._process.start()
+
+    def submit(self, code):
+        future = Future()
+        if self.ports_busy is not None and self.ports_busy():
+            future.set_result(ScriptResult(False, "дроны подключены в основном процессе, "
+                                                  "скрипт не может занять их порты", submitted=time.time()))
+            return future
+        with self._lock:
+            self._ids += 1
+            job_id = self._ids
+            self._pending[job_id] = (future, time.time())
+            self._codes[job_id] = code
+            self._jobs.put((job_id, code))
+            if self._running is None and self.ready.is_set():
+                self._running = self._next_deadline()
+        return future
+
+    def cancel(self, reason="отменено", waiting=True):
+        """
+        Обрывает выполняемый скрипт, а при waiting=True и все ожидающие.
+        Возвращает число отменённых скриптов.
+        """
+        with self._lock:
+            running = self._running[0] if self._running is not None else None
+            if waiting or running is None:
+                cancelled, self._pending = self._pending, {}
+            else:
+                cancelled = {running: self._pending.pop(running)} if running in self._pending else {}
+            self._running = None
+            self._process.terminate()
+            self._process.join(timeout=2)
+            if not self._stopped:
+                self._spawn()
+                if self.land_on_cancel and self.drone_ips and cancelled:
+                    self._jobs.put((0, EMERGENCY_LANDING.format(ips=self.drone_ips)))
+                for job_id in sorted(self._pending):
+                    self._jobs.put((job_id, self._codes[job_id]))  # ожидавшие — в новый процесс
+            for job_id in cancelled:
+                self._codes.pop(job_id, None)
+
+        for future, submitted in cancelled.values():
+            future.set_result(ScriptResult(False, reason, submitted=submitted))
+        return len(cancelled)
+
+    def release(self):
+        """
+        Перезапускает простаивающий рабочий процесс, чтобы он закрыл подключения
+        к дронам и освободил их порты для основного процесса. False — скрипт
+        ещё выполняется или ждёт очереди, процесс не тронут.
+        """
+        with self._lock:
+            if self._pending:
+                return False
+            self._process.terminate()
+            self._process.join(timeout=2)
+            if not self._stopped:
+                self._spawn()
+        return True
+
+    def stop(self):
+        self._stopped = True
+        self.cancel("остановлено")
+
+    def _listen(self):
+        while not self._stopped:
+            with self._lock:
+                results, running = self._results, self._running
+            if running is not None and time.time() > running[1]:
+                print(f"⏱ Скрипт выполняется дольше {self.timeout:.0f} с — прерываю")
+                self.cancel(f"таймаут {self.timeout:.0f} с", waiting=False)
+                continue
+
+            try:
+                kind, job_id, payload = results.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                continue  # очередь закрыта при перезапуске процесса
+
+            with self._lock:
+                if results is not self._results:
+                    continue  # ответ от уже остановленного процесса
+                if kind == "ready":
+                    self.ready.set()
+                    self._running = self._next_deadline()
+                    continue
+                entry = self._pending.pop(job_id, None)
+                self._codes.pop(job_id, None)
+                self._running = self._next_deadline()
+            if entry is None:
+                continue
+
+            future, submitted = entry
+            ok, error, started, first_command, finished = payload
+            future.set_result(ScriptResult(ok, error, submitted, started, first_command, finished))
+
+    def _next_deadline(self):
+        # Скрипты выполняются по очереди: срок отсчитывается от начала следующего в очереди
+        if not self._pending:
+            return None
+        job_id = min(self._pending)
+        return job_id, time.time() + self.timeout
+
+
+def _benchmark(runs=10):
+    """Время от отправки скрипта до его первой строки: subprocess.run против тёплого процесса."""
+    code = "import time\nSTARTED = time.time()\n"
+    try:
+        import djitellopy  # noqa: F401 — в subprocess каждый скрипт импортирует его заново
+        code = "from djitellopy import TelloSwarm\n" + code
+    except ImportError:
+        print("djitellopy не установлен — замер без импорта библиотеки дронов")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, SCRIPT_NAME)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(code + "print(STARTED)\n")
+        cold = []
+        for _ in range(runs):
+            submitted = time.time()
+            out = subprocess.run([sys.executable, path], capture_output=True, text=True).stdout
+            cold.append((float(out.split()[-1]) - submitted) * 1000)
+
+    executor = ScriptExecutor(preload=False).start()
+    executor.ready.wait(30)
+    warm = []
+    for _ in range(runs):
+        result = executor.submit(code).result()
+        warm.append((result.started - result.submitted) * 1000)
+    executor.stop()
+
+    print(f"subprocess.run:   {sorted(cold)[runs // 2]:7.1f} мс до первой строки скрипта (медиана)")
+    print(f"тёплый процесс:   {sorted(warm)[runs // 2]:7.1f} мс")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,124 @@
+#Банк звуков: все sound/*.wav декодируются один раз при старте и играются из памяти.
+
+import glob
+import os
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+from rich import print
+
+
+def load_wave(path):
+    import simpleaudio as sa  # только когда звуки нужны: replay_harness обходится без simpleaudio
+    return sa.WaveObject.from_wave_file(path)
+
+
+def phrase_of(filename):
+    """greet2.wav -> greet, not_found.wav -> not_found"""
+    name = os.path.splitext(os.path.basename(filename))[0]
+    return re.sub(r"\d+$", "", name) or name
+
+
+class SoundBank:
+    """
+    Звуки в памяти, сгруппированные по фразе (greet -> greet1..3).
+    play() не блокирует: возвращает Future, которая завершается по окончании
+    воспроизведения. За всеми активными звуками следит один фоновый поток.
+    """
+
+    def __init__(self, sound_dir):
+        self.sound_dir = sound_dir
+        self.sounds = {}
+        self._by_path = {}
+
+        for filename in sorted(glob.glob(os.path.join(sound_dir, "*.wav"))):
+            try:
+                wave_obj = load_wave(filename)
+            except Exception as e:
+                print(f"Ошибка: не удалось загрузить {filename}: {e}")
+                continue
+            self.sounds.setdefault(phrase_of(filename), []).append(wave_obj)
+            self._by_path[os.path.abspath(filename)] = wave_obj
+
+        self._playing = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        threading.Thread(target=self._watch, name="sound-bank", daemon=True).start()
+
+    def get(self, phrase):
+        """Звук по фразе (случайный вариант) или по пути к файлу; None, если не найден."""
+        variants = self.sounds.get(phrase)
+        if variants:
+            return random.choice(variants)
+
+        path = os.path.abspath(phrase)
+        wave_obj = self._by_path.get(path)
+        if wave_obj is None and os.path.isfile(path):
+            wave_obj = load_wave(path)
+            self._by_path[path] = wave_obj
+        return wave_obj
+
+    def play(self, phrase):
+        """Запускает звук и сразу возвращает Future (результат — True, если звук найден)."""
+        future = Future()
+        wave_obj = self.get(phrase)
+        if wave_obj is None:
+            print(f"Ошибка: Аудиофайл не найден: {phrase}")
+            future.set_result(False)
+            return future
+
+        play_obj = wave_obj.play()
+        with self._lock:
+            self._playing.append((play_obj, future))
+        self._wakeup.set()
+        return future
+
+    def _watch(self):
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                still_playing = []
+                for play_obj, future in self._playing:
+                    if play_obj.is_playing():
+                        still_playing.append((play_obj, future))
+                    else:
+                        future.set_result(True)
+                self._playing = still_playing
+                if not still_playing:
+                    self._wakeup.clear()
+            time.sleep(0.01)
+
+
+def _benchmark(sound_dir, phrase="greet", runs=20):
+    """Задержка от активации до старта звука: чтение с диска на каждый вызов против банка в памяти."""
+    variants = sorted(glob.glob(os.path.join(sound_dir, f"{phrase}*.wav")))
+    if not variants:
+        print(f"Нет файлов {phrase}*.wav в {sound_dir}")
+        return
+
+    def measure(start_sound):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            play_obj = start_sound()
+            timings.append(time.perf_counter() - start)
+            play_obj.stop()
+        timings.sort()
+        return timings[len(timings) // 2] * 1000
+
+    disk_ms = measure(lambda: load_wave(random.choice(variants)).play())
+
+    bank = SoundBank(sound_dir)
+    bank_ms = measure(lambda: bank.get(phrase).play())
+
+    print(f"Активация -> старт звука '{phrase}' (медиана из {runs}):")
+    print(f"  чтение с диска:  {disk_ms:7.2f} мс")
+    print(f"  банк в памяти:   {bank_ms:7.2f} мс")
+
+
+if __name__ == "__main__":
+    _benchmark(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.getcwd(), "sound"))
@@ -0,0 +1,93 @@
+#Очередь озвучки: отдельный поток говорит фразы по приоритету, вызывающий код не ждёт.
+
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+
+from rich import print
+
+URGENT = 0  # ошибки дронов, аварийные сообщения
+NORMAL = 1
+LOW = 2
+
+
+class SpeechItem:
+    def __init__(self, text, priority, collapse_key):
+        self.text = text
+        self.priority = priority
+        self.collapse_key = collapse_key
+        self.future = Future()
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+        if not self.future.done():
+            self.future.set_result(False)
+
+
+class SpeechWorker:
+    """
+    Поток озвучки с очередью по приоритету.
+
+    say() сразу возвращает Future (True — фраза договорена, False — отменена).
+    Фраза с тем же collapse_key вытесняет ещё не сказанную устаревшую.
+    barge_in() обрывает текущую фразу и очищает очередь, когда пришла новая команда.
+
+    speak(text, cancelled) — функция синтеза и воспроизведения; она должна
+    проверять событие cancelled между предложениями.
+    """
+
+    def __init__(self, speak, stop_playback):
+        self._speak = speak
+        self._stop_playback = stop_playback
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._pending = []
+        self._current = None
+        threading.Thread(target=self._loop, name="speech", daemon=True).start()
+
+    def say(self, text, priority=NORMAL, collapse_key=None):
+        item = SpeechItem(text, priority, collapse_key)
+        with self._lock:
+            if collapse_key is not None:
+                for stale in self._pending:
+                    if stale.collapse_key == collapse_key:
+                        stale.cancel()
+                self._pending = [p for p in self._pending if not p.cancelled.is_set()]
+            self._pending.append(item)
+        self._queue.put((priority, next(self._order), item))
+        return item.future
+
+    def barge_in(self):
+        """Отменяет всё, что ещё не сказано, и обрывает текущую фразу."""
+        with self._lock:
+            for item in self._pending:
+                item.cancel()
+            self._pending = []
+            current = self._current
+        if current is not None:
+            current.cancel()
+            self._stop_playback()
+
+    def _loop(self):
+        while True:
+            _, _, item = self._queue.get()
+            with self._lock:
+                if item.cancelled.is_set():
+                    continue
+                self._pending.remove(item)
+                self._current = item
+
+            try:
+                self._speak(item.text, item.cancelled)
+                if not item.future.done():
+                    item.future.set_result(not item.cancelled.is_set())
+            except Exception as e:
+                print(f"⚠️ Ошибка озвучки: {e}")
+                if not item.future.done():
+                    item.future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._current = None
@@ -0,0 +1,423 @@
+#Один event loop на весь рой: SwarmController владеет UDP-портами команд (8889) и состояния (8890) Tello
+#и держит у каждого дрона одну команду в полёте — с future и таймаутом. Ни потока на команду, ни на дрон.
+#Остальные команды дрона ждут в его CommandQueue (command_queue.py): посадка обгоняет перемещения.
+#Пакеты состояния разбираются один раз и копятся в Telemetry (telemetry.py).
+#
+#   python swarm_controller.py     # 50 имитаторов дронов на 127.0.0.x
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+from djitellopy import Tello, TelloException
+from rich import print
+
+from command_queue import CommandQueue, Preempted
+from heartbeat import TICK_S, HeartbeatWheel
+from telemetry import Telemetry
+from tracing import tracer
+
+CONTROL_PORT = 8889
+STATE_PORT = 8890
+MIN_GAP_S = 0.1    # пауза между командами одному дрону, как TIME_BTW_COMMANDS у djitellopy
+
+
+class _Drone:
+    def __init__(self, host):
+        self.host = host
+        self.queue = CommandQueue()  # ответы Tello без id — одна команда в полёте, остальные ждут здесь
+        self.worker = None           # asyncio.Task, которая отправляет команды из очереди по одной
+        self.waiter = None           # future ответа на команду в полёте
+        self.command = None
+        self.last_sent = 0.0
+
+
+class _Receiver(asyncio.DatagramProtocol):
+    def __init__(self, on_datagram):
+        self.on_datagram = on_datagram
+
+    def datagram_received(self, data, addr):
+        self.on_datagram(data, addr[0])
+
+    def error_received(self, exc):
+        print(f"⚠️ UDP: {exc}")
+
+
+class SwarmController:
+    """
+    Все сокеты и таймеры роя — в одном потоке с asyncio. Из других потоков:
+    call() — команда с ожиданием ответа, send() — без ответа (rc), run() —
+    последовательности команд сразу всем дронам, Future с итогом. После
+    удачного takeoff дрон попадает в колесо keep-alive (heartbeat.py): rc 0 0 0 0
+    уходит, только если ему HEARTBEAT_S ничего не отправляли; после land или
+    emergency дрон из колеса снимается. Emergency при команде в полёте уходит
+    сразу, не дожидаясь её ответа.
+    """
+
+    def __init__(self, bind_host=""):
+        self.bind_host = bind_host
+        self._drones = {}
+        self._loop = None
+        self._control = None
+        self._state = None
+        self._ready = threading.Event()
+        self._error = None
+        self._wheel = HeartbeatWheel(time.monotonic())
+        self.telemetry = Telemetry()  # пакеты состояния всех дронов: история и последние значения
+
+    def start(self):
+        threading.Thread(target=self._run_loop, name="swarm-controller", daemon=True).start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._control, _ = self._loop.run_until_complete(self._loop.create_datagram_endpoint(
+                lambda: _Receiver(self._on_response), local_addr=(self.bind_host, CONTROL_PORT)))
+            self._state, _ = self._loop.run_until_complete(self._loop.create_datagram_endpoint(
+                lambda: _Receiver(self._on_state), local_addr=(self.bind_host, STATE_PORT)))
+        except OSError as e:
+            self._error = e  # порт занят — например, в процессе уже есть обычный djitellopy.Tello
+            self._ready.set()
+            return
+        self._ready.set()
+        self._loop.call_later(TICK_S, self._tick)
+        self._loop.run_forever()
+        for transport in (self._control, self._state):
+            transport.close()
+
+    def _sendto(self, host, command):
+        self._control.sendto(command.encode("utf-8"), (host, CONTROL_PORT))
+        self._wheel.touch(host, time.monotonic())
+
+    def _tick(self):
+        for host in self._wheel.advance(time.monotonic()):
+            if self._drones[host].command is not None:
+                continue  # команда в полёте сама держит дрон в воздухе
+            self._control.sendto(b"rc 0 0 0 0", (host, CONTROL_PORT))  # ответа на rc нет — не ждём
+        self._loop.call_later(TICK_S, self._tick)
+
+    def _drone(self, host):
+        drone = self._drones.get(host)
+        if drone is None:
+            drone = self._drones[host] = _Drone(host)
+        return drone
+
+    def _on_response(self, data, host):
+        drone = self._drones.get(host)
+        if drone is None or drone.waiter is None or drone.waiter.done():
+            return  # ответ без команды в полёте — опоздал после таймаута
+        drone.waiter.set_result(data.decode("utf-8", errors="replace").strip())
+
+    def _on_state(self, data, host):
+        self.telemetry.push(host, data)
+
+    async def command(self, host, command, timeout=Tello.RESPONSE_TIMEOUT, trace_id=None, on_sent=None):
+        """on_sent(time.monotonic()) вызывается на event loop в момент, когда пакет команды ушёл дрону."""
+        drone = self._drone(host)
+        if command == "emergency" and drone.command is not None:
+            # Ответ на emergency не отличить от ответа на команду в полёте — шлём сразу и его не ждём
+            self._fail_preempted(drone, drone.queue.preempt(), command)
+            self._sendto(host, "emergency")
+            if on_sent is not None:
+                on_sent(time.monotonic())
+            self._wheel.remove(host)
+            return "ok"
+
+        future = self._loop.create_future()
+        dropped = drone.queue.push(command, future, time.monotonic(), time.time(), timeout, trace_id, on_sent)
+        self._fail_preempted(drone, dropped, command)
+        if drone.worker is None:
+            drone.worker = self._loop.create_task(self._drain(drone))
+        return await future
+
+    def _fail_preempted(self, drone, entries, command):
+        for entry in entries:
+            error = Preempted(f"{drone.host}: '{entry.command}' снята из очереди командой '{command}'")
+            for future in entry.futures:
+                if not future.done():
+                    future.set_exception(error)
+
+    async def _drain(self, drone):
+        try:
+            while drone.queue:
+                gap = drone.last_sent + MIN_GAP_S - time.monotonic()
+                if gap > 0:
+                    await asyncio.sleep(gap)  # пришедшая за это время посадка уйдёт первой
+                if not drone.queue:
+                    break
+                entry = drone.queue.pop(time.monotonic())
+                tracer.record("queue_wait", entry.wall, time.monotonic() - entry.queued_at, entry.trace_id,
+                              cmd=entry.command, host=drone.host)
+                response, error = await self._send(drone, entry)
+                for future in entry.futures:
+                    if future.done():
+                        continue
+                    if error is None:
+                        future.set_result(response)
+                    else:
+                        future.set_exception(error)
+        finally:
+            drone.worker = None
+
+    async def _send(self, drone, entry):
+        drone.waiter = self._loop.create_future()
+        drone.command = command = entry.command
+        wall, started = time.time(), time.perf_counter()
+        self._sendto(drone.host, command)
+        drone.last_sent = time.monotonic()
+        for on_sent in entry.on_sent:
+            on_sent(drone.last_sent)
+        try:
+            response = await asyncio.wait_for(drone.waiter, entry.timeout)
+        except asyncio.TimeoutError:
+            return None, TelloException(f"{drone.host}: нет ответа на '{command}' за {entry.timeout:g} с")
+        finally:
+            drone.waiter = drone.command = None
+            tracer.record("tello", wall, time.perf_counter() - started, entry.trace_id, cmd=command, host=drone.host)
+
+        if command == "takeoff" and response.lower() == "ok":
+            self._wheel.add(drone.host, time.monotonic())
+        elif command in ("land", "emergency"):
+            self._wheel.remove(drone.host)
+        return response, None
+
+    def call(self, host, command, timeout=Tello.RESPONSE_TIMEOUT):
+        """Команда с ожиданием ответа из любого потока, кроме потока контроллера."""
+        return asyncio.run_coroutine_threadsafe(self.command(host, command, timeout, tracer.current), self._loop).result()
+
+    def send(self, host, command):
+        """Команда без ответа (rc): уходит сразу, не дожидаясь команды в полёте."""
+        self._loop.call_soon_threadsafe(self._sendto, host, command)
+
+    def stop_heartbeat(self, host):
+        self._loop.call_soon_threadsafe(self._wheel.remove, host)
+
+    def flying(self, host):
+        """В воздухе ли дрон: после удачного takeoff и до land или emergency."""
+        return host in self._wheel
+
+    def state(self, host):
+        return self.telemetry.state(host)
+
+    def stats(self):
+        """Очереди дронов: {host: CommandQueue.stats()} — глубина, ожидание, склеенные и снятые команды."""
+        async def collect():
+            return {host: drone.queue.stats() for host, drone in self._drones.items()}
+        return asyncio.run_coroutine_threadsafe(collect(), self._loop).result()
+
+    def in_flight(self):
+        """Команды в полёте сейчас: {host: команда}."""
+        return {host: drone.command for host, drone in list(self._drones.items()) if drone.command is not None}
+
+    def run(self, sequences, retries=Tello.RETRY_COUNT - 1, on_sent=None, on_done=None):
+        """
+        sequences — {host: [команды SDK]}: у каждого дрона по порядку, дроны
+        одновременно. Команда без ответа за таймаут повторяется retries раз,
+        ответ не «ok» на управляющую команду (не «...?») — ошибка дрона.
+        Снятая посадкой команда (Preempted) не повторяется.
+        on_sent(host, время отправки) — на каждую ушедшую дрону команду, on_done(host, время) —
+        когда дрон закончил свои команды (или на них упал); оба на event loop.
+        Future со словарём {host: [ответы] или исключение}.
+        """
+        trace_id = tracer.current
+
+        async def one(host, commands):
+            sent = (lambda sent_at: on_sent(host, sent_at)) if on_sent is not None else None
+            responses = []
+            try:
+                for command in commands:
+                    timeout = Tello.TAKEOFF_TIMEOUT if command == "takeoff" else Tello.RESPONSE_TIMEOUT
+                    for attempt in range(retries + 1):
+                        try:
+                            response = await self.command(host, command, timeout, trace_id, sent)
+                            break
+                        except Preempted:
+                            raise
+                        except TelloException:
+                            if attempt == retries:
+                                raise
+                    if not command.endswith("?") and response.lower() != "ok":
+                        raise TelloException(f"Command '{command}' was unsuccessful for reason '{response}'")
+                    responses.append(response)
+                return responses
+            finally:
+                if on_done is not None:
+                    on_done(host, time.monotonic())
+
+        async def run_all():
+            results = await asyncio.gather(*(one(host, commands) for host, commands in sequences.items()),
+                                           return_exceptions=True)
+            return dict(zip(sequences, results))
+
+        return asyncio.run_coroutine_threadsafe(run_all(), self._loop)
+
+
+class ControlledTello(Tello):
+    """
+    djitellopy.Tello, у которого команды и состояние идут через SwarmController.
+    Все методы Tello (takeoff, move, flip, get_battery...) работают как есть.
+    """
+
+    def __init__(self, controller, host, retry_count=Tello.RETRY_COUNT, vs_udp=Tello.VS_UDP_PORT):
+        # Tello.__init__ не вызываем: он открыл бы свои сокеты на тех же портах и потоки приёма.
+        # Остальные поля экземпляра — те же, что он выставляет (видео читает get_frame_read)
+        self.controller = controller
+        self.address = (host, CONTROL_PORT)
+        self.stream_on = False
+        self.retry_count = retry_count
+        self.last_received_command_timestamp = time.time()
+        self.last_rc_control_timestamp = time.time()
+        self.vs_udp_port = vs_udp
+        self.background_frame_read = None
+
+    @property
+    def is_flying(self):
+        # Следует за контроллером, так что и команды мимо takeoff()/land() (run_on_all) учитываются
+        return self.controller.flying(self.address[0])
+
+    @is_flying.setter
+    def is_flying(self, value):
+        pass  # Tello.takeoff()/land() выставляют флаг сами, здесь он уже верный
+
+    def get_own_udp_object(self):
+        return {"responses": [], "state": self.controller.state(self.address[0])}
+
+    def get_current_state(self):
+        return self.controller.state(self.address[0])
+
+    def send_command_with_return(self, command, timeout=Tello.RESPONSE_TIMEOUT):
+        try:
+            response = self.controller.call(self.address[0], command, timeout)
+        except Preempted:
+            raise  # снята посадкой — send_control_command не должен её повторять
+        except TelloException:
+            # Как у djitellopy: send_control_command повторит команду, а потом поднимет исключение
+            return f"Aborting command '{command}'. Did not receive a response after {timeout} seconds"
+        self.last_received_command_timestamp = time.time()
+        return response
+
+    def send_command_without_return(self, command):
+        self.controller.send(self.address[0], command)
+
+    def end(self):
+        # Как Tello.end(), только вместо записи в глобальном drones — снять дрон с heartbeat
+        try:
+            if self.is_flying:
+                self.land()
+            if self.stream_on:
+                self.streamoff()
+        except TelloException:
+            pass
+        if self.background_frame_read is not None:
+            self.background_frame_read.stop()
+            self.background_frame_read = None
+        self.controller.stop_heartbeat(self.address[0])
+
+
+def run_on_all(drones_dict, commands, on_sent=None, on_done=None):
+    """
+    drones_dict — как drone_manager.drones, commands(имя) -> [команды SDK].
+    Дроны за SwarmController идут одним run() на его event loop, обычные
+    djitellopy.Tello — поток на дрон. Future со словарём {имя: [ответы] или исключение}.
+    on_sent(имя, time.monotonic()) — когда команда ушла дрону (у обычного Tello — перед вызовом djitellopy),
+    on_done(имя, time.monotonic()) — когда дрон закончил свои команды.
+    """
+    names = list(drones_dict)
+    tellos = [drones_dict[name]["tello"] for name in names]
+    controller = getattr(tellos[0], "controller", None) if tellos else None
+    result = Future()
+
+    if controller is not None:
+        hosts = {tello.address[0]: name for name, tello in zip(names, tellos)}
+        sent = (lambda host, sent_at: on_sent(hosts[host], sent_at)) if on_sent is not None else None
+        finished = (lambda host, done_at: on_done(hosts[host], done_at)) if on_done is not None else None
+        inner = controller.run({tello.address[0]: commands(name) for name, tello in zip(names, tellos)},
+                               on_sent=sent, on_done=finished)
+
+        def done(f):
+            if f.exception() is not None:
+                result.set_exception(f.exception())  # иначе ждущий result() не дождётся никогда
+            else:
+                result.set_result({hosts[host]: value for host, value in f.result().items()})
+
+        inner.add_done_callback(done)
+        return result
+
+    results = {}
+
+    def one(name, tello):
+        try:
+            responses = []
+            for command in commands(name):
+                if on_sent is not None:
+                    on_sent(name, time.monotonic())
+                if command.endswith("?"):
+                    responses.append(tello.send_read_command(command))
+                else:
+                    timeout = Tello.TAKEOFF_TIMEOUT if command == "takeoff" else Tello.RESPONSE_TIMEOUT
+                    tello.send_control_command(command, timeout=timeout)
+                    responses.append("ok")
+            results[name] = responses
+        except Exception as e:
+            results[name] = e
+        if on_done is not None:
+            on_done(name, time.monotonic())
+
+    def run_all():
+        threads = [threading.Thread(target=one, args=(name, tello), daemon=True) for name, tello in zip(names, tellos)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        result.set_result(results)
+
+    threading.Thread(target=run_all, daemon=True).start()
+    return result
+
+
+def _benchmark(count=50, commands_per_drone=5, latency_s=0.02):
+    """Имитаторы Tello на 127.0.0.2... отвечают «ok» через latency_s; все команды — через один контроллер."""
+    import socket
+
+    def fake_drone(host):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((host, CONTROL_PORT))
+        while True:
+            data, addr = sock.recvfrom(1024)
+            if data.startswith(b"rc "):
+                continue
+            time.sleep(latency_s)
+            sock.sendto(b"ok", addr)
+
+    hosts = [f"127.0.0.{i + 2}" for i in range(count)]
+    for host in hosts:
+        threading.Thread(target=fake_drone, args=(host,), daemon=True).start()
+    time.sleep(0.2)
+    threads_before = threading.active_count()
+
+    controller = SwarmController(bind_host="127.0.0.1").start()
+    sequence = ["command"] + ["up 20"] * (commands_per_drone - 1)
+    started = time.perf_counter()
+    results = controller.run({host: sequence for host in hosts}).result()
+    elapsed = time.perf_counter() - started
+    failed = [host for host, value in results.items() if isinstance(value, Exception)]
+
+    serial = count * commands_per_drone * latency_s
+    print(f"{count} дронов × {commands_per_drone} команд: {elapsed:.2f} с "
+          f"(одна команда за другой: {serial:.2f} с), ошибок: {len(failed)}")
+    print(f"потоков добавил контроллер: {threading.active_count() - threads_before}")
+    controller.stop()
+
+
+if __name__ == "__main__":
+    _benchmark()
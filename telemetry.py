@@ -0,0 +1,156 @@
+#Телеметрия роя: пакеты состояния Tello (порт 8890) разбираются один раз в запись фиксированного
+#размера и складываются в кольцевой буфер NumPy на дрон. Последнее значение и окно за N секунд
+#читаются без запросов к дрону — для формаций, трекеров и GUI.
+#
+#   python telemetry.py     # 50 дронов по 10 пакетов в секунду
+
+import threading
+import time
+
+import numpy as np
+
+HISTORY = 600  # записей на дрон: Tello шлёт состояние ~10 раз в секунду, это около минуты
+
+# Поля пакета состояния, которые храним; t — время приёма по time.time()
+STATE_DTYPE = np.dtype([
+    ("t", "f8"),
+    ("bat", "u1"), ("h", "i2"), ("tof", "i2"), ("baro", "f4"),
+    ("pitch", "i2"), ("roll", "i2"), ("yaw", "i2"),
+    ("vgx", "i2"), ("vgy", "i2"), ("vgz", "i2"),
+    ("agx", "f4"), ("agy", "f4"), ("agz", "f4"),
+    ("templ", "i1"), ("temph", "i1"), ("time", "i2"),
+    ("mid", "i2"), ("x", "i2"), ("y", "i2"), ("z", "i2"),
+])
+_FIELD_INDEX = {name: i for i, name in enumerate(STATE_DTYPE.names)}
+
+
+def parse_state(data, now):
+    """Пакет «pitch:0;roll:0;...;» -> кортеж в порядке STATE_DTYPE; None, если ни одного знакомого поля."""
+    values = [0.0] * len(STATE_DTYPE.names)
+    values[0] = now
+    found = False
+    for item in data.decode("ascii", errors="replace").split(";"):
+        key, sep, value = item.partition(":")
+        index = _FIELD_INDEX.get(key.strip())
+        if not index or not sep:
+            continue  # mpry и прочее, что не храним
+        try:
+            values[index] = float(value)
+        except ValueError:
+            continue
+        found = True
+    return tuple(values) if found else None
+
+
+class _Ring:
+    def __init__(self, capacity):
+        self.records = np.zeros(capacity, dtype=STATE_DTYPE)
+        self.count = 0  # записей за всё время; следующая ляжет в count % capacity
+        self.lock = threading.Lock()
+
+
+class Telemetry:
+    """
+    Пишет приёмник состояния (SwarmController, в потоке своего event loop),
+    читают все остальные. latest() и state() — последняя запись, window() —
+    записи за последние seconds секунд, history() — последние n; всё это
+    копии, их можно держать сколько угодно. Дрон без пакетов — None или пустой массив.
+    """
+
+    def __init__(self, capacity=HISTORY):
+        self.capacity = capacity
+        self._rings = {}
+        self._lock = threading.Lock()
+        self.packets = 0
+        self.bad_packets = 0
+
+    def push(self, host, data, now=None):
+        record = parse_state(data, time.time() if now is None else now)
+        if record is None:
+            self.bad_packets += 1
+            return
+        ring = self._rings.get(host)
+        if ring is None:
+            with self._lock:
+                ring = self._rings.setdefault(host, _Ring(self.capacity))
+        with ring.lock:
+            ring.records[ring.count % self.capacity] = record
+            ring.count += 1
+        self.packets += 1
+
+    def hosts(self):
+        return list(self._rings)
+
+    def latest(self, host):
+        ring = self._rings.get(host)
+        if ring is None or ring.count == 0:
+            return None
+        with ring.lock:
+            return ring.records[(ring.count - 1) % self.capacity].copy()
+
+    def state(self, host):
+        """Последняя запись словарём, как Tello.parse_state, — для djitellopy get_battery() и т.п."""
+        latest = self.latest(host)
+        if latest is None:
+            return {}
+        return {name: latest[name].item() for name in STATE_DTYPE.names[1:]}
+
+    def age(self, host, now=None):
+        """Сколько секунд назад пришёл последний пакет; None, если ещё не было."""
+        latest = self.latest(host)
+        if latest is None:
+            return None
+        return (time.time() if now is None else now) - float(latest["t"])
+
+    def history(self, host, n=None):
+        """Последние n записей (все, что есть в буфере, если n не задано) по порядку приёма."""
+        ring = self._rings.get(host)
+        if ring is None:
+            return np.zeros(0, dtype=STATE_DTYPE)
+        with ring.lock:
+            count = ring.count
+            n = min(count, self.capacity) if n is None else min(n, count, self.capacity)
+            return ring.records[np.arange(count - n, count) % self.capacity]
+
+    def window(self, host, seconds, now=None):
+        """Записи за последние seconds секунд: window(host, 5)["h"].mean() — средняя высота."""
+        records = self.history(host)
+        cutoff = (time.time() if now is None else now) - seconds
+        return records[np.searchsorted(records["t"], cutoff):]
+
+
+def _benchmark(count=50, seconds=60, rate=10):
+    """Поток пакетов как от count дронов за seconds секунд: разбор и запись, затем запросы."""
+    from rich import print
+
+    packet = (b"mid:-1;x:0;y:0;z:0;mpry:0,0,0;pitch:1;roll:-2;yaw:45;vgx:0;vgy:0;vgz:0;"
+              b"templ:60;temph:62;tof:10;h:120;bat:87;baro:112.35;time:30;agx:-3.00;agy:1.00;agz:-999.00;\r\n")
+    hosts = [f"192.168.0.{100 + i}" for i in range(count)]
+    telemetry = Telemetry()
+
+    packets = count * seconds * rate
+    started = time.perf_counter()
+    for i in range(seconds * rate):
+        now = i / rate
+        for host in hosts:
+            telemetry.push(host, packet, now)
+    push_us = (time.perf_counter() - started) / packets * 1e6
+
+    started = time.perf_counter()
+    for host in hosts:
+        telemetry.latest(host)
+    latest_us = (time.perf_counter() - started) / count * 1e6
+
+    started = time.perf_counter()
+    for host in hosts:
+        telemetry.window(host, 5, now=seconds)["h"].mean()
+    window_us = (time.perf_counter() - started) / count * 1e6
+
+    size_kb = count * HISTORY * STATE_DTYPE.itemsize / 1024
+    print(f"{packets} пакетов: {push_us:.1f} мкс на разбор и запись; "
+          f"latest {latest_us:.1f} мкс, окно 5 с {window_us:.1f} мкс на дрон")
+    print(f"запись {STATE_DTYPE.itemsize} байт, буферы {count} дронов: {size_kb:.0f} КБ")
+
+
+if __name__ == "__main__":
+    _benchmark()
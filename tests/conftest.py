@@ -0,0 +1,8 @@
+#Тесты запускаются из корня репозитория: python -m pytest -q
+#Модули проекта лежат в корне, а не в пакете, поэтому корень добавляется в sys.path.
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+from audio_buffer import DROP_NEWEST, DROP_OLDEST, FrameRing
+
+
+def fill(ring, count):
+    return [ring.push(i) for i in range(count)]
+
+
+def drain(ring):
+    frames = []
+    while True:
+        pcm = ring.pop(timeout=0)
+        if pcm is None:
+            return frames
+        frames.append(pcm)
+
+
+def test_drop_oldest_keeps_latest_frames():
+    ring = FrameRing(3, DROP_OLDEST)
+    assert fill(ring, 5) == [True] * 5
+    assert ring.overruns == 2
+    assert drain(ring) == [2, 3, 4]
+    assert ring.dropped == 2
+
+
+def test_drop_newest_keeps_first_frames():
+    ring = FrameRing(3, DROP_NEWEST)
+    assert fill(ring, 5) == [True, True, True, False, False]
+    assert ring.overruns == 2
+    assert ring.dropped == 2
+    assert drain(ring) == [0, 1, 2]
+
+
+def test_no_overrun_within_capacity():
+    ring = FrameRing(4)
+    fill(ring, 4)
+    assert len(ring) == 4
+    assert ring.max_depth == 4
+    assert drain(ring) == [0, 1, 2, 3]
+    assert (ring.overruns, ring.dropped) == (0, 0)
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        FrameRing(3, "drop_random")
+
+
+def test_pop_waits_for_writer():
+    ring = FrameRing(3)
+    assert ring.pop(timeout=0.01) is None
+    threading.Timer(0.05, ring.push, args=("frame",)).start()
+    assert ring.pop(timeout=2) == "frame"
+
+
+def test_concurrent_overruns_keep_order_and_counts():
+    ring = FrameRing(4, DROP_OLDEST)
+    total = 20000
+    received = []
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set() or len(ring):
+            pcm = ring.pop(timeout=0.01)
+            if pcm is not None:
+                received.append(pcm)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    for i in range(total):
+        ring.push(i)
+    done.set()
+    thread.join()
+
+    assert received == sorted(set(received))  # без повторов и в порядке записи
+    assert len(received) + ring.dropped == total
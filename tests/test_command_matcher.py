@@ -0,0 +1,50 @@
+import os
+import random
+
+import pytest
+import yaml
+
+from command_matcher import CommandMatcher, _naive_drone, _naive_match
+from conftest import ROOT
+
+
+@pytest.fixture(scope="module")
+def va_cmd_list():
+    with open(os.path.join(ROOT, "commands.yaml"), "rt", encoding="utf8") as f:
+        return yaml.safe_load(f)
+
+
+def mutate(rnd, text):
+    chars = list(text)
+    for _ in range(rnd.randint(0, 3)):
+        if chars:
+            chars[rnd.randrange(len(chars))] = rnd.choice("абвгдеёжзиклмнопрстуфхцчшщыэюя ")
+    return "".join(chars)
+
+
+def test_commands_match_full_scan(va_cmd_list):
+    matcher = CommandMatcher(va_cmd_list)
+    rnd = random.Random(0)
+    phrases = [x for v_list in va_cmd_list.values() for x in v_list]
+    queries = [mutate(rnd, rnd.choice(phrases)) for _ in range(300)]
+    queries += ["", "q", "zzz", "какая сегодня погода"] + phrases[:20]
+    for query in queries:
+        assert matcher.match(query) == _naive_match(va_cmd_list, query), query
+
+
+def test_drones_match_full_scan():
+    names = ['первый', 'второй', 'третий', 'четвертый', 'большой первый']
+    matcher = CommandMatcher({}, names)
+    rnd = random.Random(1)
+    queries = [f"{mutate(rnd, rnd.choice(names))} {rnd.choice(['вперёд', 'наверх', 'стоп'])}" for _ in range(300)]
+    queries += ["", "вперёд", "большой первый стоп"]
+    for query in queries:
+        assert matcher.match_drone(query) == _naive_drone(names, query), query
+
+
+def test_replace_rebuilds_only_given_part(va_cmd_list):
+    matcher = CommandMatcher(va_cmd_list, ['первый'])
+    replaced = matcher.replace(drone_names=['второй'])
+    assert replaced.match_drone("второй вперёд") == 'второй'
+    assert matcher.match_drone("второй вперёд") is None
+    assert replaced.match("спасибо") == matcher.match("спасибо")
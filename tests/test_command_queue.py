@@ -0,0 +1,61 @@
+from command_queue import ORDINARY, URGENT, CommandQueue
+
+
+def push(queue, command, timeout=7):
+    future = object()
+    return future, queue.push(command, future, queued_at=0.0, timeout=timeout)
+
+
+def test_repeated_moves_merge_with_summed_timeout():
+    queue = CommandQueue()
+    first, _ = push(queue, "forward 30")
+    second, _ = push(queue, "forward 40")
+    assert len(queue) == 1
+    entry = queue.pop(0.0)
+    assert entry.command == "forward 70"
+    assert entry.timeout == 14
+    assert entry.futures == [first, second]
+    assert queue.coalesced == 1
+
+
+def test_moves_over_sdk_limit_are_not_merged():
+    queue = CommandQueue()
+    push(queue, "forward 300")
+    push(queue, "forward 300")
+    push(queue, "cw 200")
+    push(queue, "cw 200")
+    assert [queue.pop(0.0).command for _ in range(len(queue))] == ["forward 300", "forward 300", "cw 200", "cw 200"]
+    assert queue.coalesced == 0
+
+
+def test_different_moves_are_not_merged():
+    queue = CommandQueue()
+    push(queue, "forward 30")
+    push(queue, "back 30")
+    push(queue, "go 10 10 10 10")
+    push(queue, "go 10 10 10 10")
+    assert [queue.pop(0.0).command for _ in range(len(queue))] == [
+        "forward 30", "back 30", "go 10 10 10 10", "go 10 10 10 10"]
+
+
+def test_identical_queries_share_one_answer():
+    queue = CommandQueue()
+    first, _ = push(queue, "battery?")
+    second, _ = push(queue, "battery?")
+    entry = queue.pop(0.0)
+    assert entry.command == "battery?"
+    assert entry.futures == [first, second]
+
+
+def test_land_preempts_control_commands_but_not_queries():
+    queue = CommandQueue()
+    push(queue, "forward 30")
+    push(queue, "battery?")
+    push(queue, "up 40")
+    _, dropped = push(queue, "land")
+    assert [entry.command for entry in dropped] == ["forward 30", "up 40"]
+    assert queue.preempted == 2
+    first = queue.pop(0.0)
+    assert (first.command, first.priority) == ("land", URGENT)
+    second = queue.pop(0.0)
+    assert (second.command, second.priority) == ("battery?", ORDINARY)
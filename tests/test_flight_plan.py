@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from flight_plan import parse_plan
+
+
+def test_valid_plan_is_returned():
+    text = json.dumps({"drones": {
+        "первый": [["takeoff"], ["forward", 100], ["sync"], ["flip", "f"], ["land"]],
+        "второй": [["takeoff"], ["rotate_cw", 90], ["sync"], ["wait", 1.5], ["land"]],
+    }})
+    plan = parse_plan(text)
+    assert list(plan["drones"]) == ["первый", "второй"]
+
+
+def test_not_json():
+    with pytest.raises(ValueError, match="не JSON"):
+        parse_plan("```python\nprint(1)\n```")
+
+
+@pytest.mark.parametrize("steps", [
+    [["forward", 600]],      # больше предела SDK
+    [["forward", 10]],       # меньше предела SDK
+    [["rotate_cw", 0]],
+    [["flip", "x"]],
+    [["takeoff", 1]],        # лишний аргумент
+    [["teleport"]],
+    [],
+])
+def test_schema_errors(steps):
+    with pytest.raises(ValueError):
+        parse_plan(json.dumps({"drones": {"первый": steps}}))
+
+
+def test_error_names_the_bad_step():
+    with pytest.raises(ValueError, match="drones/первый/1"):
+        parse_plan(json.dumps({"drones": {"первый": [["takeoff"], ["up", 1000]]}}))
+
+
+def test_sync_count_must_match():
+    text = json.dumps({"drones": {
+        "первый": [["takeoff"], ["sync"], ["land"]],
+        "второй": [["takeoff"], ["land"]],
+    }})
+    with pytest.raises(ValueError, match="sync"):
+        parse_plan(text)
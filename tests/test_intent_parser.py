@@ -0,0 +1,60 @@
+import pytest
+
+from intent_parser import IntentParser
+
+DRONES = ('первый', 'второй', 'третий')
+CLASSES = {"бутылку": 39, "человека": 0}
+
+
+@pytest.fixture
+def parser():
+    return IntentParser(DRONES, CLASSES, groups={'пара': ('первый', 'второй')})
+
+
+def test_single_drone_move_with_compound_number(parser):
+    intent = parser.parse("первый вперёд на сто пятьдесят")
+    assert intent.targets == ['первый']
+    assert intent.verb == 'forward'
+    assert intent.value == 150
+
+
+def test_several_targets_joined_by_and(parser):
+    intent = parser.parse("первый и третий вверх на полметра")
+    assert intent.targets == ['первый', 'третий']
+    assert intent.verb == 'up'
+    assert intent.value == 50
+
+
+def test_all_and_groups_expand_to_drones(parser):
+    assert parser.parse("все наверх").targets == list(DRONES)
+    intent = parser.parse("пара стоп")
+    assert intent.targets == ['первый', 'второй']
+    assert intent.verb == 'land'
+
+
+def test_rotation_direction_and_measure(parser):
+    intent = parser.parse("второй поворот влево на девяносто градусов")
+    assert intent.verb == 'rotate_ccw'
+    assert intent.value == 90
+    assert parser.parse("второй налево поворот").verb == 'rotate_ccw'
+    assert parser.parse("второй поворот").verb == 'rotate_cw'
+
+
+def test_fractions_and_meters(parser):
+    assert parser.parse("третий назад на полтора метра").value == 150
+    assert parser.parse("третий назад на метр").value == 100
+    assert parser.parse("третий назад на 2,5 метра").value == 250
+
+
+def test_track_object(parser):
+    intent = parser.parse("первый найди бутылку")
+    assert intent.verb == 'track'
+    assert intent.object_name == 'бутылку'
+    assert intent.object_class == 39
+
+
+def test_unknown_phrase_has_no_target_or_verb(parser):
+    intent = parser.parse("какая сегодня погода")
+    assert intent.targets == []
+    assert intent.verb is None
+    assert intent.value is None
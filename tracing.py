@@ -0,0 +1,166 @@
+#Трассировка задержек одной фразы: от активационного слова до ответа дрона.
+#Каждый этап — span с trace id фразы, записи идут строками JSON в config.TRACE_FILE.
+#
+#   python tracing.py traces.jsonl     # p50/p95/p99 по этапам
+
+import argparse
+import atexit
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from rich import print
+
+FLUSH_EVERY = 32  # записей в буфере до записи в файл
+
+
+class Tracer:
+    """
+    Trace id выдаёт begin() — на активационное слово и после каждой
+    распознанной фразы. Этапы в потоках дронов привязываются к фразе через
+    bind(): в потоке действует свой trace id, а не текущий общий. Пока
+    open() не вызван, span() и record() ничего не делают.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._path = None
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._prefix = f"{os.getpid():x}"
+        self._current = None
+        self._local = threading.local()
+
+    def open(self, path):
+        if self._path is None:
+            atexit.register(self.flush)  # хвост буфера — при выходе
+        self._path = path
+        self.enabled = True
+
+    def close(self):
+        self.flush()
+        self.enabled = False
+
+    def begin(self):
+        self._current = f"{self._prefix}-{next(self._ids)}"
+        return self._current
+
+    @property
+    def current(self):
+        return getattr(self._local, "trace_id", None) or self._current
+
+    @contextmanager
+    def bind(self, trace_id):
+        previous = getattr(self._local, "trace_id", None)
+        self._local.trace_id = trace_id
+        try:
+            yield
+        finally:
+            self._local.trace_id = previous
+
+    @contextmanager
+    def span(self, stage, trace_id=None, **attrs):
+        if not self.enabled:
+            yield attrs
+            return
+        wall, started = time.time(), time.perf_counter()
+        try:
+            yield attrs  # внутри блока можно дописать атрибуты: attrs["cmd"] = ...
+        finally:
+            self.record(stage, wall, time.perf_counter() - started, trace_id, **attrs)
+
+    def record(self, stage, wall, seconds, trace_id=None, **attrs):
+        """Этап, измеренный снаружи: wall — начало по time.time(), seconds — длительность."""
+        if not self.enabled:
+            return
+        entry = {"trace": trace_id or self.current, "stage": stage, "t": round(wall, 6), "ms": round(seconds * 1000, 3)}
+        entry.update(attrs)
+        with self._lock:
+            self._buffer.append(entry)
+            if len(self._buffer) < FLUSH_EVERY:
+                return
+            entries, self._buffer = self._buffer, []
+        self._write(entries)
+
+    def flush(self):
+        with self._lock:
+            entries, self._buffer = self._buffer, []
+        self._write(entries)
+
+    def _write(self, entries):
+        if not entries or self._path is None:
+            return
+        lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        with self._lock, open(self._path, "at", encoding="utf8") as f:
+            f.write(lines)
+
+
+tracer = Tracer()
+
+
+def instrument_tello(tello_class):
+    """
+    Span «tello» на каждую команду djitellopy: отправка и ожидание ответа дрона.
+    rc-команды поддержки активности не пишутся — они идут фоном раз в несколько секунд.
+    """
+    def wrap(send, stage):
+        def wrapper(self, command, *args, **kwargs):
+            if not tracer.enabled or command.startswith("rc "):
+                return send(self, command, *args, **kwargs)
+            with tracer.span(stage, cmd=command, host=getattr(self, "address", ("?",))[0]):
+                return send(self, command, *args, **kwargs)
+        return wrapper
+
+    tello_class.send_command_with_return = wrap(tello_class.send_command_with_return, "tello")
+    tello_class.send_command_without_return = wrap(tello_class.send_command_without_return, "tello_send")
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def summarize(path):
+    """Таблица по этапам и по фразе целиком (от первого этапа до конца последнего)."""
+    stages = {}
+    traces = {}
+    with open(path, "rt", encoding="utf8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            stages.setdefault(entry["stage"], []).append(entry["ms"])
+            start, end = entry["t"], entry["t"] + entry["ms"] / 1000
+            first, last = traces.get(entry["trace"], (start, end))
+            traces[entry["trace"]] = (min(first, start), max(last, end))
+
+    rows = sorted(stages.items(), key=lambda item: -percentile(item[1], 0.5))
+    rows.append(("фраза целиком", [(last - first) * 1000 for first, last in traces.values()]))
+    print(f"{'этап':<20} {'n':>6} {'p50, мс':>10} {'p95, мс':>10} {'p99, мс':>10}")
+    for stage, values in rows:
+        print(f"{stage:<20} {len(values):6d} {percentile(values, 0.5):10.1f} "
+              f"{percentile(values, 0.95):10.1f} {percentile(values, 0.99):10.1f}")
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser("tracing.py", description="Сводка задержек по этапам из файла трассировки")
+    parser.add_argument("path", nargs="?", help="файл трассировки (по умолчанию config.TRACE_FILE)")
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    if args.path is None:
+        import config
+        args.path = config.TRACE_FILE
+    summarize(args.path)
@@ -1,7 +1,14 @@
+import math
+import queue
+import re
+import threading
 import time
 
 import sounddevice as sd
-import torch
+
+from lazy_loader import LazyModel
+from speech_queue import NORMAL, SpeechWorker
+from tts_cache import PhraseCache, phrase_key
 
 language = 'ru'
 model_id = 'ru_v3'
@@ -9,28 +16,157 @@ sample_rate = 48000  # 48000
 speaker = 'aidar'  # aidar, baya, kseniya, xenia, random
 put_accent = True
 put_yo = True
-device = torch.device('cpu')  # cpu или gpu
+device = 'cpu'  # cpu или gpu
 text = "Хауди Хо, друзья!!!"
+cache_dir = 'tts_cache'  # синтезированные фразы на диске
+cache_items = 64  # сколько фраз держать в памяти
+echo_tail = 0.3  # сколько секунд после конца озвучки микрофон ещё слышит её эхо
 
-model, _ = torch.hub.load(repo_or_dir='snakers4/silero-models',
-                          model='silero_tts',
-                          language=language,
-                          speaker=model_id)
-model.to(device)
 
+def _load_model():
+    # torch и Silero грузятся только при первой озвучке или фоновом прогреве
+    import torch
 
-# воспроизводим
-def va_speak(what: str):
-    audio = model.apply_tts(text=what + "..",
-                            speaker=speaker,
-                            sample_rate=sample_rate,
-                            put_accent=put_accent,
-                            put_yo=put_yo)
-
-    sd.play(audio, sample_rate * 1.05)
-    time.sleep((len(audio) / sample_rate) + 0.5)
+    model, _ = torch.hub.load(repo_or_dir='snakers4/silero-models',
+                              model='silero_tts',
+                              language=language,
+                              speaker=model_id)
+    model.to(torch.device(device))
+    return model
+
+
+model = LazyModel("Silero TTS", _load_model)
+
+
+# кэш готовых фраз: память + диск
+cache = PhraseCache(cache_dir, max_items=cache_items)
+
+# время от вызова va_speak до начала звука в последней озвучке, с
+last_time_to_first_audio = None
+
+# начало и конец последней озвучки по time.monotonic (конец — inf, пока звучит)
+_playback = [0.0, 0.0]
+
+
+def heard_own_speech(timestamp):
+    """
+    True, если кадр микрофона записан, пока звучала озвучка (time.monotonic).
+    Финальный текст таких кадров не должен уходить в respond(): грамматика Vosk
+    превратила бы собственный ответ ассистента в команду.
+    """
+    start, end = _playback
+    return start <= timestamp <= end + echo_tail
+
+
+def split_sentences(what: str):
+    """Делит текст на предложения, чтобы озвучивать первое, пока синтезируется второе."""
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?…])\s+", what.strip())]
+    return [s for s in sentences if s]
+
+
+def synthesize(sentence: str):
+    key = phrase_key(sentence, speaker, sample_rate, put_accent, put_yo, model_id)
+    audio = cache.get(key)
+    if audio is None:
+        audio = model.get().apply_tts(text=sentence + "..",
+                                      speaker=speaker,
+                                      sample_rate=sample_rate,
+                                      put_accent=put_accent,
+                                      put_yo=put_yo)
+        audio = cache.put(key, audio.numpy())
+    return audio
+
+
+def _speak(what: str, cancelled: threading.Event):
+    """Синтез и воспроизведение в потоке озвучки; прерывается между предложениями."""
+    started = time.perf_counter()
+    sentences = split_sentences(what)
+    if not sentences:
+        return
+
+    try:
+        _play_sentences(sentences, cancelled, started)
+    finally:
+        if _playback[1] == math.inf:
+            _playback[1] = time.monotonic()
+
+
+def _play_sentences(sentences, cancelled, started):
+    global last_time_to_first_audio
+
+    # Синтез идёт в отдельном потоке на шаг впереди воспроизведения
+    rendered = queue.Queue()
+
+    def render():
+        for sentence in sentences:
+            if cancelled.is_set():
+                break
+            try:
+                rendered.put(synthesize(sentence))
+            except Exception as e:
+                rendered.put(e)
+                return
+        rendered.put(None)
+
+    threading.Thread(target=render, daemon=True).start()
+
+    first = True
+    while not cancelled.is_set():
+        audio = rendered.get()
+        if audio is None:
+            break
+        if isinstance(audio, Exception):
+            raise audio
+        if cancelled.is_set():
+            break
+
+        if first:
+            _playback[:] = [time.monotonic(), math.inf]
+        sd.play(audio, sample_rate * 1.05)
+        if first:
+            last_time_to_first_audio = time.perf_counter() - started
+            print(f"TTS: первый звук через {last_time_to_first_audio * 1000:.0f} мс")
+            first = False
+        sd.wait()  # barge_in() вызывает sd.stop(), и ожидание обрывается
+
+    if not cancelled.is_set():
+        time.sleep(0.5)
     sd.stop()
 
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _get_worker():
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = SpeechWorker(_speak, sd.stop)
+    return _worker
+
+
+# воспроизводим
+def va_speak(what: str, wait=False, priority=NORMAL, collapse_key=None):
+    """
+    Ставит фразу в очередь озвучки и сразу возвращает Future.
+    wait=True — дождаться конца фразы (или её отмены), как раньше.
+    """
+    future = _get_worker().say(what, priority=priority, collapse_key=collapse_key)
+    if wait:
+        future.result()
+    return future
+
+
+def barge_in():
+    """Обрывает текущую фразу и очищает очередь: пришла новая команда."""
+    if _worker is not None:
+        _worker.barge_in()
+    # sd.stop() уже оборвал звук: кадры после этого момента — снова речь пользователя
+    if _playback[1] == math.inf:
+        _playback[1] = time.monotonic()
+
 # sd.play(audio, sample_rate)
 # time.sleep(len(audio) / sample_rate)
 # sd.stop()
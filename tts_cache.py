@@ -0,0 +1,69 @@
+#Кэш синтезированной речи: LRU в памяти плюс .npy-файлы на диске.
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def phrase_key(text, speaker, sample_rate, put_accent, put_yo, model_id):
+    """Ключ кэша: один и тот же текст другим голосом или частотой — другая запись."""
+    raw = f"{model_id}|{speaker}|{sample_rate}|{int(put_accent)}|{int(put_yo)}|{text}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class PhraseCache:
+    """
+    Готовое аудио (float32) по ключу phrase_key. Последние max_items фраз
+    держатся в памяти, все — на диске в cache_dir, поэтому постоянные фразы
+    («Дроны инициализированы и готовы к работе.») синтезируются один раз
+    за всё время жизни установки.
+    """
+
+    def __init__(self, cache_dir, max_items=64):
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def get(self, key):
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                return audio
+
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            audio = np.load(path)
+        except (OSError, ValueError):
+            return None  # битый файл — синтезируем заново
+        self._remember(key, audio)
+        return audio
+
+    def put(self, key, audio):
+        audio = np.asarray(audio, dtype=np.float32)
+        self._remember(key, audio)
+
+        # Пишем во временный файл и переименовываем, чтобы не оставить половину файла
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, audio)
+        os.replace(tmp_path, path)
+        return audio
+
+    def _remember(self, key, audio):
+        with self._lock:
+            self._memory[key] = audio
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
@@ -8,8 +8,19 @@ from rich import print
 import sys
 import re
 
+from command_matcher import CommandMatcher
+from llm_cache import script_key
+from gpt_integration import ERROR_ANSWERS
+from flight_plan import parse_plan, plan_prompt
+from tracing import tracer
+from speech_queue import LOW
+
+# Запрос к LLM для «выполни ...»; входит в ключ кэша кода, поэтому правка шаблона сбрасывает кэш
+# Код просим одним блоком ```python ... ```: он запускается, как только блок закрылся, не дожидаясь пояснений
+LLM_PROMPT = "Код на Python одним блоком ```python ... ``` для управления с двумя дронами дроном Tello (В коде ты обязательно прописываешь библиотеки которые используются), используй библиотеку from djitellopy import TelloSwarm: {voice}. используй swarm = TelloSwarm.fromIps(['192.168.0.120','192.168.0.121'])."
+
 class VAResponder:
-    def __init__(self, va_cmd_list, va_alias, va_tbr, gpt_integration, audio_manager, tts_module, drone_manager_module, build_fly_module):
+    def __init__(self, va_cmd_list, va_alias, va_tbr, gpt_integration, audio_manager, tts_module, drone_manager_module, build_fly_module, llm_cache=None, script_executor=None, flight_engine=None):
         self.CDIR = os.getcwd()
         self.VA_CMD_LIST = va_cmd_list
         self.VA_ALIAS = va_alias
@@ -19,6 +30,11 @@ class VAResponder:
         self.tts = tts_module
         self.drone_manager = drone_manager_module
         self.build_fly = build_fly_module
+        self.llm_cache = llm_cache  # llm_cache.ScriptCache или None — без кэша
+        self.script_executor = script_executor  # script_executor.ScriptExecutor или None — subprocess на каждый скрипт
+        self.flight_engine = flight_engine  # flight_plan.FlightPlanEngine — LLM отдаёт план, а не Python-код
+        # фразы команд и имена дронов разбираются один раз, а не при каждом распознавании
+        self.matcher = CommandMatcher(va_cmd_list, drone_manager_module.DRONE_IPS.keys())
 
     def extract_and_clean_python_code(self, response_text):
         """
@@ -46,43 +62,139 @@ class VAResponder:
 
         # Команды для дронов
         if fuzz.ratio(voice, "дроны запуск") > 75:
-            self.drone_manager.initialize_drones()
-            self.tts.va_speak("Дроны инициализированы и готовы к работе.")
-            return True
-
-        for drone_name in self.drone_manager.DRONE_IPS.keys():
-            if fuzz.token_set_ratio(voice, drone_name) > 75:
-                command = voice.replace(drone_name, "").strip()
-                print(f'Распознана команда для дрона {drone_name}: {command}')
-                response = self.drone_manager.execute_drone_command(drone_name, command)
-                if response:
-                    self.tts.va_speak(response)
+            self.tts.barge_in()
+            # Порты дронов нужны этому процессу: тёплый процесс скриптов должен их отпустить
+            if self.script_executor is not None and not self.script_executor.release():
+                self.tts.va_speak("Сначала дождитесь конца скрипта или скажите «отмени скрипт»")
                 return True
 
+            def on_progress(name, ok, done, total):
+                # Пока подключаются остальные, называем готовых; несказанное вытесняется новым
+                if ok:
+                    self.tts.va_speak(f"{name} готов", priority=LOW, collapse_key="drones-init")
+
+            connected, failed = self.drone_manager.initialize_drones(on_progress=on_progress)
+            if not failed:
+                self.tts.va_speak("Дроны инициализированы и готовы к работе.", collapse_key="drones-init")
+            else:
+                self.tts.va_speak(f"Подключено {len(connected)} из {len(connected) + len(failed)}. "
+                                  f"Не отвечают: {', '.join(failed)}.", collapse_key="drones-init")
+            return True
+
         # Генерация и выполнение Python-кода через GPT
-        words = voice.split()
+        # (после проигрывания pre-roll фраза может начинаться с активационного слова)
+        words = [w for w in voice.split() if w not in self.VA_ALIAS]
         if words and fuzz.ratio(words[0], "выполни") > 75:
-            self.gpt_integration.add_message("user", f"Только код на Python(Без использования ```python) для управления с двумя дронами дроном Tello (В коде ты обязательно прописываешь библиотеки которые используются), используй библиотеку from djitellopy import TelloSwarm: {voice}. используй swarm = TelloSwarm.fromIps(['192.168.0.120','192.168.0.121']). Ответ без ```.")
-            response = self.gpt_integration.get_answer()
-            print(f"GPT Raw Response:\n{response}")
-            script_path = "tello_command.py"
-            with open(script_path, "w", encoding="utf-8") as f:
-                f.write(response)
-            subprocess.run([sys.executable, script_path]) # Используем sys.executable для запуска
-            self.tts.va_speak("Код сгенерирован и запущен")
+            self.tts.barge_in()
+            # С движком планов LLM отдаёт JSON-план, без него — Python-код
+            if self.flight_engine is not None:
+                prompt, run = plan_prompt(self.drone_manager.DRONE_IPS), self._run_plan
+            else:
+                prompt, run = LLM_PROMPT, self._run_script
+            # Повторная команда берёт готовый код из кэша, без запроса к LLM
+            cache_key = response = None
+            if self.llm_cache is not None:
+                cache_key = script_key(" ".join(words), prompt, self.gpt_integration.model_engine)
+                response = self.llm_cache.get(cache_key)
+            if response is not None:
+                print("⚡ Код взят из кэша")
+                run(response, cache_key, words)
+            else:
+                self.gpt_integration.add_message("user", prompt.replace("{voice}", voice))
+                started = time.perf_counter()
+
+                def on_code(code):
+                    print(f"⚡ Код получен через {(time.perf_counter() - started) * 1000:.0f} мс")
+                    run(code, cache_key, words)
+
+                response = self.gpt_integration.stream_answer(on_code=on_code)
+                print(f"GPT Raw Response:\n{response}")
+                if response in ERROR_ANSWERS:
+                    self.tts.va_speak(response)
+                    return True
+            if self.flight_engine is None:
+                self.tts.va_speak("Код сгенерирован и запущен")
             time.sleep(0.5)
             return True # Важно, чтобы после выполнения кода мы вернулись в режим ожидания
 
+        # Команда одному дрону, нескольким («первый и третий вперёд»), группе или всем.
+        # Проверяется после «выполни»: иначе «выполни первый вверх и вниз» ушло бы дрону напрямую, мимо LLM
+        with tracer.span("intent"):
+            intent = self.drone_manager.intent_parser.parse(voice)
+        if not intent.targets or intent.verb is None:
+            intent = None
+            with tracer.span("drone_match"):
+                drone_name = self.matcher.match_drone(voice)  # имя распознано неточно
+            if drone_name is not None:
+                intent = self.drone_manager.intent_parser.parse(voice.replace(drone_name, "").strip())
+                intent.targets = [drone_name]
+
+        if intent is not None:
+            targets = ", ".join(intent.targets)
+            print(f'Распознана команда для дронов {targets}: {intent.text}')
+            self.tts.barge_in()
+            response = self.drone_manager.execute_intent(intent)
+            if response:
+                # новый ответ вытесняет ещё не сказанный старый для тех же дронов
+                self.tts.va_speak(response, collapse_key=f"drone:{targets}")
+            return True
+
         # Стандартные команды голосового ассистента
         filtered_cmd = self._filter_cmd(voice)
-        recognized_cmd = self._recognize_cmd(filtered_cmd)
+        with tracer.span("command_match") as attrs:
+            recognized_cmd = self._recognize_cmd(filtered_cmd)
+            attrs["cmd"] = recognized_cmd['cmd']
 
         if recognized_cmd['percent'] > 60:
+            self.tts.barge_in()
             self._execute_cmd(recognized_cmd['cmd'], voice)
             return True
 
         return False
 
+    def _run_script(self, script, cache_key, words):
+        script_path = "tello_command.py"
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write(script)  # копия на диске — чтобы посмотреть, что сгенерировала модель
+        if self.script_executor is not None:
+            # Скрипт выполняется в тёплом процессе, голосовой цикл не ждёт его окончания
+            future = self.script_executor.submit(script)
+            future.add_done_callback(lambda f: self._script_done(f.result(), cache_key, words, script))
+        else:
+            result = subprocess.run([sys.executable, script_path]) # Используем sys.executable для запуска
+            if cache_key is not None and result.returncode == 0:
+                self.llm_cache.put(cache_key, " ".join(words), script)  # кэшируем только отработавший код
+
+    def _run_plan(self, text, cache_key, words):
+        try:
+            plan = parse_plan(text)
+        except ValueError as e:
+            print(f"❌ План отклонён: {e}")
+            self.tts.va_speak("План полёта составлен с ошибкой")
+            return
+        future = self.flight_engine.run(plan)
+        self.tts.va_speak("Выполняю план полёта")
+        future.add_done_callback(lambda f: self._plan_done(f.result(), cache_key, words, text))
+
+    def _plan_done(self, result, cache_key, words, text):
+        if result.ok:
+            if cache_key is not None:
+                self.llm_cache.put(cache_key, " ".join(words), text)  # кэшируем только выполненный план
+            print(f"✅ План выполнен за {result.duration:.1f} с, шаги: {result.steps}")
+        else:
+            print(f"❌ План не выполнен: {result.error}")
+            self.tts.va_speak("План полёта прерван")
+
+    def _script_done(self, result, cache_key, words, script):
+        if result.ok:
+            if cache_key is not None:
+                self.llm_cache.put(cache_key, " ".join(words), script)  # кэшируем только отработавший код
+            first = f", первая команда дрону через {result.first_command_ms:.0f} мс" if result.first_command_ms is not None else ""
+            print(f"✅ Скрипт выполнен за {result.finished - result.submitted:.1f} с{first}")
+        else:
+            print(f"❌ Скрипт не выполнен: {result.error}")
+            self.tts.va_speak("Код завершился с ошибкой")
+
     def _filter_cmd(self, raw_voice: str) -> str:
         cmd = raw_voice
         for x in self.VA_ALIAS:
@@ -92,14 +204,7 @@ class VAResponder:
         return cmd
 
     def _recognize_cmd(self, cmd: str) -> dict:
-        rc = {'cmd': '', 'percent': 0}
-        for c, v_list in self.VA_CMD_LIST.items():
-            for x in v_list:
-                vrt = fuzz.ratio(cmd, x)
-                if vrt > rc['percent']:
-                    rc['cmd'] = c
-                    rc['percent'] = vrt
-        return rc
+        return self.matcher.match(cmd)
 
     def _execute_cmd(self, cmd: str, voice: str):
         if cmd == 'connect_drones':
@@ -131,6 +236,23 @@ class VAResponder:
             subprocess.check_call([f'{self.CDIR}\\custom-commands\\Switch to dynamics.exe'])
             time.sleep(0.5)
             self.audio_manager.play_sound("ready")
+        elif cmd == 'llm_cache_forget_last':
+            if self.llm_cache is not None and self.llm_cache.invalidate_last():
+                self.tts.va_speak("Забыл последний код")
+            else:
+                self.audio_manager.play_sound("ok")
+        elif cmd == 'cancel_script':
+            stopped = self.flight_engine is not None and self.flight_engine.cancel()
+            if self.script_executor is not None and self.script_executor.cancel():
+                stopped = True
+            if stopped:
+                self.tts.va_speak("Скрипт остановлен")
+            else:
+                self.audio_manager.play_sound("ok")
+        elif cmd == 'llm_cache_clear':
+            if self.llm_cache is not None:
+                self.llm_cache.clear()
+            self.tts.va_speak("Сохранённый код удалён")
         elif cmd == 'off':
             self.audio_manager.play_sound("off", True)
             self.audio_manager.stop_recorder()
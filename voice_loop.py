@@ -0,0 +1,133 @@
+#Цикл распознавания: забирает кадры из кольцевого буфера AudioManager, ищет активационное слово и команды.
+
+import json
+import time
+
+from rich import print
+
+from audio_buffer import PreRollBuffer
+from tracing import tracer
+
+
+class VoiceLoop:
+    """
+    Потребитель кадров. Захват идёт в отдельном потоке (AudioCapture), поэтому
+    пока respond() озвучивает ответ или ждёт GPT, звук копится в буфере и
+    распознаётся сразу после возврата.
+
+    Окно ожидания команды считается в кадрах, а не по часам: после долгой
+    команды накопленные кадры относятся к тому же окну, что и до неё.
+
+    При preroll_ms > 0 последние кадры до активации проигрываются в Vosk,
+    а приветствие не звучит: захват не прерывается, и «Джарвис, первый стоп»
+    на одном дыхании доходит до Vosk целиком, без звонка в записи.
+
+    Если передан fast_path (FastCommandPath), частичные результаты Vosk
+    проверяются на каждом кадре, а аварийные команды уходят до конца фразы.
+
+    Если передан speech (модуль tts), кадры, записанные пока звучит озвучка,
+    не попадают в pre-roll и окно ожидания не тратят. В Vosk они идут только
+    ради fast_path: аварийная команда по частичному результату уходит и
+    поверх озвучки, а финальный текст эха в respond() не попадает.
+    «Джарвис» во время озвучки её обрывает.
+    """
+
+    def __init__(self, audio_manager, va_responder, listen_seconds=10, preroll_ms=0, fast_path=None,
+                 on_wake=None, on_recognized=None, on_response=None, on_timeout=None, speech=None):
+        self.audio_manager = audio_manager
+        self.va_responder = va_responder
+        frame_length = audio_manager.porcupine.frame_length
+        self.listen_frames = int(listen_seconds * audio_manager.samplerate / frame_length)
+
+        preroll_frames = int(preroll_ms * audio_manager.samplerate / 1000 / frame_length)
+        self.preroll = PreRollBuffer(preroll_frames) if preroll_frames > 0 else None
+        self.fast_path = fast_path
+        self.speech = speech
+
+        self.on_wake = on_wake
+        self.on_recognized = on_recognized
+        self.on_response = on_response
+        self.on_timeout = on_timeout
+
+        self.frames_left = 0  # сколько кадров ещё слушаем команду после активации
+        self.running = False
+
+    def run(self):
+        self.running = True
+        while self.running:
+            pcm = self.audio_manager.read_frame(timeout=0.5)
+            if pcm is None:
+                continue
+            self.process_frame(pcm)
+
+    def stop(self):
+        self.running = False
+
+    def process_frame(self, pcm):
+        audio_manager = self.audio_manager
+        own_speech = self.speech is not None and self.speech.heard_own_speech(audio_manager.ring.last_timestamp)
+
+        if self.preroll is not None and not own_speech:
+            self.preroll.push(pcm)
+
+        wall, started = time.time(), time.perf_counter()
+        if audio_manager.porcupine.process(pcm) >= 0:
+            tracer.begin()  # новая фраза — новый trace id
+            tracer.record("porcupine", wall, time.perf_counter() - started)
+            self._activate()
+            return
+
+        if self.frames_left <= 0:
+            return
+        if own_speech:
+            if self.fast_path is not None:
+                self._recognize(pcm, own_speech=True)
+            return
+
+        self.frames_left -= 1
+        self._recognize(pcm)
+        if self.frames_left == 0 and self.on_timeout:
+            self.on_timeout()
+
+    def _activate(self):
+        audio_manager = self.audio_manager
+        print("Yes, sir.")
+        if self.speech is not None:
+            self.speech.barge_in()  # перебили озвучку активационным словом
+        self.frames_left = self.listen_frames
+        if self.on_wake:
+            self.on_wake()
+
+        if self.preroll is None:
+            with tracer.span("greet"):
+                audio_manager.play_sound("greet", wait_done=True)
+            return
+
+        # Без приветствия: пока звучал бы звонок, захват пришлось бы глушить и терять слова после «Джарвис»
+        audio_manager.kaldi_rec.Reset()
+        for pcm in self.preroll.drain():
+            self._recognize(pcm)
+
+    def _recognize(self, pcm, own_speech=False):
+        audio_manager = self.audio_manager
+        wall, started = time.time(), time.perf_counter()
+        if audio_manager.accept_waveform(pcm):
+            recognized_text = json.loads(audio_manager.kaldi_rec.Result())["text"]
+            tracer.record("vosk_final", wall, time.perf_counter() - started, text=recognized_text)
+            if own_speech:
+                self.fast_path.on_final(recognized_text)  # только сбрасывает фразу: эхо озвучки — не команда
+                return
+            if self.on_recognized:
+                self.on_recognized(recognized_text)
+            if self.fast_path is not None and self.fast_path.on_final(recognized_text):
+                handled = True  # Уже отправлено по частичному результату
+            else:
+                handled = self.va_responder.respond(recognized_text)
+            if handled:
+                self.frames_left = self.listen_frames  # Продлеваем окно, если команда распознана
+            if self.on_response:
+                self.on_response(recognized_text, handled)
+            tracer.begin()  # следующая фраза в том же окне — свой trace id
+        elif self.fast_path is not None:
+            partial_text = json.loads(audio_manager.kaldi_rec.PartialResult())["partial"]
+            self.fast_path.on_partial(partial_text, audio_manager.ring.last_timestamp)